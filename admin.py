@@ -1,9 +1,15 @@
 import streamlit as st
 import pandas as pd
-from database import get_db_connection, log_admin_action
+from database import get_db_connection, log_audit_event, BASIC_VERIFICATION
+from presence import apply_presence
+from auth import get_login_metrics
+from metrics_snapshot import REFRESH_MINUTES, get_latest_snapshot, refresh_snapshot, start_refresher
+from session import current_session, invalidate_profile
+from audit_log import ACTOR_ROLES, AUDIT_ACTIONS, get_audit_page
+from exports import DAILY_STATS_EXPORT_COLUMNS, DAILY_STATS_EXPORT_QUERY, EXPORT_FORMATS, export_download, export_format_options
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from datetime import datetime
 
 def admin_dashboard():
     st.markdown('<h1 class="main-header">Admin Dashboard</h1>', unsafe_allow_html=True)
@@ -35,7 +41,13 @@ def admin_dashboard():
 def artist_management():
     st.subheader("Artist Approval & Management")
 
-    # Get pending artists
+    # Pending artists, most complete profiles first (served by idx_artists_status_completion)
+    col1, col2 = st.columns(2)
+    with col1:
+        min_completion = st.slider("Minimum profile completion", 0, 100, 0, step=10)
+    with col2:
+        basic_only = st.checkbox("Basic verification complete only")
+
     conn = get_db_connection()
     cursor = conn.cursor()
 
@@ -44,8 +56,10 @@ def artist_management():
         FROM artists a
         JOIN users u ON a.user_id = u.id
         WHERE a.status = 'pending'
-        ORDER BY a.created_at DESC
-    """)
+          AND a.profile_completion >= ?
+          AND (a.verification_flags & ?) = ?
+        ORDER BY a.profile_completion DESC, a.verification_flags DESC
+    """, (min_completion, *([BASIC_VERIFICATION] * 2 if basic_only else [0, 0])))
 
     pending_artists = cursor.fetchall()
     conn.close()
@@ -71,6 +85,8 @@ def artist_management():
                     st.write(f"**Areas Covered:** {artist['areas_covered'] or 'Not specified'}")
                     st.write(f"**Bio:** {artist['bio'] or 'No bio provided'}")
                     st.write(f"**Applied:** {artist['created_at']}")
+                    st.write(f"**Profile Completion:** {artist['profile_completion']}%")
+                    st.write(f"**Basic Verification:** {'✅' if artist['verification_flags'] & BASIC_VERIFICATION == BASIC_VERIFICATION else '❌'}")
 
                 # Approval buttons
                 col1, col2, col3 = st.columns(3)
@@ -98,15 +114,15 @@ def artist_management():
     cursor = conn.cursor()
 
     cursor.execute("""
-        SELECT a.*, u.username, u.is_online,
-               (SELECT AVG(r.rating) FROM reviews r WHERE r.artist_id = a.id) as avg_rating,
-               (SELECT COUNT(*) FROM reviews r WHERE r.artist_id = a.id) as review_count
+        SELECT a.*, u.username,
+               a.rating as avg_rating,
+               a.total_reviews as review_count
         FROM artists a
         JOIN users u ON a.user_id = u.id
-        ORDER BY a.status, u.is_online DESC
+        ORDER BY a.status
     """)
 
-    all_artists = cursor.fetchall()
+    all_artists = apply_presence([dict(artist) for artist in cursor.fetchall()])
     conn.close()
 
     if all_artists:
@@ -131,12 +147,16 @@ def approve_artist(artist_id):
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute("UPDATE artists SET status = 'approved' WHERE id = ?", (artist_id,))
+        cursor.execute("UPDATE artists SET status = 'approved' WHERE id = ? RETURNING user_id", (artist_id,))
+        result = cursor.fetchone()
         conn.commit()
         conn.close()
 
+        if result:
+            invalidate_profile(result[0])
+
         # Log admin action
-        log_admin_action(st.session_state.user, f"Approved artist {artist_id}", "Artist approval")
+        log_audit_event(current_session()['user_id'], 'artist_approved', target_type='artist', target_id=artist_id)
         return True
     except Exception as e:
         st.error(f"Error approving artist: {e}")
@@ -148,12 +168,16 @@ def reject_artist(artist_id):
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute("UPDATE artists SET status = 'rejected' WHERE id = ?", (artist_id,))
+        cursor.execute("UPDATE artists SET status = 'rejected' WHERE id = ? RETURNING user_id", (artist_id,))
+        result = cursor.fetchone()
         conn.commit()
         conn.close()
 
+        if result:
+            invalidate_profile(result[0])
+
         # Log admin action
-        log_admin_action(st.session_state.user, f"Rejected artist {artist_id}", "Artist rejection")
+        log_audit_event(current_session()['user_id'], 'artist_rejected', target_type='artist', target_id=artist_id)
         return True
     except Exception as e:
         st.error(f"Error rejecting artist: {e}")
@@ -165,12 +189,16 @@ def suspend_artist(artist_id):
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute("UPDATE artists SET status = 'suspended' WHERE id = ?", (artist_id,))
+        cursor.execute("UPDATE artists SET status = 'suspended' WHERE id = ? RETURNING user_id", (artist_id,))
+        result = cursor.fetchone()
         conn.commit()
         conn.close()
 
+        if result:
+            invalidate_profile(result[0])
+
         # Log admin action
-        log_admin_action(st.session_state.user, f"Suspended artist {artist_id}", "Artist suspension")
+        log_audit_event(current_session()['user_id'], 'artist_suspended', target_type='artist', target_id=artist_id)
         return True
     except Exception as e:
         st.error(f"Error suspending artist: {e}")
@@ -188,69 +216,47 @@ def app_settings():
     st.write("⚙️ App configuration settings would be here")
     st.info("Settings like pricing tiers, commission rates, notification preferences, etc.")
 
+def format_growth(growth):
+    """Format a snapshot growth percentage for st.metric"""
+    return None if growth is None else f"{growth:+.1f}%"
+
 def analytics_dashboard():
     st.subheader("Analytics Dashboard")
 
-    # Get real analytics data from database
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    # Get total counts
-    cursor.execute("SELECT COUNT(*) FROM users WHERE role = 'user'")
-    total_users = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM artists WHERE status = 'approved'")
-    total_artists = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM bookings")
-    total_bookings = cursor.fetchone()[0]
-
-    cursor.execute("SELECT SUM(amount) FROM bookings WHERE status = 'completed'")
-    total_revenue = cursor.fetchone()[0] or 0
-
-    conn.close()
+    # Aggregates come from the latest snapshot; a background job refreshes it
+    start_refresher()
+    taken_at, metrics = get_latest_snapshot()
 
-    # Calculate growth percentages (mock for now - would compare with previous period)
-    user_growth = "12%"
-    artist_growth = "8%"
-    booking_growth = "23%"
-    revenue_growth = "18%"
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.caption(f"As of {datetime.fromtimestamp(taken_at).strftime('%Y-%m-%d %H:%M')} • refreshed every "
+                   f"{REFRESH_MINUTES:g} minutes • changes over the last {metrics['growth_period_days']} days")
+    with col2:
+        if st.button("🔄 Refresh now"):
+            refresh_snapshot(force=True)
+            st.rerun()
 
+    growth = metrics['growth']
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        st.metric("Total Users", f"{total_users:,}", user_growth)
+        st.metric("Total Users", f"{metrics['total_users']:,}", format_growth(growth['users']))
     with col2:
-        st.metric("Total Artists", f"{total_artists:,}", artist_growth)
+        st.metric("Total Artists", f"{metrics['total_artists']:,}", format_growth(growth['artists']))
     with col3:
-        st.metric("Total Bookings", f"{total_bookings:,}", booking_growth)
+        st.metric("Total Bookings", f"{metrics['total_bookings']:,}", format_growth(growth['bookings']))
     with col4:
-        st.metric("Revenue", f"₹{total_revenue:,}", revenue_growth)
+        st.metric("Revenue", f"₹{metrics['revenue']:,}", format_growth(growth['revenue']))
 
     # Charts - Monthly trends for last 6 months
     st.subheader("Monthly Trends")
 
-    # Get monthly booking data
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        SELECT strftime('%Y-%m', created_at) as month,
-               COUNT(*) as bookings,
-               SUM(amount) as revenue
-        FROM bookings
-        WHERE created_at >= date('now', '-6 months')
-        GROUP BY strftime('%Y-%m', created_at)
-        ORDER BY month
-    """)
-
-    monthly_data = cursor.fetchall()
-    conn.close()
+    monthly_data = metrics['monthly']
 
     if monthly_data:
-        months = [row[0] for row in monthly_data]
-        bookings = [row[1] for row in monthly_data]
-        revenue = [row[2] or 0 for row in monthly_data]
+        months = [row['month'] for row in monthly_data]
+        bookings = [row['bookings'] for row in monthly_data]
+        revenue = [row['gross_amount'] or 0 for row in monthly_data]
 
         col1, col2 = st.columns(2)
 
@@ -264,65 +270,91 @@ def analytics_dashboard():
     else:
         st.info("No booking data available for charts")
 
+    # Daily rollup for offline analysis, written in chunks when the button is clicked
+    file_format = st.radio("Export format", export_format_options(), horizontal=True, key="stats_export_format")
+    extension, mime = EXPORT_FORMATS[file_format]
+    st.download_button(
+        label=f"📥 Export Daily Booking Stats ({file_format})",
+        data=lambda: export_download(DAILY_STATS_EXPORT_QUERY, (), DAILY_STATS_EXPORT_COLUMNS, extension),
+        file_name=f"booking_daily_stats_{datetime.now().strftime('%Y%m%d')}.{extension}",
+        mime=mime
+    )
+
     # User activity
     st.subheader("User Activity")
 
-    # Get user activity data
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    today = datetime.now().date()
-    week_ago = today - timedelta(days=7)
-    month_ago = today - timedelta(days=30)
-
-    cursor.execute("SELECT COUNT(*) FROM users WHERE last_active >= ?", (today,))
-    active_today = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM users WHERE last_active >= ?", (week_ago,))
-    active_week = cursor.fetchone()[0]
-
-    cursor.execute("SELECT COUNT(*) FROM users WHERE last_active >= ?", (month_ago,))
-    active_month = cursor.fetchone()[0]
-
-    conn.close()
-
     activity_data = {
         'Users': ['Active Today', 'Active This Week', 'Active This Month'],
-        'Count': [active_today, active_week, active_month]
+        'Count': [metrics['active']['today'], metrics['active']['week'], metrics['active']['month']]
     }
 
     fig3 = px.pie(values=activity_data['Count'], names=activity_data['Users'],
                   title="User Activity Distribution")
     st.plotly_chart(fig3, use_container_width=True)
 
-def audit_logs():
-    st.subheader("Admin Audit Logs")
+    # Login performance for this server process
+    st.subheader("Login Performance")
 
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+    login_metrics = get_login_metrics()
+    col1, col2, col3, col4 = st.columns(4)
 
-        cursor.execute("""
-            SELECT al.*, u.username
-            FROM admin_logs al
-            JOIN users u ON al.admin_id = u.id
-            ORDER BY al.created_at DESC
-            LIMIT 100
-        """)
+    with col1:
+        st.metric("Recent Logins", f"{login_metrics['logins']:,}")
+    with col2:
+        st.metric("p50 Latency", f"{login_metrics['p50_ms']:.0f} ms")
+    with col3:
+        st.metric("p99 Latency", f"{login_metrics['p99_ms']:.0f} ms")
+    with col4:
+        st.metric("bcrypt Queue", login_metrics['queue_depth'])
 
-        logs = cursor.fetchall()
-        conn.close()
+def audit_logs():
+    st.subheader("Admin Audit Logs")
 
-        if logs:
-            df = pd.DataFrame(logs)
-            st.dataframe(df[['username', 'action', 'details', 'created_at']],
-                        column_config={
-                            "username": "Admin",
-                            "action": "Action",
-                            "details": "Details",
-                            "created_at": "Timestamp"
-                        })
-        else:
-            st.info("No audit logs found")
-    except Exception as e:
-        st.error(f"Error loading audit logs: {e}")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        action = st.selectbox("Action", [""] + list(AUDIT_ACTIONS),
+                              format_func=lambda code: AUDIT_ACTIONS.get(code, "All actions"))
+    with col2:
+        # Admin actions by default; artist housekeeping events are one filter away
+        actor_role = st.selectbox("Actor", ACTOR_ROLES + [""],
+                                  format_func=lambda role: f"{role.title()}s" if role else "Everyone")
+    with col3:
+        start_date = st.date_input("From", value=None)
+    with col4:
+        end_date = st.date_input("To", value=None)
+
+    # Keyset cursors for the pages seen so far; a new filter starts again from the newest page
+    filters = (action, actor_role, start_date, end_date)
+    if st.session_state.get('audit_log_filters') != filters:
+        st.session_state.audit_log_filters = filters
+        st.session_state.audit_log_cursors = [None]
+    cursors = st.session_state.audit_log_cursors
+
+    events, next_cursor = get_audit_page(*filters, after=cursors[-1])
+
+    if events:
+        df = pd.DataFrame(events)
+        df['action'] = df['action'].map(lambda code: AUDIT_ACTIONS.get(code, code))
+        df['target'] = [f"{event['target_type']} #{event['target_id']}" if event['target_type'] else "" for event in events]
+        st.dataframe(df[['created_at', 'actor_name', 'actor_role', 'action', 'target', 'details']],
+                    column_config={
+                        "created_at": "Timestamp",
+                        "actor_name": "Actor",
+                        "actor_role": "Role",
+                        "action": "Action",
+                        "target": "Target",
+                        "details": "Details"
+                    },
+                    hide_index=True)
+    else:
+        st.info("No audit logs found")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if len(cursors) > 1 and st.button("⬅️ Newer", key="audit_log_newer"):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if next_cursor and st.button("Older ➡️", key="audit_log_older"):
+            cursors.append(next_cursor)
+            st.rerun()
@@ -0,0 +1,412 @@
+import streamlit as st
+import pandas as pd
+import calendar
+import time
+from database import get_db_connection
+
+# The artist's bookings are loaded once per session and reused by every analytics tab
+ANALYTICS_CACHE_KEY = 'analytics_cache'
+ANALYTICS_TTL_SECONDS = 300
+
+BOOKING_STATUSES = ['pending', 'confirmed', 'completed', 'cancelled']
+
+PERIOD_WINDOWS = {
+    "Last 7 days": (7, 'D'),
+    "Last 30 days": (30, 'D'),
+    "Last 3 months": (90, 'W'),
+    "Last 6 months": (180, 'W'),
+    "Last year": (365, 'MS'),
+}
+
+CUSTOMER_SEGMENTS = [
+    {'name': 'One-time', 'icon': '🆕', 'min_bookings': 1,
+     'description': 'Customers who have booked once'},
+    {'name': 'Returning', 'icon': '🔁', 'min_bookings': 2,
+     'description': 'Customers who came back for a second booking'},
+    {'name': 'Loyal', 'icon': '💎', 'min_bookings': 3,
+     'description': 'Customers with three or more bookings'},
+]
+
+def load_artist_bookings(username):
+    """Fetch all of the artist's bookings (with their review, if any) into a typed DataFrame"""
+    conn = get_db_connection()
+    try:
+        df = pd.read_sql("""
+            SELECT b.id, b.user_id, b.appointment_date, b.start_time, b.status,
+                   b.amount, b.service_type, b.notes, b.created_at,
+                   r.rating, r.created_at as reviewed_at
+            FROM bookings b
+            JOIN artists a ON b.artist_id = a.id
+            JOIN users u ON a.user_id = u.id
+            LEFT JOIN reviews r ON r.booking_id = b.id
+            WHERE u.username = ?
+        """, conn, params=(username,))
+    finally:
+        conn.close()
+
+    df['appointment_date'] = pd.to_datetime(df['appointment_date'], errors='coerce')
+    df['created_at'] = pd.to_datetime(df['created_at'], errors='coerce')
+    df['reviewed_at'] = pd.to_datetime(df['reviewed_at'], errors='coerce')
+    df['amount'] = pd.to_numeric(df['amount'], errors='coerce').fillna(0.0)
+    df['rating'] = pd.to_numeric(df['rating'], errors='coerce')
+    df['status'] = df['status'].astype(pd.CategoricalDtype(BOOKING_STATUSES))
+    df['service_type'] = df['service_type'].fillna('Unspecified')
+    df['start_hour'] = pd.to_datetime(df['start_time'], format='mixed', errors='coerce').dt.hour
+    df['month'] = df['appointment_date'].dt.to_period('M')
+
+    # Cancelled bookings carry an amount but never earn it
+    df['revenue'] = df['amount'].where(df['status'] != 'cancelled', 0.0)
+    df['completed'] = df['status'] == 'completed'
+    df['cancelled'] = df['status'] == 'cancelled'
+    return df
+
+def _cache_entry(username):
+    """Get (loading if missing or expired) the session cache entry for an artist"""
+    cache = st.session_state.setdefault(ANALYTICS_CACHE_KEY, {})
+    entry = cache.get(username)
+
+    if entry is None or time.time() - entry['loaded_at'] > ANALYTICS_TTL_SECONDS:
+        entry = {'loaded_at': time.time(), 'frames': {'bookings': load_artist_bookings(username)}}
+        cache[username] = entry
+
+    return entry
+
+def _memoized(username, key, builder):
+    """Build a derived frame from the artist's bookings once and reuse it for the session"""
+    frames = _cache_entry(username)['frames']
+    if key not in frames:
+        frames[key] = builder(frames['bookings'])
+    return frames[key]
+
+def get_artist_frame(username):
+    """Get the shared bookings DataFrame for an artist"""
+    return _cache_entry(username)['frames']['bookings']
+
+def invalidate_artist_analytics(username=None):
+    """Drop cached analytics for one artist, or for every artist in this session"""
+    cache = st.session_state.get(ANALYTICS_CACHE_KEY)
+    if not cache:
+        return
+    if username is None:
+        cache.clear()
+    else:
+        cache.pop(username, None)
+
+def month_over_month(series, month):
+    """Change of a per-month series between `month` and the month before (0 if either is missing)"""
+    if month not in series.index or (month - 1) not in series.index:
+        return 0.0
+    return float(series[month] - series[month - 1])
+
+def _percent_change(current, previous):
+    """Percentage change from previous to current (None when there is no baseline)"""
+    if not previous:
+        return None
+    return (current - previous) / previous * 100
+
+# ---------------- Derived frames ----------------
+def _build_monthly(bookings):
+    monthly = bookings.groupby('month').agg(
+        bookings=('id', 'size'),
+        revenue=('revenue', 'sum'),
+        completed=('completed', 'sum'),
+        cancelled=('cancelled', 'sum'),
+        rating=('rating', 'mean')
+    )
+    monthly['completion_rate'] = monthly['completed'] / monthly['bookings'] * 100
+    monthly['cancellation_rate'] = monthly['cancelled'] / monthly['bookings'] * 100
+    return monthly
+
+def _build_monthly_rating(bookings):
+    reviews = bookings.dropna(subset=['rating'])
+    return reviews.groupby(reviews['reviewed_at'].dt.to_period('M'))['rating'].mean()
+
+def _build_customers(bookings):
+    customers = bookings.groupby('user_id').agg(
+        bookings=('id', 'size'),
+        revenue=('revenue', 'sum'),
+        avg_rating=('rating', 'mean'),
+        first_booking=('appointment_date', 'min')
+    )
+    thresholds = [segment['min_bookings'] for segment in CUSTOMER_SEGMENTS]
+    customers['segment'] = pd.cut(
+        customers['bookings'],
+        bins=thresholds + [float('inf')],
+        labels=[segment['name'] for segment in CUSTOMER_SEGMENTS],
+        right=False
+    )
+    return customers
+
+def _build_services(bookings):
+    services = bookings.groupby('service_type').agg(
+        booking_count=('id', 'size'),
+        revenue=('revenue', 'sum'),
+        completed=('completed', 'sum'),
+        avg_rating=('rating', 'mean')
+    )
+    services['completion_rate'] = (services['completed'] / services['booking_count'] * 100).round(1)
+    services['avg_rating'] = services['avg_rating'].round(1)
+    services = services.drop(columns='completed').sort_values('booking_count', ascending=False)
+    return services.rename_axis('service_name').reset_index()
+
+def _build_seasonal(bookings):
+    if bookings.empty:
+        return pd.DataFrame(columns=['month', 'bookings'])
+    counts = bookings['appointment_date'].dt.month.value_counts().reindex(range(1, 13), fill_value=0)
+    return pd.DataFrame({'month': [calendar.month_abbr[m] for m in counts.index], 'bookings': counts.values})
+
+def _build_weekly(bookings):
+    if bookings.empty:
+        return pd.DataFrame(columns=['day', 'bookings'])
+    counts = bookings['appointment_date'].dt.dayofweek.value_counts().reindex(range(7), fill_value=0)
+    return pd.DataFrame({'day': [calendar.day_name[d] for d in counts.index], 'bookings': counts.values})
+
+def _build_hourly(bookings):
+    counts = bookings['start_hour'].dropna().astype(int).value_counts().sort_index()
+    return pd.DataFrame({'hour': counts.index, 'bookings': counts.values})
+
+def get_monthly_frame(username):
+    """Get the artist's per-month bookings, revenue, completion and rating"""
+    return _memoized(username, 'monthly', _build_monthly)
+
+def get_monthly_rating(username):
+    """Get the artist's average review rating per month the review was written"""
+    return _memoized(username, 'monthly_rating', _build_monthly_rating)
+
+# ---------------- Performance ----------------
+def get_performance_chart_data(username, time_period, metric_type):
+    """Get bookings, revenue, rating and completion rate bucketed over the selected period"""
+    try:
+        def build(bookings):
+            days, freq = PERIOD_WINDOWS.get(time_period, PERIOD_WINDOWS["Last 30 days"])
+            now = pd.Timestamp.now()
+            window = bookings[bookings['appointment_date'].between(now.normalize() - pd.Timedelta(days=days), now)]
+            if window.empty:
+                return []
+
+            chart = window.groupby(pd.Grouper(key='appointment_date', freq=freq)).agg(
+                bookings=('id', 'size'),
+                revenue=('revenue', 'sum'),
+                completed=('completed', 'sum'),
+                rating=('rating', 'mean')
+            )
+            chart['completion_rate'] = (chart['completed'] / chart['bookings'] * 100).fillna(0.0)
+            chart = chart.drop(columns='completed').rename_axis('date').reset_index()
+            chart['date'] = chart['date'].dt.date
+            return chart.to_dict('records')
+
+        return _memoized(username, ('performance', time_period), build)
+    except Exception as e:
+        st.error(f"Error getting performance chart data: {e}")
+        return []
+
+def get_performance_insights(username):
+    """Get month-over-month insights for bookings, revenue and completion"""
+    try:
+        monthly = get_monthly_frame(username)
+        this_month = pd.Timestamp.now().to_period('M')
+        if this_month not in monthly.index or (this_month - 1) not in monthly.index:
+            return []
+
+        current, previous = monthly.loc[this_month], monthly.loc[this_month - 1]
+        insights = []
+
+        for column, label in [('bookings', 'Bookings'), ('revenue', 'Revenue')]:
+            change = _percent_change(current[column], previous[column])
+            if change is not None:
+                insights.append({
+                    'type': 'positive' if change >= 0 else 'negative',
+                    'title': f"{label} {'up' if change >= 0 else 'down'} vs last month",
+                    'description': f"{label} this month: {current[column]:,.0f} (last month: {previous[column]:,.0f})",
+                    'value': f"{change:+.1f}%"
+                })
+
+        completion_delta = current['completion_rate'] - previous['completion_rate']
+        insights.append({
+            'type': 'positive' if completion_delta >= 0 else 'negative',
+            'title': "Completion rate trend",
+            'description': f"{current['completion_rate']:.1f}% of this month's bookings are completed "
+                           f"(last month: {previous['completion_rate']:.1f}%)",
+            'value': f"{completion_delta:+.1f} pts"
+        })
+
+        if current['cancellation_rate'] > 20:
+            insights.append({
+                'type': 'negative',
+                'title': "High cancellation rate",
+                'description': f"{current['cancellation_rate']:.1f}% of this month's bookings were cancelled",
+                'value': f"{int(current['cancelled'])} cancelled"
+            })
+
+        return insights
+    except Exception as e:
+        st.error(f"Error getting performance insights: {e}")
+        return []
+
+# ---------------- Revenue ----------------
+def get_revenue_data(username):
+    """Get total, per-booking average and this month's revenue"""
+    try:
+        bookings = get_artist_frame(username)
+        earning = bookings[bookings['revenue'] > 0]
+        monthly = get_monthly_frame(username)
+        return {
+            'total': float(bookings['revenue'].sum()),
+            'average': float(earning['revenue'].mean()) if not earning.empty else 0.0,
+            'monthly': float(monthly['revenue'].get(pd.Timestamp.now().to_period('M'), 0.0))
+        }
+    except Exception as e:
+        st.error(f"Error getting revenue data: {e}")
+        return {'total': 0.0, 'average': 0.0, 'monthly': 0.0}
+
+def get_revenue_breakdown(username):
+    """Get revenue by service category"""
+    try:
+        services = _memoized(username, 'services', _build_services)
+        breakdown = services[services['revenue'] > 0]
+        return [{'category': row.service_name, 'amount': row.revenue} for row in breakdown.itertuples()]
+    except Exception as e:
+        st.error(f"Error getting revenue breakdown: {e}")
+        return []
+
+def get_current_month_revenue(username):
+    """Get revenue for the current month"""
+    return get_revenue_data(username)['monthly']
+
+def get_current_year_revenue(username):
+    """Get revenue for the current year"""
+    try:
+        monthly = get_monthly_frame(username)
+        this_year = pd.Timestamp.now().year
+        return float(monthly.loc[monthly.index.year == this_year, 'revenue'].sum())
+    except Exception as e:
+        st.error(f"Error getting yearly revenue: {e}")
+        return 0.0
+
+# ---------------- Customers ----------------
+def get_customer_data(username):
+    """Get customer counts and retention"""
+    try:
+        customers = _memoized(username, 'customers', _build_customers)
+        total = len(customers)
+        repeat = int((customers['bookings'] > 1).sum())
+        new_since = pd.Timestamp.now().normalize() - pd.Timedelta(days=30)
+        return {
+            'total_customers': total,
+            'repeat_customers': repeat,
+            'new_customers_30d': int((customers['first_booking'] >= new_since).sum()),
+            'retention_rate': repeat / total * 100 if total else 0.0
+        }
+    except Exception as e:
+        st.error(f"Error getting customer data: {e}")
+        return {'total_customers': 0, 'repeat_customers': 0, 'new_customers_30d': 0, 'retention_rate': 0.0}
+
+def get_customer_segments(username):
+    """Get customer segments by booking frequency"""
+    try:
+        customers = _memoized(username, 'customers', _build_customers)
+        stats = customers.groupby('segment', observed=True).agg(
+            count=('bookings', 'size'),
+            avg_bookings=('bookings', 'mean'),
+            total_revenue=('revenue', 'sum'),
+            avg_rating=('avg_rating', 'mean')
+        )
+
+        segments = []
+        for segment in CUSTOMER_SEGMENTS:
+            if segment['name'] not in stats.index:
+                continue
+            row = stats.loc[segment['name']]
+            segments.append({
+                'name': segment['name'],
+                'icon': segment['icon'],
+                'description': segment['description'],
+                'count': int(row['count']),
+                'avg_bookings': round(float(row['avg_bookings']), 1),
+                'total_revenue': float(row['total_revenue']),
+                'avg_rating': 0.0 if pd.isna(row['avg_rating']) else float(row['avg_rating'])
+            })
+        return segments
+    except Exception as e:
+        st.error(f"Error getting customer segments: {e}")
+        return []
+
+def get_customer_lifetime_value(username):
+    """Get average revenue per customer in each segment"""
+    try:
+        def build(bookings):
+            customers = _memoized(username, 'customers', _build_customers)
+            clv = customers.groupby('segment', observed=True)['revenue'].mean()
+            return clv.rename('clv').rename_axis('segment').reset_index()
+
+        return _memoized(username, 'clv', build)
+    except Exception as e:
+        st.error(f"Error getting customer lifetime value: {e}")
+        return pd.DataFrame(columns=['segment', 'clv'])
+
+# ---------------- Services ----------------
+def get_service_performance(username):
+    """Get bookings, revenue, completion and rating per service"""
+    try:
+        return _memoized(username, 'services', _build_services)
+    except Exception as e:
+        st.error(f"Error getting service performance: {e}")
+        return pd.DataFrame(columns=['service_name', 'booking_count', 'revenue', 'avg_rating', 'completion_rate'])
+
+def get_service_optimization_suggestions(username):
+    """Get suggestions based on how each service performs"""
+    try:
+        services = _memoized(username, 'services', _build_services)
+        suggestions = []
+        if services.empty:
+            return suggestions
+
+        top = services.sort_values('revenue', ascending=False).iloc[0]
+        if top['revenue'] > 0:
+            suggestions.append({
+                'id': 'promote_top',
+                'type': 'increase',
+                'title': f"Promote {top['service_name']}",
+                'description': f"{top['service_name']} brings in the most revenue "
+                               f"(₹{top['revenue']:,.0f} from {top['booking_count']} bookings).",
+                'impact': "Feature it first on your profile and portfolio"
+            })
+
+        for row in services[(services['booking_count'] >= 3) & (services['completion_rate'] < 70)].itertuples():
+            suggestions.append({
+                'id': f"completion_{row.Index}",
+                'type': 'optimize',
+                'title': f"Improve completion for {row.service_name}",
+                'description': f"Only {row.completion_rate:.0f}% of {row.service_name} bookings are completed.",
+                'impact': "Confirm details with customers earlier to reduce cancellations"
+            })
+
+        return suggestions
+    except Exception as e:
+        st.error(f"Error getting service suggestions: {e}")
+        return []
+
+# ---------------- Trends ----------------
+def get_seasonal_trends(username):
+    """Get bookings per calendar month"""
+    try:
+        return _memoized(username, 'seasonal', _build_seasonal)
+    except Exception as e:
+        st.error(f"Error getting seasonal trends: {e}")
+        return pd.DataFrame(columns=['month', 'bookings'])
+
+def get_weekly_patterns(username):
+    """Get bookings per day of week"""
+    try:
+        return _memoized(username, 'weekly', _build_weekly)
+    except Exception as e:
+        st.error(f"Error getting weekly patterns: {e}")
+        return pd.DataFrame(columns=['day', 'bookings'])
+
+def get_hourly_patterns(username):
+    """Get bookings per starting hour"""
+    try:
+        return _memoized(username, 'hourly', _build_hourly)
+    except Exception as e:
+        st.error(f"Error getting hourly patterns: {e}")
+        return pd.DataFrame(columns=['hour', 'bookings'])
@@ -1,10 +1,12 @@
 import streamlit as st
 from datetime import datetime, date, time, timedelta
-from database import get_db_connection, get_user_profile, update_artist_profile, get_artist_availability, get_user_bookings
+from database import get_db_connection, update_artist_profile, get_artist_availability, get_user_bookings, get_artist_id
+from session import get_session_profile
+from settings_store import get_artist_settings, save_artist_settings as save_settings, DEFAULT_ARTIST_SETTINGS, BUFFER_TIME_OPTIONS
 from artist_profile import artist_profile_management
-from artist_status import artist_status_management
+from artist_status import artist_status_management, get_artist_online_status
 from artist_chat import artist_chat_interface
-from artist_booking import artist_booking_management
+from artist_booking import artist_booking_management, get_artist_kpi_snapshot, clear_artist_kpi_cache
 from artist_analytics import artist_analytics_dashboard
 import pandas as pd
 
@@ -12,9 +14,12 @@ def artist_dashboard():
     """Main artist dashboard with comprehensive functionality"""
     st.markdown('<h1 class="main-header">🎨 Artist Dashboard</h1>', unsafe_allow_html=True)
 
+    # KPIs are computed once per rerun and shared by every tab
+    clear_artist_kpi_cache()
+
     # Get artist profile
     username = st.session_state.user
-    artist_profile = get_user_profile(username)
+    artist_profile = get_session_profile()
 
     if not artist_profile:
         st.error("Artist profile not found. Please contact admin.")
@@ -132,32 +137,38 @@ def artist_settings(username):
     """Artist settings and preferences"""
     st.subheader("⚙️ Settings & Preferences")
 
+    artist_id = get_artist_id(username)
+    settings = get_artist_settings(artist_id) if artist_id else DEFAULT_ARTIST_SETTINGS
+
     # Notification settings
     st.subheader("🔔 Notifications")
     col1, col2 = st.columns(2)
 
     with col1:
-        booking_notifications = st.checkbox("New booking notifications", value=True)
-        message_notifications = st.checkbox("New message notifications", value=True)
-        review_notifications = st.checkbox("New review notifications", value=True)
+        booking_notifications = st.checkbox("New booking notifications", value=settings['booking_notifications'])
+        message_notifications = st.checkbox("New message notifications", value=settings['message_notifications'])
+        review_notifications = st.checkbox("New review notifications", value=settings['review_notifications'])
 
     with col2:
-        email_notifications = st.checkbox("Email notifications", value=True)
-        sms_notifications = st.checkbox("SMS notifications", value=False)
-        reminder_notifications = st.checkbox("Appointment reminders", value=True)
+        email_notifications = st.checkbox("Email notifications", value=settings['email_notifications'])
+        sms_notifications = st.checkbox("SMS notifications", value=settings['sms_notifications'])
+        reminder_notifications = st.checkbox("Appointment reminders", value=settings['reminder_notifications'])
 
     # Business settings
     st.subheader("💼 Business Settings")
     col1, col2 = st.columns(2)
 
     with col1:
-        advance_booking_days = st.number_input("Advance booking days", min_value=1, max_value=90, value=30)
-        buffer_time = st.selectbox("Buffer time between appointments",
-            ["No buffer", "15 minutes", "30 minutes", "1 hour"])
+        advance_booking_days = st.number_input("Advance booking days", min_value=1, max_value=90,
+            value=settings['advance_booking_days'])
+        buffer_labels = list(BUFFER_TIME_OPTIONS)
+        buffer_minutes = list(BUFFER_TIME_OPTIONS.values())
+        buffer_time = st.selectbox("Buffer time between appointments", buffer_labels,
+            index=buffer_minutes.index(settings['buffer_time']) if settings['buffer_time'] in buffer_minutes else 0)
 
     with col2:
-        auto_accept_bookings = st.checkbox("Auto-accept bookings", value=False)
-        require_deposit = st.checkbox("Require deposit for bookings", value=False)
+        auto_accept_bookings = st.checkbox("Auto-accept bookings", value=settings['auto_accept_bookings'])
+        require_deposit = st.checkbox("Require deposit for bookings", value=settings['require_deposit'])
 
     # Save settings
     if st.button("💾 Save Settings", type="primary"):
@@ -169,7 +180,7 @@ def artist_settings(username):
             'sms_notifications': sms_notifications,
             'reminder_notifications': reminder_notifications,
             'advance_booking_days': advance_booking_days,
-            'buffer_time': buffer_time,
+            'buffer_time': BUFFER_TIME_OPTIONS[buffer_time],
             'auto_accept_bookings': auto_accept_bookings,
             'require_deposit': require_deposit
         })
@@ -178,58 +189,11 @@ def artist_settings(username):
 # Database helper functions
 def get_today_bookings_count(username):
     """Get count of today's bookings for artist"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT COUNT(*) FROM bookings b
-            JOIN artists a ON b.artist_id = a.id
-            JOIN users u ON a.user_id = u.id
-            WHERE u.username = ? AND DATE(b.appointment_date) = DATE('now')
-        """, (username,))
-
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count
-    except Exception as e:
-        st.error(f"Error getting today's bookings: {e}")
-        return 0
+    return get_artist_kpi_snapshot(username)['today_bookings']
 
 def get_total_earnings(username):
-    """Get total earnings for artist (mock implementation)"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT COALESCE(SUM(b.amount), 0) FROM bookings b
-            JOIN artists a ON b.artist_id = a.id
-            JOIN users u ON a.user_id = u.id
-            WHERE u.username = ? AND b.status = 'completed'
-        """, (username,))
-
-        earnings = cursor.fetchone()[0]
-        conn.close()
-        return earnings if earnings else 0
-    except Exception as e:
-        st.error(f"Error getting earnings: {e}")
-        return 0
-
-def get_artist_online_status(username):
-    """Get artist online status"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT is_online FROM users WHERE username = ?", (username,))
-        result = cursor.fetchone()
-        conn.close()
-
-        return result[0] if result else False
-    except Exception as e:
-        st.error(f"Error getting online status: {e}")
-        return False
+    """Get total earnings (completed bookings) for artist"""
+    return get_artist_kpi_snapshot(username)['total_earnings']
 
 def save_availability(username, day, start_time, end_time, is_available, break_duration):
     """Save artist availability for a specific day"""
@@ -398,39 +362,7 @@ def block_all_days(username):
 
 def save_artist_settings(username, settings):
     """Save artist settings to database"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Get artist ID
-        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-        user_result = cursor.fetchone()
-
-        if not user_result:
-            return False
-
-        user_id = user_result[0]
-        cursor.execute("SELECT id FROM artists WHERE user_id = ?", (user_id,))
-        artist_result = cursor.fetchone()
-
-        if not artist_result:
-            return False
-
-        artist_id = artist_result[0]
-
-        # Store settings as JSON string (simplified for SQLite)
-        settings_json = str(settings)
-
-        cursor.execute("""
-            UPDATE artists SET
-            specializations = ?,
-            updated_at = datetime('now')
-            WHERE id = ?
-        """, (settings_json, artist_id))
-
-        conn.commit()
-        conn.close()
-        return True
-    except Exception as e:
-        st.error(f"Error saving settings: {e}")
+    artist_id = get_artist_id(username)
+    if not artist_id:
         return False
+    return save_settings(artist_id, settings)
@@ -1,7 +1,9 @@
 import streamlit as st
 from datetime import datetime, date, time, timedelta
-from database import get_db_connection, get_user_bookings
-import pandas as pd
+from database import get_db_connection, get_user_bookings, get_artist_id, get_artist_kpis, EMPTY_ARTIST_KPIS
+from analytics_engine import invalidate_artist_analytics
+from exports import (BOOKING_EXPORT_COLUMNS, BOOKING_EXPORT_SELECT, EXPORT_FORMATS, export_download,
+                     export_format_options)
 
 def artist_booking_management(username):
     """Artist booking management interface"""
@@ -180,9 +182,7 @@ def display_all_bookings(username):
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            if st.button("📥 Export to CSV"):
-                export_bookings_csv(all_bookings)
-                st.success("Bookings exported to CSV!")
+            export_bookings(username, status_filter, date_filter, sort_by)
 
         with col2:
             if st.button("📧 Send Reminders"):
@@ -322,47 +322,53 @@ def get_pending_bookings(username):
         st.error(f"Error getting pending bookings: {e}")
         return []
 
+def _all_bookings_sql(username, status_filter="All", date_filter="All Time", sort_by="Date (Newest)"):
+    """Build the FROM, WHERE and ORDER BY shared by the bookings list and its export"""
+    query = """
+            FROM bookings b
+            JOIN users u ON b.user_id = u.id
+            JOIN artists a ON b.artist_id = a.id
+            JOIN users au ON a.user_id = au.id
+            WHERE au.username = ?
+    """
+
+    params = [username]
+
+    # Apply status filter
+    if status_filter != "All":
+        query += " AND b.status = ?"
+        params.append(status_filter.lower())
+
+    # Apply date filter
+    if date_filter == "This Month":
+        query += " AND strftime('%Y-%m', b.appointment_date) = strftime('%Y-%m', 'now')"
+    elif date_filter == "Last 30 Days":
+        query += " AND b.appointment_date >= date('now', '-30 days')"
+    elif date_filter == "This Week":
+        query += " AND b.appointment_date >= date('now', 'weekday 0', '-6 days')"
+
+    # Apply sorting
+    if sort_by == "Date (Newest)":
+        query += " ORDER BY b.appointment_date DESC, b.start_time DESC"
+    elif sort_by == "Date (Oldest)":
+        query += " ORDER BY b.appointment_date ASC, b.start_time ASC"
+    elif sort_by == "Customer Name":
+        query += " ORDER BY u.username ASC"
+    elif sort_by == "Amount":
+        query += " ORDER BY b.amount DESC"
+
+    return query, params
+
 def get_all_bookings(username, status_filter="All", date_filter="All Time", sort_by="Date (Newest)"):
     """Get all bookings with filters"""
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        query = """
+        filters, params = _all_bookings_sql(username, status_filter, date_filter, sort_by)
+        cursor.execute("""
             SELECT b.*, u.username as customer_name, u.email as customer_email, u.phone as customer_phone
-            FROM bookings b
-            JOIN users u ON b.user_id = u.id
-            JOIN artists a ON b.artist_id = a.id
-            JOIN users au ON a.user_id = au.id
-            WHERE au.username = ?
-        """
-
-        params = [username]
-
-        # Apply status filter
-        if status_filter != "All":
-            query += " AND b.status = ?"
-            params.append(status_filter.lower())
-
-        # Apply date filter
-        if date_filter == "This Month":
-            query += " AND strftime('%Y-%m', b.appointment_date) = strftime('%Y-%m', 'now')"
-        elif date_filter == "Last 30 Days":
-            query += " AND b.appointment_date >= date('now', '-30 days')"
-        elif date_filter == "This Week":
-            query += " AND b.appointment_date >= date('now', 'weekday 0', '-6 days')"
-
-        # Apply sorting
-        if sort_by == "Date (Newest)":
-            query += " ORDER BY b.appointment_date DESC, b.start_time DESC"
-        elif sort_by == "Date (Oldest)":
-            query += " ORDER BY b.appointment_date ASC, b.start_time ASC"
-        elif sort_by == "Customer Name":
-            query += " ORDER BY u.username ASC"
-        elif sort_by == "Amount":
-            query += " ORDER BY b.amount DESC"
-
-        cursor.execute(query, params)
+        """ + filters, params)
         bookings = cursor.fetchall()
         conn.close()
 
@@ -386,93 +392,43 @@ def update_booking_status(booking_id, status):
 
         conn.commit()
         conn.close()
+
+        clear_artist_kpi_cache()
+        invalidate_artist_analytics()
         return True
     except Exception as e:
         st.error(f"Error updating booking status: {e}")
         return False
 
-def get_total_booking_count(username):
-    """Get total booking count for artist"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+def get_artist_kpi_snapshot(username):
+    """Get the artist's booking KPIs, computed at most once per rerun"""
+    kpi_cache = st.session_state.setdefault('artist_kpi_cache', {})
 
-        cursor.execute("""
-            SELECT COUNT(*) FROM bookings b
-            JOIN artists a ON b.artist_id = a.id
-            JOIN users u ON a.user_id = u.id
-            WHERE u.username = ?
-        """, (username,))
+    if username not in kpi_cache:
+        artist_id = get_artist_id(username)
+        kpi_cache[username] = get_artist_kpis(artist_id) if artist_id is not None else dict(EMPTY_ARTIST_KPIS)
 
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count
-    except Exception as e:
-        st.error(f"Error getting total booking count: {e}")
-        return 0
+    return kpi_cache[username]
 
-def get_monthly_booking_count(username):
-    """Get monthly booking count for artist"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
+def clear_artist_kpi_cache():
+    """Drop cached KPIs so the next read recomputes them"""
+    st.session_state.pop('artist_kpi_cache', None)
 
-        cursor.execute("""
-            SELECT COUNT(*) FROM bookings b
-            JOIN artists a ON b.artist_id = a.id
-            JOIN users u ON a.user_id = u.id
-            WHERE u.username = ?
-              AND strftime('%Y-%m', b.appointment_date) = strftime('%Y-%m', 'now')
-        """, (username,))
+def get_total_booking_count(username):
+    """Get total booking count for artist"""
+    return get_artist_kpi_snapshot(username)['total_bookings']
 
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count
-    except Exception as e:
-        st.error(f"Error getting monthly booking count: {e}")
-        return 0
+def get_monthly_booking_count(username):
+    """Get monthly booking count for artist"""
+    return get_artist_kpi_snapshot(username)['monthly_bookings']
 
 def get_completion_rate(username):
     """Get booking completion rate"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT
-                COUNT(CASE WHEN status = 'completed' THEN 1 END) * 100.0 / COUNT(*)
-            FROM bookings b
-            JOIN artists a ON b.artist_id = a.id
-            JOIN users u ON a.user_id = u.id
-            WHERE u.username = ?
-        """, (username,))
-
-        rate = cursor.fetchone()[0]
-        conn.close()
-        return rate if rate else 0
-    except Exception as e:
-        st.error(f"Error getting completion rate: {e}")
-        return 0
+    return get_artist_kpi_snapshot(username)['completion_rate']
 
 def get_avg_booking_value(username):
     """Get average booking value"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT AVG(amount) FROM bookings b
-            JOIN artists a ON b.artist_id = a.id
-            JOIN users u ON a.user_id = u.id
-            WHERE u.username = ? AND amount > 0
-        """, (username,))
-
-        avg_value = cursor.fetchone()[0]
-        conn.close()
-        return avg_value if avg_value else 0
-    except Exception as e:
-        st.error(f"Error getting average booking value: {e}")
-        return 0
+    return get_artist_kpi_snapshot(username)['avg_booking_value']
 
 def get_popular_services(username):
     """Get popular services"""
@@ -489,46 +445,11 @@ def get_popular_services(username):
 
 def get_repeat_customer_count(username):
     """Get repeat customer count"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT COUNT(DISTINCT b.user_id) FROM bookings b
-            JOIN artists a ON b.artist_id = a.id
-            JOIN users u ON a.user_id = u.id
-            WHERE u.username = ?
-            GROUP BY b.user_id
-            HAVING COUNT(*) > 1
-        """, (username,))
-
-        count = cursor.fetchone()
-        conn.close()
-        return count[0] if count else 0
-    except Exception as e:
-        st.error(f"Error getting repeat customer count: {e}")
-        return 0
+    return get_artist_kpi_snapshot(username)['repeat_customers']
 
 def get_new_customer_count(username):
-    """Get new customer count"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT COUNT(DISTINCT b.user_id) FROM bookings b
-            JOIN artists a ON b.artist_id = a.id
-            JOIN users u ON a.user_id = u.id
-            WHERE u.username = ?
-              AND b.appointment_date >= date('now', '-30 days')
-        """, (username,))
-
-        count = cursor.fetchone()
-        conn.close()
-        return count[0] if count else 0
-    except Exception as e:
-        st.error(f"Error getting new customer count: {e}")
-        return 0
+    """Get count of customers whose first booking was in the last 30 days"""
+    return get_artist_kpi_snapshot(username)['new_customers']
 
 def get_customer_satisfaction_score(username):
     """Get customer satisfaction score"""
@@ -567,22 +488,16 @@ def get_top_customer(username):
         st.error(f"Error getting top customer: {e}")
         return None
 
-def export_bookings_csv(bookings):
-    """Export bookings to CSV"""
-    try:
-        # Convert bookings to DataFrame
-        df = pd.DataFrame(bookings)
-
-        # Select relevant columns
-        columns_to_export = ['id', 'customer_name', 'appointment_date', 'start_time', 'end_time', 'status', 'amount']
-        df_export = df[columns_to_export] if all(col in df.columns for col in columns_to_export) else df
-
-        # Download CSV
-        st.download_button(
-            label="📥 Download CSV",
-            data=df_export.to_csv(index=False),
-            file_name=f"bookings_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv"
-        )
-    except Exception as e:
-        st.error(f"Error exporting CSV: {e}")
+def export_bookings(username, status_filter="All", date_filter="All Time", sort_by="Date (Newest)"):
+    """Download button for the filtered bookings; the file is written in chunks when clicked"""
+    filters, params = _all_bookings_sql(username, status_filter, date_filter, sort_by)
+
+    file_format = st.radio("Export format", export_format_options(), horizontal=True, key="bookings_export_format")
+    extension, mime = EXPORT_FORMATS[file_format]
+
+    st.download_button(
+        label=f"📥 Export to {file_format}",
+        data=lambda: export_download(BOOKING_EXPORT_SELECT + filters, params, BOOKING_EXPORT_COLUMNS, extension),
+        file_name=f"bookings_{datetime.now().strftime('%Y%m%d')}.{extension}",
+        mime=mime
+    )
@@ -1,6 +1,6 @@
 import streamlit as st
 from datetime import datetime
-from database import get_db_connection
+from database import get_db_connection, get_user_id, log_audit_event
 import time
 
 def artist_chat_interface(username):
@@ -120,6 +120,9 @@ def display_chat_analytics(username):
     """Display chat analytics for the artist"""
     st.subheader("📊 Chat Analytics")
 
+    # Fold any new customer/artist exchanges into the response-time tables
+    refresh_response_times(username)
+
     # Analytics metrics
     col1, col2, col3, col4 = st.columns(4)
 
@@ -133,32 +136,26 @@ def display_chat_analytics(username):
 
     with col3:
         avg_response_time = get_avg_response_time(username)
-        st.metric("Avg Response Time", f"{avg_response_time:.1f} min")
+        st.metric("Avg Response Time (30 days)", f"{avg_response_time:.1f} min" if avg_response_time is not None else "No data")
 
     with col4:
         customer_satisfaction = get_customer_satisfaction(username)
-        st.metric("Customer Rating", f"{customer_satisfaction:.1f}⭐")
+        st.metric("Customer Rating", f"{customer_satisfaction:.1f}⭐" if customer_satisfaction is not None else "No reviews")
 
     # Chat trends
     st.subheader("📈 Chat Trends")
 
-    # Mock trend data
-    trend_data = {
-        "Today": {"chats": 12, "responses": 45, "rating": 4.8},
-        "Yesterday": {"chats": 8, "responses": 32, "rating": 4.6},
-        "This Week": {"chats": 45, "responses": 180, "rating": 4.7},
-        "This Month": {"chats": 180, "responses": 720, "rating": 4.5}
-    }
+    trend_data = get_chat_trends(username)
 
     for period, data in trend_data.items():
         with st.expander(f"📅 {period}"):
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("New Chats", data["chats"])
+                st.metric("Conversations", data["chats"])
             with col2:
-                st.metric("Total Messages", data["responses"])
+                st.metric("Total Messages", data["messages"])
             with col3:
-                st.metric("Avg Rating", f"{data['rating']}⭐")
+                st.metric("Avg Rating", f"{data['rating']:.1f}⭐" if data['rating'] is not None else "—")
 
     # Response time analysis
     st.subheader("⏱️ Response Time Analysis")
@@ -166,6 +163,7 @@ def display_chat_analytics(username):
     response_times = get_response_time_distribution(username)
 
     if response_times:
+        st.caption("All-time distribution of reply times")
         for time_range, count in response_times.items():
             st.write(f"**{time_range}:** {count} responses")
     else:
@@ -174,20 +172,15 @@ def display_chat_analytics(username):
     # Popular chat times
     st.subheader("🕐 Popular Chat Times")
 
-    # Mock popular times
-    popular_times = [
-        {"hour": "9:00 AM", "chats": 15},
-        {"hour": "10:00 AM", "chats": 22},
-        {"hour": "11:00 AM", "chats": 18},
-        {"hour": "2:00 PM", "chats": 25},
-        {"hour": "3:00 PM", "chats": 20},
-        {"hour": "4:00 PM", "chats": 16}
-    ]
-
-    cols = st.columns(3)
-    for i, time_data in enumerate(popular_times):
-        with cols[i % 3]:
-            st.metric(time_data["hour"], f"{time_data['chats']} chats")
+    popular_times = get_popular_chat_times(username)
+
+    if popular_times:
+        cols = st.columns(3)
+        for i, time_data in enumerate(popular_times):
+            with cols[i % 3]:
+                st.metric(time_data["hour"], f"{time_data['chats']} chats")
+    else:
+        st.info("No customer messages in the last 30 days")
 
 def get_active_chats(username):
     """Get active chats for the artist"""
@@ -334,22 +327,9 @@ def mark_chat_read(artist_username, customer_id):
 
 def archive_chat(artist_username, customer_id):
     """Archive a chat conversation"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Mock archive implementation - in real app would have archive table
-        cursor.execute("""
-            INSERT INTO admin_logs (admin_id, action, details, created_at)
-            VALUES ((SELECT id FROM users WHERE username = ?), 'chat_archived', ?, datetime('now'))
-        """, (artist_username, f"Chat with customer {customer_id} archived"))
-
-        conn.commit()
-        conn.close()
-        return True
-    except Exception as e:
-        st.error(f"Error archiving chat: {e}")
-        return False
+    # Mock archive implementation - in real app would have archive table
+    return log_audit_event(get_user_id(artist_username), 'chat_archived', f"Chat with customer {customer_id} archived",
+                           target_type='user', target_id=customer_id)
 
 def get_total_chat_count(username):
     """Get total chat count for artist"""
@@ -400,90 +380,258 @@ def get_active_chat_count(username):
         st.error(f"Error getting active chat count: {e}")
         return 0
 
+# Upper bound (seconds, exclusive) and label of each response-time histogram bucket
+RESPONSE_TIME_BUCKETS = [
+    (5 * 60, "< 5 minutes"),
+    (15 * 60, "5-15 minutes"),
+    (30 * 60, "15-30 minutes"),
+    (60 * 60, "30-60 minutes"),
+    (None, "> 60 minutes")
+]
+
+def response_time_bucket(seconds):
+    """Get the histogram bucket index for a response time"""
+    for index, (upper, _) in enumerate(RESPONSE_TIME_BUCKETS):
+        if upper is None or seconds < upper:
+            return index
+
+def refresh_response_times(username):
+    """Pair new customer messages with the artist's next reply and fold them into the histogram"""
+    try:
+        artist_user_id = get_user_id(username)
+        if artist_user_id is None:
+            return 0
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        # One windowed scan over the messages after each conversation's watermark: a customer
+        # message that follows an artist message (or the watermark) opens a run, and the run is
+        # answered by the first artist message after it.
+        cursor.execute("""
+            WITH convo AS (
+                SELECT cm.id, cm.sender_id, cm.created_at,
+                       CASE WHEN cm.sender_id = :artist THEN cm.receiver_id ELSE cm.sender_id END as customer_id
+                FROM chat_messages cm
+                LEFT JOIN chat_response_watermarks w
+                       ON w.artist_user_id = :artist
+                      AND w.customer_id = CASE WHEN cm.sender_id = :artist THEN cm.receiver_id ELSE cm.sender_id END
+                WHERE (cm.sender_id = :artist OR cm.receiver_id = :artist)
+                  AND cm.sender_id != cm.receiver_id
+                  AND cm.id > COALESCE(w.last_message_id, 0)
+            ),
+            sequenced AS (
+                SELECT id, customer_id, created_at,
+                       sender_id = :artist as from_artist,
+                       LAG(sender_id = :artist) OVER conversation as prev_from_artist,
+                       MIN(CASE WHEN sender_id = :artist THEN id END) OVER following as reply_id,
+                       MIN(CASE WHEN sender_id = :artist THEN created_at END) OVER following as replied_at
+                FROM convo
+                WINDOW conversation AS (PARTITION BY customer_id ORDER BY created_at, id),
+                       following AS (conversation ROWS BETWEEN 1 FOLLOWING AND UNBOUNDED FOLLOWING)
+            )
+            SELECT customer_id, id as message_id, reply_id, replied_at,
+                   CAST(ROUND((julianday(replied_at) - julianday(created_at)) * 86400) AS INTEGER) as response_seconds
+            FROM sequenced
+            WHERE NOT from_artist
+              AND COALESCE(prev_from_artist, 1)
+              AND reply_id IS NOT NULL
+        """, {'artist': artist_user_id})
+
+        pairs = cursor.fetchall()
+        if not pairs:
+            conn.close()
+            return 0
+
+        histogram = {}
+        watermarks = {}
+        for pair in pairs:
+            seconds = max(pair['response_seconds'], 0)
+            cursor.execute("""
+                INSERT OR IGNORE INTO chat_responses
+                (artist_user_id, customer_id, message_id, reply_id, replied_at, response_seconds)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (artist_user_id, pair['customer_id'], pair['message_id'], pair['reply_id'], pair['replied_at'], seconds))
+
+            # A pair another refresh already stored is not counted twice
+            if cursor.rowcount == 1:
+                bucket = histogram.setdefault(response_time_bucket(seconds), [0, 0])
+                bucket[0] += 1
+                bucket[1] += seconds
+            watermarks[pair['customer_id']] = max(watermarks.get(pair['customer_id'], 0), pair['reply_id'])
+
+        cursor.executemany("""
+            INSERT INTO chat_response_histogram (artist_user_id, bucket, responses, total_seconds)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(artist_user_id, bucket) DO UPDATE SET
+                responses = responses + excluded.responses,
+                total_seconds = total_seconds + excluded.total_seconds
+        """, [(artist_user_id, bucket, count, seconds) for bucket, (count, seconds) in histogram.items()])
+
+        cursor.executemany("""
+            INSERT INTO chat_response_watermarks (artist_user_id, customer_id, last_message_id)
+            VALUES (?, ?, ?)
+            ON CONFLICT(artist_user_id, customer_id) DO UPDATE SET last_message_id = excluded.last_message_id
+        """, [(artist_user_id, customer_id, message_id) for customer_id, message_id in watermarks.items()])
+
+        conn.commit()
+        conn.close()
+        return len(pairs)
+    except Exception as e:
+        st.error(f"Error refreshing response times: {e}")
+        return 0
+
 def get_avg_response_time(username):
-    """Get average response time for artist"""
+    """Get average response time (minutes) for replies sent in the last 30 days"""
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        # Mock implementation - would calculate actual response times
         cursor.execute("""
-            SELECT AVG(CASE
-                WHEN sender_id = (SELECT id FROM users WHERE username = ?) THEN 1
-                ELSE 0
-            END) * 10 as avg_response_time  -- Mock calculation
-            FROM chat_messages
-            WHERE (sender_id = (SELECT id FROM users WHERE username = ?)
-                   OR receiver_id = (SELECT id FROM users WHERE username = ?))
-              AND DATE(created_at) >= DATE('now', '-30 days')
-        """, (username, username, username))
+            SELECT AVG(response_seconds) / 60.0
+            FROM chat_responses
+            WHERE artist_user_id = (SELECT id FROM users WHERE username = ?)
+              AND replied_at >= datetime('now', '-30 days')
+        """, (username,))
 
         result = cursor.fetchone()[0]
         conn.close()
-        return result if result else 15.0  # Default 15 minutes
+        return result
     except Exception as e:
         st.error(f"Error getting average response time: {e}")
-        return 15.0
+        return None
 
 def get_customer_satisfaction(username):
-    """Get customer satisfaction rating"""
+    """Get customer satisfaction rating from the artist's reviews"""
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        # Mock implementation - would get from reviews
-        return 4.5
+        cursor.execute("""
+            SELECT AVG(r.rating) FROM reviews r
+            JOIN artists a ON r.artist_id = a.id
+            JOIN users u ON a.user_id = u.id
+            WHERE u.username = ?
+        """, (username,))
+
+        result = cursor.fetchone()[0]
+        conn.close()
+        return result
     except Exception as e:
         st.error(f"Error getting customer satisfaction: {e}")
-        return 4.0
+        return None
 
 def get_response_time_distribution(username):
     """Get response time distribution"""
     try:
-        # Mock data
-        return {
-            "< 5 minutes": 45,
-            "5-15 minutes": 78,
-            "15-30 minutes": 32,
-            "30-60 minutes": 15,
-            "> 60 minutes": 8
-        }
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT bucket, responses FROM chat_response_histogram
+            WHERE artist_user_id = (SELECT id FROM users WHERE username = ?)
+        """, (username,))
+
+        counts = dict(cursor.fetchall())
+        conn.close()
+
+        if not counts:
+            return {}
+        return {label: counts.get(index, 0) for index, (_, label) in enumerate(RESPONSE_TIME_BUCKETS)}
     except Exception as e:
         st.error(f"Error getting response time distribution: {e}")
         return {}
 
-def archive_conversation(artist_username, customer_id):
-    """Archive a conversation"""
+def get_chat_trends(username):
+    """Get conversations, messages and review rating for recent periods"""
+    periods = {
+        "Today": ("date('now')", "date('now', '+1 day')"),
+        "Yesterday": ("date('now', '-1 day')", "date('now')"),
+        "This Week": ("date('now', '-6 days')", "date('now', '+1 day')"),
+        "This Month": ("date('now', 'start of month')", "date('now', '+1 day')")
+    }
+    trends = {period: {"chats": 0, "messages": 0, "rating": None} for period in periods}
+
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute("""
-            INSERT INTO admin_logs (admin_id, action, details, created_at)
-            VALUES ((SELECT id FROM users WHERE username = ?), 'conversation_archived', ?, datetime('now'))
-        """, (artist_username, f"Conversation with customer {customer_id} archived"))
-
-        conn.commit()
+        artist_user_id = get_user_id(username)
+
+        message_columns = ", ".join(
+            f"""COUNT(DISTINCT CASE WHEN created_at >= {start} AND created_at < {end} THEN customer_id END),
+                SUM(created_at >= {start} AND created_at < {end})"""
+            for start, end in periods.values()
+        )
+        cursor.execute(f"""
+            SELECT {message_columns}
+            FROM (
+                SELECT created_at,
+                       CASE WHEN sender_id = :artist THEN receiver_id ELSE sender_id END as customer_id
+                FROM chat_messages
+                WHERE (sender_id = :artist OR receiver_id = :artist)
+                  AND created_at >= MIN(date('now', '-6 days'), date('now', 'start of month'), date('now', '-1 day'))
+            )
+        """, {'artist': artist_user_id})
+        message_row = cursor.fetchone()
+
+        rating_columns = ", ".join(
+            f"AVG(CASE WHEN r.created_at >= {start} AND r.created_at < {end} THEN r.rating END)"
+            for start, end in periods.values()
+        )
+        cursor.execute(f"""
+            SELECT {rating_columns}
+            FROM reviews r
+            JOIN artists a ON r.artist_id = a.id
+            WHERE a.user_id = ?
+        """, (artist_user_id,))
+        rating_row = cursor.fetchone()
         conn.close()
-        return True
+
+        for i, period in enumerate(periods):
+            trends[period] = {
+                "chats": message_row[2 * i] or 0,
+                "messages": message_row[2 * i + 1] or 0,
+                "rating": rating_row[i]
+            }
+        return trends
     except Exception as e:
-        st.error(f"Error archiving conversation: {e}")
-        return False
+        st.error(f"Error getting chat trends: {e}")
+        return trends
 
-def flag_conversation(artist_username, customer_id):
-    """Flag a conversation for review"""
+def get_popular_chat_times(username, limit=6):
+    """Get the hours with the most incoming customer messages over the last 30 days"""
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
         cursor.execute("""
-            INSERT INTO admin_logs (admin_id, action, details, created_at)
-            VALUES ((SELECT id FROM users WHERE username = ?), 'conversation_flagged', ?, datetime('now'))
-        """, (artist_username, f"Conversation with customer {customer_id} flagged"))
+            SELECT CAST(strftime('%H', created_at) AS INTEGER) as hour, COUNT(*) as chats
+            FROM chat_messages
+            WHERE receiver_id = (SELECT id FROM users WHERE username = ?)
+              AND created_at >= datetime('now', '-30 days')
+            GROUP BY hour
+            ORDER BY chats DESC
+            LIMIT ?
+        """, (username, limit))
 
-        conn.commit()
+        rows = cursor.fetchall()
         conn.close()
-        return True
+
+        return [
+            {"hour": datetime.strptime(str(row['hour']), "%H").strftime("%I:%M %p").lstrip('0'), "chats": row['chats']}
+            for row in sorted(rows, key=lambda row: row['hour'])
+        ]
     except Exception as e:
-        st.error(f"Error flagging conversation: {e}")
-        return False
+        st.error(f"Error getting popular chat times: {e}")
+        return []
+
+def archive_conversation(artist_username, customer_id):
+    """Archive a conversation"""
+    return log_audit_event(get_user_id(artist_username), 'conversation_archived', f"Conversation with customer {customer_id} archived",
+                           target_type='user', target_id=customer_id)
+
+def flag_conversation(artist_username, customer_id):
+    """Flag a conversation for review"""
+    return log_audit_event(get_user_id(artist_username), 'conversation_flagged', f"Conversation with customer {customer_id} flagged",
+                           target_type='user', target_id=customer_id)
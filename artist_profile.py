@@ -1,6 +1,12 @@
 import streamlit as st
 from datetime import datetime
-from database import get_db_connection, update_artist_profile, get_user_profile
+from database import (get_db_connection, get_artist_id, update_artist_profile, VERIFIED_PROFILE, VERIFIED_EMAIL,
+                      VERIFIED_PHONE, VERIFIED_PORTFOLIO, VERIFIED_REVIEWS, VERIFIED_BACKGROUND,
+                      BASIC_VERIFICATION, PREMIUM_VERIFICATION, MIN_REVIEWS_FOR_VERIFICATION)
+from media_store import (add_portfolio_image, delete_portfolio_image, get_portfolio_images, get_thumbnail,
+                         watch_thumbnails)
+from reviews import display_rating_summary, display_reviews
+from session import get_session_profile, invalidate_profile
 from utils import validate_email, validate_phone, sanitize_input
 
 def artist_profile_management(username, artist_profile):
@@ -91,6 +97,7 @@ def artist_profile_management(username, artist_profile):
                 success = update_artist_profile(username, profile_data)
 
                 if success:
+                    invalidate_profile(artist_profile['id'])
                     st.success("✅ Profile updated successfully!")
                     st.balloons()
 
@@ -124,17 +131,8 @@ def artist_profile_management(username, artist_profile):
             st.info("Public profile view would be implemented here")
 
 def calculate_profile_completion(artist_profile):
-    """Calculate profile completion percentage"""
-    required_fields = ['name', 'phone', 'address', 'bio', 'specializations', 'price_range']
-    optional_fields = ['email', 'experience_years', 'portfolio_url', 'areas_covered']
-
-    completed_required = sum(1 for field in required_fields if artist_profile.get(field))
-    completed_optional = sum(1 for field in optional_fields if artist_profile.get(field))
-
-    total_fields = len(required_fields) + len(optional_fields)
-    completed_fields = completed_required + completed_optional
-
-    return int((completed_fields / total_fields) * 100)
+    """Get profile completion percentage (kept current on artists.profile_completion)"""
+    return artist_profile.get('profile_completion') or 0
 
 def display_profile_info(artist_profile):
     """Display current profile information in a nice format"""
@@ -197,69 +195,42 @@ def request_featured_status(username):
 
         conn.commit()
         conn.close()
+        invalidate_profile(user_id)
         return True
     except Exception as e:
         st.error(f"Error requesting featured status: {e}")
         return False
 
-def get_artist_reviews(username):
-    """Get reviews for the artist"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT r.*, u.username as reviewer_name, b.appointment_date
-            FROM reviews r
-            JOIN bookings b ON r.booking_id = b.id
-            JOIN artists a ON b.artist_id = a.id
-            JOIN users u ON b.user_id = u.id
-            WHERE a.user_id = (SELECT id FROM users WHERE username = ?)
-            ORDER BY r.created_at DESC
-        """, (username,))
-
-        reviews = cursor.fetchall()
-        conn.close()
-
-        return [dict(review) for review in reviews]
-    except Exception as e:
-        st.error(f"Error getting reviews: {e}")
-        return []
-
 def display_artist_reviews(username):
-    """Display artist reviews"""
+    """Display the rating histogram and paginated artist reviews"""
     st.subheader("⭐ Customer Reviews")
 
-    reviews = get_artist_reviews(username)
-
-    if reviews:
-        for review in reviews:
-            with st.expander(f"⭐ {review['rating']}/5 - {review['reviewer_name']} ({review['appointment_date']})"):
-                st.write(f"**Rating:** {review['rating']}/5")
-                if review['review_text']:
-                    st.write(f"**Review:** {review['review_text']}")
-                st.caption(f"Reviewed on: {review['created_at']}")
-    else:
+    artist_id = get_artist_id(username)
+    if artist_id is None:
         st.info("No reviews yet. Complete some bookings to get reviews!")
+        return
+
+    display_rating_summary(artist_id)
+    display_reviews(artist_id)
 
 def artist_verification_status(username):
     """Display artist verification status"""
     st.subheader("✅ Verification Status")
 
-    artist_profile = get_user_profile(username)
+    artist_profile = get_session_profile()
 
     if not artist_profile:
         st.error("Profile not found")
         return
 
-    # Mock verification items
+    flags = artist_profile.get('verification_flags') or 0
     verification_items = {
-        "Profile Completion": artist_profile.get('name') and artist_profile.get('phone'),
-        "Email Verification": artist_profile.get('email'),
-        "Phone Verification": artist_profile.get('phone'),
-        "Portfolio Upload": artist_profile.get('portfolio_url'),
-        "Minimum Reviews": len(get_artist_reviews(username)) >= 3,
-        "Background Check": False  # Mock - would be real verification
+        "Profile Completion": bool(flags & VERIFIED_PROFILE),
+        "Email Verification": bool(flags & VERIFIED_EMAIL),
+        "Phone Verification": bool(flags & VERIFIED_PHONE),
+        "Portfolio Upload": bool(flags & VERIFIED_PORTFOLIO),
+        f"Minimum Reviews ({MIN_REVIEWS_FOR_VERIFICATION})": bool(flags & VERIFIED_REVIEWS),
+        "Background Check": bool(flags & VERIFIED_BACKGROUND)
     }
 
     col1, col2 = st.columns(2)
@@ -277,12 +248,9 @@ def artist_verification_status(username):
             st.write(f"{status_icon} {item}")
 
     # Overall verification status
-    basic_completed = sum(list(verification_items.values())[:3])
-    premium_completed = sum(list(verification_items.values()))
-
-    if premium_completed == len(verification_items):
+    if flags & PREMIUM_VERIFICATION == PREMIUM_VERIFICATION:
         st.success("🎉 Premium Artist Status - All verifications complete!")
-    elif basic_completed >= 3:
+    elif flags & BASIC_VERIFICATION == BASIC_VERIFICATION:
         st.success("✅ Basic Artist Status - Ready to receive bookings!")
     else:
         st.warning("⚠️ Complete basic verification to start receiving bookings")
@@ -291,6 +259,11 @@ def artist_portfolio_management(username):
     """Manage artist portfolio images and samples"""
     st.subheader("📸 Portfolio Management")
 
+    artist_id = get_artist_id(username)
+    if artist_id is None:
+        st.error("Artist profile not found")
+        return
+
     # Upload new images
     st.write("**Upload Portfolio Images**")
     uploaded_files = st.file_uploader(
@@ -301,30 +274,48 @@ def artist_portfolio_management(username):
     )
 
     if uploaded_files:
-        for file in uploaded_files:
-            st.image(file, caption=file.name, width=200)
-
         if st.button("💾 Save to Portfolio"):
-            st.success(f"Saved {len(uploaded_files)} images to portfolio!")
-
-    # Display existing portfolio
+            saved = 0
+            for file in uploaded_files:
+                try:
+                    if add_portfolio_image(artist_id, file.getvalue(), file.name):
+                        saved += 1
+                    else:
+                        st.info(f"{file.name} is already in your portfolio")
+                except ValueError as e:
+                    st.error(f"{file.name}: {e}")
+            if saved:
+                st.success(f"Saved {saved} images to portfolio! Thumbnails are being prepared.")
+
+    # Display existing portfolio as pre-sized thumbnails
     st.write("**Current Portfolio**")
-    col1, col2, col3, col4 = st.columns(4)
+    images = get_portfolio_images(artist_id)
+    columns = st.columns(4)
+
+    for i, image in enumerate(images):
+        with columns[i % 4]:
+            thumbnail = get_thumbnail(image['blob_hash'])
+            if thumbnail:
+                st.image(thumbnail, caption=image['caption'])
+            elif image['thumbnail_status'] == 'failed':
+                st.warning("Could not process this image")
+            else:
+                st.caption("⏳ Preparing thumbnail...")
 
-    # Mock portfolio images
-    for i in range(8):
-        with col1 if i % 4 == 0 else col2 if i % 4 == 1 else col3 if i % 4 == 2 else col4:
-            st.image("https://via.placeholder.com/150", caption=f"Design {i+1}")
+            if st.button(f"🗑️", key=f"delete_{image['id']}"):
+                delete_portfolio_image(artist_id, image['id'])
+                st.rerun()
 
-            if st.button(f"🗑️", key=f"delete_{i}"):
-                st.warning(f"Delete Design {i+1}")
+    if not images:
+        st.info("No portfolio images yet. Upload your best designs!")
+    watch_thumbnails(image['blob_hash'] for image in images if image['thumbnail_status'] == 'pending')
 
     # Portfolio statistics
     st.write("**Portfolio Statistics**")
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        st.metric("Total Designs", "8")
+        st.metric("Total Designs", len(images))
     with col2:
         st.metric("Views This Month", "245")
     with col3:
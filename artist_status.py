@@ -1,7 +1,8 @@
 import streamlit as st
 from datetime import datetime, timedelta
-from database import get_db_connection
-import time
+from database import get_db_connection, get_user_id, get_artist_id
+from settings_store import get_artist_settings, save_artist_settings, inactive_timeout_minutes, DEFAULT_ARTIST_SETTINGS
+import presence
 
 def artist_status_management(username):
     """Artist online/offline status management"""
@@ -45,28 +46,31 @@ def artist_status_management(username):
     # Auto status management
     st.subheader("🤖 Auto Status Management")
 
+    artist_id = get_artist_id(username)
+    settings = get_artist_settings(artist_id) if artist_id else DEFAULT_ARTIST_SETTINGS
+
     col1, col2 = st.columns(2)
 
     with col1:
-        auto_offline = st.checkbox("Auto offline when inactive", value=True)
+        auto_offline = st.checkbox("Auto offline when inactive", value=settings['auto_offline'])
         if auto_offline:
-            inactive_minutes = st.number_input("Offline after (minutes)", min_value=5, max_value=120, value=30)
+            inactive_minutes = st.number_input("Offline after (minutes)", min_value=5, max_value=120, value=settings['inactive_minutes'])
             st.caption(f"Will go offline automatically after {inactive_minutes} minutes of inactivity")
 
     with col2:
-        work_hours = st.checkbox("Set work hours", value=False)
+        work_hours = st.checkbox("Set work hours", value=settings['work_hours'])
         if work_hours:
             st.write("**Work Hours**")
             wh_col1, wh_col2 = st.columns(2)
 
             with wh_col1:
-                start_hour = st.time_input("Start Time", value=time(9, 0))
-                end_hour = st.time_input("End Time", value=time(17, 0))
+                start_hour = st.time_input("Start Time", value=datetime.strptime(settings['start_hour'], "%H:%M").time())
+                end_hour = st.time_input("End Time", value=datetime.strptime(settings['end_hour'], "%H:%M").time())
 
             with wh_col2:
                 work_days = st.multiselect("Work Days",
                     ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"],
-                    default=["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"])
+                    default=settings['work_days'] or ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"])
 
     # Save auto settings
     if st.button("💾 Save Auto Settings"):
@@ -120,19 +124,8 @@ def artist_status_management(username):
             st.info("Away mode activated")
 
 def get_artist_online_status(username):
-    """Get artist online status"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT is_online FROM users WHERE username = ?", (username,))
-        result = cursor.fetchone()
-        conn.close()
-
-        return result[0] if result else False
-    except Exception as e:
-        st.error(f"Error getting online status: {e}")
-        return False
+    """Get artist online status from live presence"""
+    return presence.is_online(get_user_id(username))
 
 def update_artist_status(username, status):
     """Update artist online status"""
@@ -147,14 +140,12 @@ def update_artist_status(username, status):
             WHERE username = ?
         """, (status, username))
 
-        # Log status change
-        cursor.execute("""
-            INSERT INTO admin_logs (admin_id, action, details, created_at)
-            VALUES ((SELECT id FROM users WHERE username = ?), 'status_change', ?, datetime('now'))
-        """, (username, f"Status changed to {'online' if status else 'offline'}"))
+        record_status_event(cursor, username, 'online' if status else 'offline')
 
         conn.commit()
         conn.close()
+
+        presence.set_online(get_user_id(username), status)
         return True
     except Exception as e:
         st.error(f"Error updating status: {e}")
@@ -178,93 +169,59 @@ def get_last_status_update(username):
         st.error(f"Error getting last update: {e}")
         return "Unknown"
 
-def get_status_history(username):
-    """Get status change history"""
+def record_status_event(cursor, username, state):
+    """Append a status change for the artist to status_events"""
+    cursor.execute("""
+        INSERT INTO status_events (artist_id, state, ts)
+        SELECT a.id, ?, datetime('now')
+        FROM artists a
+        JOIN users u ON a.user_id = u.id
+        WHERE u.username = ?
+    """, (state, username))
+
+def format_duration_seconds(duration_seconds):
+    """Format a duration in seconds as hours and minutes"""
+    hours = int(duration_seconds // 3600)
+    minutes = int((duration_seconds % 3600) // 60)
+    return f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m"
+
+def get_status_history(username, limit=50):
+    """Get status change history with how long each status lasted"""
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
         cursor.execute("""
-            SELECT action, details, created_at,
-                   strftime('%s', created_at) as timestamp_seconds
-            FROM admin_logs
-            WHERE admin_id = (SELECT id FROM users WHERE username = ?)
-              AND action = 'status_change'
-            ORDER BY created_at DESC
-        """, (username,))
+            SELECT state, ts,
+                   (julianday(LEAD(ts) OVER (ORDER BY ts, id)) - julianday(ts)) * 86400 as duration_seconds
+            FROM status_events
+            WHERE artist_id = (SELECT a.id FROM artists a JOIN users u ON a.user_id = u.id WHERE u.username = ?)
+            ORDER BY ts DESC, id DESC
+            LIMIT ?
+        """, (username, limit))
 
         records = cursor.fetchall()
         conn.close()
 
-        # Process records to add duration
-        processed_records = []
-        for i, record in enumerate(records):
-            status_info = {
-                'status': record['details'].replace('Status changed to ', ''),
-                'timestamp': record['created_at'],
-                'duration': 'Current'
-            }
-
-            if i < len(records) - 1:
-                next_time = datetime.strptime(records[i+1]['created_at'], '%Y-%m-%d %H:%M:%S')
-                current_time = datetime.strptime(record['created_at'], '%Y-%m-%d %H:%M:%S')
-                duration_seconds = (current_time - next_time).total_seconds()
-
-                if duration_seconds > 0:
-                    hours = int(duration_seconds // 3600)
-                    minutes = int((duration_seconds % 3600) // 60)
-
-                    if hours > 0:
-                        status_info['duration'] = f"{hours}h {minutes}m"
-                    else:
-                        status_info['duration'] = f"{minutes}m"
-
-            processed_records.append(status_info)
-
-        return processed_records
+        return [{
+            'status': record['state'],
+            'timestamp': record['ts'],
+            'duration': 'Current' if record['duration_seconds'] is None
+                        else format_duration_seconds(record['duration_seconds'])
+        } for record in records]
     except Exception as e:
         st.error(f"Error getting status history: {e}")
         return []
 
 def save_auto_status_settings(username, settings):
     """Save auto status settings"""
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        # Get artist ID
-        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-        user_result = cursor.fetchone()
-
-        if not user_result:
-            return False
-
-        user_id = user_result[0]
-        cursor.execute("SELECT id FROM artists WHERE user_id = ?", (user_id,))
-        artist_result = cursor.fetchone()
-
-        if not artist_result:
-            return False
-
-        artist_id = artist_result[0]
-
-        # Store settings as JSON string (simplified for SQLite)
-        settings_json = str(settings)
-
-        cursor.execute("""
-            UPDATE artists SET
-            specializations = ?,
-            updated_at = datetime('now')
-            WHERE id = ?
-        """, (settings_json, artist_id))
-
-        conn.commit()
-        conn.close()
-        return True
-    except Exception as e:
-        st.error(f"Error saving auto settings: {e}")
+    artist_id = get_artist_id(username)
+    if not artist_id or not save_artist_settings(artist_id, settings):
         return False
 
+    presence.set_timeout(get_user_id(username), inactive_timeout_minutes(artist_id))
+    return True
+
 def set_busy_mode(username):
     """Set artist to busy mode"""
     try:
@@ -278,14 +235,12 @@ def set_busy_mode(username):
             WHERE username = ?
         """, (username,))
 
-        # Log busy mode
-        cursor.execute("""
-            INSERT INTO admin_logs (admin_id, action, details, created_at)
-            VALUES ((SELECT id FROM users WHERE username = ?), 'busy_mode', 'Busy mode activated', datetime('now'))
-        """, (username,))
+        record_status_event(cursor, username, 'busy')
 
         conn.commit()
         conn.close()
+
+        presence.set_online(get_user_id(username), False)
         return True
     except Exception as e:
         st.error(f"Error setting busy mode: {e}")
@@ -304,14 +259,12 @@ def set_break_time(username):
             WHERE username = ?
         """, (username,))
 
-        # Log break time
-        cursor.execute("""
-            INSERT INTO admin_logs (admin_id, action, details, created_at)
-            VALUES ((SELECT id FROM users WHERE username = ?), 'break_time', 'Break time activated', datetime('now'))
-        """, (username,))
+        record_status_event(cursor, username, 'break')
 
         conn.commit()
         conn.close()
+
+        presence.set_online(get_user_id(username), False)
         return True
     except Exception as e:
         st.error(f"Error setting break time: {e}")
@@ -330,65 +283,72 @@ def set_away_mode(username):
             WHERE username = ?
         """, (username,))
 
-        # Log away mode
-        cursor.execute("""
-            INSERT INTO admin_logs (admin_id, action, details, created_at)
-            VALUES ((SELECT id FROM users WHERE username = ?), 'away_mode', 'Away mode activated', datetime('now'))
-        """, (username,))
+        record_status_event(cursor, username, 'away')
 
         conn.commit()
         conn.close()
+
+        presence.set_online(get_user_id(username), False)
         return True
     except Exception as e:
         st.error(f"Error setting away mode: {e}")
         return False
 
-def get_status_statistics(username):
-    """Get status statistics for the artist"""
+def get_status_timeline(username, days=7):
+    """Get online hours, status changes and bookings per day for the last `days` days"""
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        # Get total online time today
+        # Each event lasts until the next one (LEAD); online spans are clipped to each day
         cursor.execute("""
-            SELECT COUNT(*) FROM admin_logs
-            WHERE admin_id = (SELECT id FROM users WHERE username = ?)
-              AND action = 'status_change'
-              AND details LIKE '%online%'
-              AND DATE(created_at) = DATE('now')
-        """, (username,))
-
-        online_changes = cursor.fetchone()[0]
-
-        # Get total time online this week
-        cursor.execute("""
-            SELECT SUM(CASE
-                WHEN details LIKE '%online%' THEN 1
-                WHEN details LIKE '%offline%' THEN -1
-                ELSE 0
-            END) as net_status
-            FROM admin_logs
-            WHERE admin_id = (SELECT id FROM users WHERE username = ?)
-              AND action = 'status_change'
-              AND DATE(created_at) >= DATE('now', '-7 days')
-        """, (username,))
-
-        net_status = cursor.fetchone()[0]
-
+            WITH RECURSIVE days(day) AS (
+                SELECT date('now', :offset)
+                UNION ALL
+                SELECT date(day, '+1 day') FROM days WHERE day < date('now')
+            ),
+            artist AS (
+                SELECT a.id FROM artists a JOIN users u ON a.user_id = u.id WHERE u.username = :username
+            ),
+            spans AS (
+                SELECT state, ts as started,
+                       COALESCE(LEAD(ts) OVER (ORDER BY ts, id), datetime('now')) as ended
+                FROM status_events
+                WHERE artist_id = (SELECT id FROM artist)
+                  AND ts >= COALESCE((SELECT MAX(ts) FROM status_events
+                                      WHERE artist_id = (SELECT id FROM artist)
+                                        AND ts < date('now', :offset)), '')
+            )
+            SELECT d.day as date,
+                   COALESCE(SUM(CASE WHEN s.state = 'online' THEN
+                       MAX(0, julianday(MIN(s.ended, datetime(d.day, '+1 day'))) - julianday(MAX(s.started, d.day)))
+                   END), 0) * 24 as online_hours,
+                   COUNT(CASE WHEN s.started >= d.day THEN 1 END) as status_changes,
+                   COALESCE((SELECT total_bookings FROM booking_daily_stats
+                             WHERE artist_id = (SELECT id FROM artist) AND day = d.day), 0) as bookings
+            FROM days d
+            LEFT JOIN spans s ON s.started < datetime(d.day, '+1 day') AND s.ended > d.day
+            GROUP BY d.day
+            ORDER BY d.day DESC
+        """, {'username': username, 'offset': f"-{days - 1} days"})
+
+        timeline = [dict(row) for row in cursor.fetchall()]
         conn.close()
-
-        return {
-            'online_changes_today': online_changes,
-            'net_status_week': net_status if net_status else 0,
-            'is_currently_online': get_artist_online_status(username)
-        }
+        return timeline
     except Exception as e:
-        st.error(f"Error getting status statistics: {e}")
-        return {
-            'online_changes_today': 0,
-            'net_status_week': 0,
-            'is_currently_online': False
-        }
+        st.error(f"Error getting status timeline: {e}")
+        return []
+
+def get_status_statistics(username):
+    """Get status statistics for the artist"""
+    timeline = get_status_timeline(username)
+
+    return {
+        'status_changes_today': timeline[0]['status_changes'] if timeline else 0,
+        'online_hours_week': sum(day['online_hours'] for day in timeline),
+        'is_currently_online': get_artist_online_status(username),
+        'timeline': timeline
+    }
 
 def display_status_analytics(username):
     """Display status analytics"""
@@ -399,10 +359,10 @@ def display_status_analytics(username):
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        st.metric("Status Changes Today", stats['online_changes_today'])
+        st.metric("Status Changes Today", stats['status_changes_today'])
 
     with col2:
-        st.metric("Net Online (Week)", f"{stats['net_status_week']} days")
+        st.metric("Online Hours (Week)", f"{stats['online_hours_week']:.1f}")
 
     with col3:
         status_text = "🟢 Online" if stats['is_currently_online'] else "🔴 Offline"
@@ -411,23 +371,13 @@ def display_status_analytics(username):
     # Status timeline
     st.subheader("📈 Status Timeline (Last 7 Days)")
 
-    # Mock timeline data
-    timeline_data = [
-        {"date": "2024-01-10", "online_hours": 6, "bookings": 3},
-        {"date": "2024-01-09", "online_hours": 8, "bookings": 5},
-        {"date": "2024-01-08", "online_hours": 4, "bookings": 2},
-        {"date": "2024-01-07", "online_hours": 7, "bookings": 4},
-        {"date": "2024-01-06", "online_hours": 5, "bookings": 3},
-        {"date": "2024-01-05", "online_hours": 6, "bookings": 4},
-        {"date": "2024-01-04", "online_hours": 8, "bookings": 6}
-    ]
-
-    for day in timeline_data:
+    for day in stats['timeline']:
         with st.expander(f"📅 {day['date']}"):
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("Online Hours", day['online_hours'])
+                st.metric("Online Hours", f"{day['online_hours']:.1f}")
             with col2:
                 st.metric("Bookings", day['bookings'])
             with col3:
-                st.metric("Hourly Rate", f"{day['bookings']/day['online_hours']:.1f}")
+                hourly_rate = day['bookings'] / day['online_hours'] if day['online_hours'] else 0
+                st.metric("Bookings per Online Hour", f"{hourly_rate:.1f}")
@@ -0,0 +1,234 @@
+"""
+Audit log for Mehndi App
+Events are appended to audit_log with the acting user's id and role. The admin viewer
+reads it a page at a time through (filter, created_at, id) indexes, and each month past
+the retention window is archived to its own file and then deleted.
+Run: python audit_log.py prune | bench [rows]
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import streamlit as st
+import database
+from database import get_db_connection, init_database
+from exports import EXPORT_FORMATS, export_query, parquet_available
+
+AUDIT_PAGE_SIZE = 50
+RETENTION_MONTHS = int(os.environ.get('MEHNDI_AUDIT_RETENTION_MONTHS', 24))
+ARCHIVE_DIR = os.environ.get('MEHNDI_AUDIT_ARCHIVE_DIR', 'audit_archive')
+PRUNE_BATCH_ROWS = 10000
+
+# Action code -> label shown in the viewer
+AUDIT_ACTIONS = {
+    'artist_approved': 'Artist approved',
+    'artist_rejected': 'Artist rejected',
+    'artist_suspended': 'Artist suspended',
+    'chat_archived': 'Chat archived',
+    'conversation_archived': 'Conversation archived',
+    'conversation_flagged': 'Conversation flagged',
+}
+ACTOR_ROLES = ['admin', 'artist', 'user']
+
+AUDIT_EXPORT_COLUMNS = [
+    ('id', 'int'), ('actor_id', 'int'), ('actor_role', 'text'), ('action', 'text'),
+    ('target_type', 'text'), ('target_id', 'int'), ('details', 'text'), ('created_at', 'text'),
+]
+AUDIT_MONTH_QUERY = """
+    SELECT id, actor_id, actor_role, action, target_type, target_id, details, created_at
+    FROM audit_log
+    WHERE created_at >= ? AND created_at < ?
+    ORDER BY created_at, id
+"""
+
+def get_audit_page(action=None, actor_role=None, start_date=None, end_date=None, after=None,
+                   page_size=AUDIT_PAGE_SIZE):
+    """Get one page of audit events, newest first.
+
+    Dates are inclusive 'YYYY-MM-DD' strings. `after` is the (created_at, id) cursor
+    returned with the previous page; the next cursor is None on the last page.
+    """
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        query = """
+            SELECT l.id, l.actor_id, l.actor_role, l.action, l.target_type, l.target_id,
+                   l.details, l.created_at, u.username as actor_name
+            FROM audit_log l
+            LEFT JOIN users u ON l.actor_id = u.id
+            WHERE 1 = 1
+        """
+        params = []
+
+        if action:
+            query += " AND l.action = ?"
+            params.append(action)
+        if actor_role:
+            # With an action as well, unary + keeps the planner on the narrower action index
+            query += " AND +l.actor_role = ?" if action else " AND l.actor_role = ?"
+            params.append(actor_role)
+        if start_date:
+            query += " AND l.created_at >= ?"
+            params.append(str(start_date))
+        if end_date:
+            query += " AND l.created_at < date(?, '+1 day')"
+            params.append(str(end_date))
+        if after:
+            query += " AND (l.created_at, l.id) < (?, ?)"
+            params.extend(after)
+
+        query += " ORDER BY l.created_at DESC, l.id DESC LIMIT ?"
+        params.append(page_size + 1)
+
+        cursor.execute(query, params)
+        events = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+
+        next_cursor = None
+        if len(events) > page_size:
+            events = events[:page_size]
+            next_cursor = (events[-1]['created_at'], events[-1]['id'])
+        return events, next_cursor
+    except Exception as e:
+        st.error(f"Error loading audit log: {e}")
+        return [], None
+
+def expired_months(retention_months=RETENTION_MONTHS):
+    """Months ('YYYY-MM') that hold events older than the retention window, oldest first"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # One index seek per month: the oldest event at or after the previous month's end
+    months = []
+    month_start = ''
+    while True:
+        cursor.execute("""
+            SELECT strftime('%Y-%m', MIN(created_at)) FROM audit_log
+            WHERE created_at >= ? AND created_at < date('now', 'start of month', ?)
+        """, (month_start, f"-{retention_months} months"))
+        month = cursor.fetchone()[0]
+        if month is None:
+            break
+        months.append(month)
+        month_start = _month_bounds(month)[1]
+
+    conn.close()
+    return months
+
+def _month_bounds(month):
+    """First day of `month` and of the month after it"""
+    year, number = map(int, month.split('-'))
+    following = f"{year + number // 12:04d}-{number % 12 + 1:02d}"
+    return f"{month}-01", f"{following}-01"
+
+def archive_month(month, archive_dir=ARCHIVE_DIR):
+    """Write one month of events to archive_dir/audit-YYYY-MM.<ext>; returns the file path"""
+    label = 'Parquet' if parquet_available() else 'CSV'
+    extension = EXPORT_FORMATS[label][0]
+    path = os.path.join(archive_dir, f"audit-{month}.{extension}")
+    os.makedirs(archive_dir, exist_ok=True)
+
+    output = export_query(AUDIT_MONTH_QUERY, _month_bounds(month), AUDIT_EXPORT_COLUMNS, extension)
+    with output, open(f"{path}.tmp", 'wb') as archive:
+        shutil.copyfileobj(output, archive)
+    os.replace(f"{path}.tmp", path)
+    return path
+
+def delete_month(month):
+    """Delete one month of events in short batches so app writes are never blocked for long"""
+    start, end = _month_bounds(month)
+    conn = get_db_connection()
+    deleted = 0
+    try:
+        while True:
+            cursor = conn.execute("""
+                DELETE FROM audit_log WHERE id IN (
+                    SELECT id FROM audit_log WHERE created_at >= ? AND created_at < ? LIMIT ?
+                )
+            """, (start, end, PRUNE_BATCH_ROWS))
+            conn.commit()
+            if cursor.rowcount == 0:
+                return deleted
+            deleted += cursor.rowcount
+    finally:
+        conn.close()
+
+def prune_audit_log(retention_months=RETENTION_MONTHS, archive_dir=ARCHIVE_DIR):
+    """Archive (unless archive_dir is None) and delete every month past retention; returns {month: rows}"""
+    pruned = {}
+    for month in expired_months(retention_months):
+        if archive_dir:
+            archive_month(month, archive_dir)
+        pruned[month] = delete_month(month)
+    return pruned
+
+def _time_ms(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, (time.perf_counter() - started) * 1000
+
+def benchmark(rows=1_000_000):
+    """Page, filter and prune `rows` events spread over three years in a scratch database"""
+    scratch = tempfile.mkdtemp(prefix='mehndi-audit-')
+    db_path = database.DB_PATH
+    database.DB_PATH = os.path.join(scratch, 'bench.db')
+
+    try:
+        init_database()
+        conn = get_db_connection()
+        conn.execute("INSERT INTO users (username, password, role) VALUES ('bench-admin', '-', 'admin')")
+        conn.execute("INSERT INTO users (username, password, role) VALUES ('bench-artist', '-', 'artist')")
+        # One event in a hundred is an admin action; the rest is artist chat housekeeping
+        conn.execute("""
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < :rows)
+            INSERT INTO audit_log (actor_id, actor_role, action, target_type, target_id, created_at)
+            SELECT CASE WHEN i % 100 = 0 THEN (SELECT id FROM users WHERE username = 'bench-admin')
+                        ELSE (SELECT id FROM users WHERE username = 'bench-artist') END,
+                   CASE WHEN i % 100 = 0 THEN 'admin' ELSE 'artist' END,
+                   CASE WHEN i % 100 = 0 THEN 'artist_approved' WHEN i % 2 THEN 'chat_archived' ELSE 'conversation_flagged' END,
+                   'artist', i % 5000,
+                   datetime('now', '-' || CAST((:rows - i) * 1095.0 * 86400 / :rows AS INTEGER) || ' seconds')
+            FROM n
+        """, {'rows': rows})
+        conn.commit()
+        conn.close()
+
+        # A cursor halfway back stands in for a user who has paged deep into the log
+        middle = datetime.now() - timedelta(days=548)
+        deep_cursor = (middle.strftime('%Y-%m-%d %H:%M:%S'), rows)
+
+        results = {
+            'first page': _time_ms(get_audit_page)[1],
+            'deep page': _time_ms(get_audit_page, after=deep_cursor)[1],
+            'admins only, deep': _time_ms(get_audit_page, actor_role='admin', after=deep_cursor)[1],
+            'one action, deep': _time_ms(get_audit_page, action='artist_approved', after=deep_cursor)[1],
+            'one week': _time_ms(get_audit_page, start_date=(middle - timedelta(days=6)).date(),
+                                 end_date=middle.date())[1],
+        }
+        pruned, results['archive and prune'] = _time_ms(prune_audit_log, 24, os.path.join(scratch, 'archive'))
+        results['pruned rows'] = sum(pruned.values())
+        return results
+    finally:
+        database.DB_PATH = db_path
+        shutil.rmtree(scratch, ignore_errors=True)
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+
+    if command == "prune":
+        init_database()
+        for month, deleted in prune_audit_log().items():
+            print(f"🗄️ {month}: archived and deleted {deleted:,} events")
+    elif command == "bench":
+        rows = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+        results = benchmark(rows)
+        pruned = results.pop('pruned rows')
+        for name, ms in results.items():
+            print(f"📜 {name}: {ms:.1f} ms")
+        print(f"🗄️ {pruned:,} of {rows:,} events archived and deleted")
+    else:
+        print("Usage: python audit_log.py prune | bench [rows]")
@@ -1,80 +1,179 @@
 import bcrypt
+import os
 import sqlite3
-from database import get_db_connection
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from database import get_db_connection, init_database
+import presence
 import streamlit as st
 
+# bcrypt releases the GIL, so a small thread pool bounds how many hashes run at once
+# without tying up the Streamlit script threads of other sessions.
+BCRYPT_ROUNDS = int(os.environ.get('MEHNDI_BCRYPT_ROUNDS', 12))
+BCRYPT_WORKERS = int(os.environ.get('MEHNDI_BCRYPT_WORKERS', 4))
+LOGIN_LATENCY_SAMPLES = 1000
+
+_bcrypt_pool = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix='bcrypt')
+_metrics_lock = threading.Lock()
+_bcrypt_pending = 0
+_login_latencies = deque(maxlen=LOGIN_LATENCY_SAMPLES)
+
+def _run_bcrypt(func, *args):
+    """Run a bcrypt call on the worker pool and wait for its result"""
+    global _bcrypt_pending
+    with _metrics_lock:
+        _bcrypt_pending += 1
+    try:
+        return _bcrypt_pool.submit(func, *args).result()
+    finally:
+        with _metrics_lock:
+            _bcrypt_pending -= 1
+
+def _hash_password(password):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
+
+def _verify_password(password, hashed):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
 def hash_password(password):
     """Hash a password using bcrypt"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return _run_bcrypt(_hash_password, password)
 
 def verify_password(password, hashed):
     """Verify a password against its hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    return _run_bcrypt(_verify_password, password, hashed)
+
+def password_needs_rehash(hashed):
+    """Whether a hash was made with a different work factor than BCRYPT_ROUNDS"""
+    try:
+        return int(hashed.split('$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+def _percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def get_login_metrics():
+    """Get login latency percentiles (ms) over recent logins and the bcrypt queue depth"""
+    with _metrics_lock:
+        latencies = sorted(_login_latencies)
+        pending = _bcrypt_pending
+
+    return {
+        'logins': len(latencies),
+        'p50_ms': _percentile(latencies, 0.5) * 1000 if latencies else 0,
+        'p99_ms': _percentile(latencies, 0.99) * 1000 if latencies else 0,
+        'in_flight': pending,
+        'queue_depth': max(0, pending - BCRYPT_WORKERS),
+    }
 
 def create_user(username, password, role):
     """Create a new user in the database"""
+    hashed_password = hash_password(password)
+
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        # Check if user already exists
-        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
-        if cursor.fetchone():
-            conn.close()
-            return False
-
-        # Insert new user
-        hashed_password = hash_password(password)
+        # The UNIQUE constraint on username rejects duplicates, even under concurrent registration
         cursor.execute("""
             INSERT INTO users (username, password, role, created_at)
             VALUES (?, ?, ?, datetime('now'))
+            RETURNING id
         """, (username, hashed_password, role))
+        user_id = cursor.fetchone()[0]
 
-        # If artist, create artist profile
+        # If artist, create artist profile in the same transaction
         if role == 'artist':
             cursor.execute("""
                 INSERT INTO artists (user_id, name, status)
-                VALUES ((SELECT id FROM users WHERE username = ?), ?, 'pending')
-            """, (username, username))
+                VALUES (?, ?, 'pending')
+            """, (user_id, username))
 
         conn.commit()
         conn.close()
         return True
+    except sqlite3.IntegrityError:
+        conn.close()
+        return False
     except Exception as e:
         st.error(f"Error creating user: {e}")
         return False
 
+def import_users(users, role):
+    """Create many users of one role from (username, password) pairs; returns how many were created"""
+    users = list(users)
+    hashed_passwords = list(_bcrypt_pool.map(lambda user: _hash_password(user[1]), users))
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        # Existing usernames are skipped rather than failing the whole batch
+        cursor.executemany("""
+            INSERT OR IGNORE INTO users (username, password, role, created_at)
+            VALUES (?, ?, ?, datetime('now'))
+        """, [(username, hashed, role) for (username, _), hashed in zip(users, hashed_passwords)])
+        created = cursor.rowcount
+
+        if role == 'artist':
+            cursor.executemany("""
+                INSERT INTO artists (user_id, name, status)
+                SELECT u.id, u.username, 'pending' FROM users u
+                WHERE u.username = ? AND u.role = 'artist'
+                  AND NOT EXISTS (SELECT 1 FROM artists a WHERE a.user_id = u.id)
+            """, [(username,) for username, _ in users])
+
+        conn.commit()
+        conn.close()
+        return created
+    except Exception as e:
+        st.error(f"Error importing users: {e}")
+        return 0
+
 def authenticate_user(username, password, role):
     """Authenticate a user"""
+    started = time.perf_counter()
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute("SELECT password FROM users WHERE username = ? AND role = ?", (username, role))
+        cursor.execute("SELECT id, password FROM users WHERE username = ? AND role = ?", (username, role))
         result = cursor.fetchone()
+        conn.close()
+
+        # The connection is released before the slow bcrypt check
+        if not result or not verify_password(password, result['password']):
+            return False
+
+        user_id = result['id']
+        new_hash = hash_password(password) if password_needs_rehash(result['password']) else None
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        if new_hash:
+            # Upgrade hashes made with an older work factor while we have the plaintext
+            cursor.execute("UPDATE users SET password = ? WHERE id = ?", (new_hash, user_id))
 
-        if result and verify_password(password, result[0]):
-            # If artist, update status to 'approved' on successful login
-            if role == 'artist':
-                try:
-                    cursor.execute("""
-                        UPDATE artists SET status = 'approved'
-                        WHERE user_id = (SELECT id FROM users WHERE username = ?)
-                    """, (username,))
-                    conn.commit()
-                except Exception as e:
-                    st.error(f"Error updating artist status on login: {e}")
-
-            conn.close()
-            return True
+        # If artist, update status to 'approved' on successful login
+        if role == 'artist':
+            try:
+                cursor.execute("UPDATE artists SET status = 'approved' WHERE user_id = ?", (user_id,))
+            except Exception as e:
+                st.error(f"Error updating artist status on login: {e}")
 
+        conn.commit()
         conn.close()
-        return False
+        return True
     except Exception as e:
         st.error(f"Authentication error: {e}")
         return False
-
-
+    finally:
+        with _metrics_lock:
+            _login_latencies.append(time.perf_counter() - started)
 
 def update_user_status(username, status):
     """Update user online status"""
@@ -85,10 +184,15 @@ def update_user_status(username, status):
         cursor.execute("""
             UPDATE users SET last_active = datetime('now'), is_online = ?
             WHERE username = ?
+            RETURNING id
         """, (status, username))
 
+        result = cursor.fetchone()
         conn.commit()
         conn.close()
+
+        if result:
+            presence.set_online(result[0], status)
         return True
     except Exception as e:
         st.error(f"Error updating status: {e}")
@@ -149,3 +253,15 @@ def update_artist_profile(username, profile_data):
     except Exception as e:
         st.error(f"Error updating profile: {e}")
         return False
+
+if __name__ == "__main__":
+    import csv
+    import sys
+
+    if len(sys.argv) == 4 and sys.argv[1] == "import-users":
+        init_database()
+        with open(sys.argv[2], newline='') as f:
+            rows = [(row['username'], row['password']) for row in csv.DictReader(f)]
+        print(f"✅ Created {import_users(rows, sys.argv[3])} of {len(rows)} {sys.argv[3]} accounts")
+    else:
+        print("Usage: python auth.py import-users <file.csv> <user|artist|admin>")
@@ -1,7 +1,9 @@
 import streamlit as st
 from datetime import datetime, date, time, timedelta
-from database import get_db_connection, create_booking, get_user_bookings, get_artist_availability, get_nearby_artists
-import pandas as pd
+from database import get_db_connection, create_booking, get_user_bookings, get_artist_availability, get_nearby_artists, get_booked_times
+from reviews import review_form
+from settings_store import get_artist_settings
+from session import current_session
 
 def booking_system():
     st.subheader("Book Your Mehndi Appointment")
@@ -24,38 +26,41 @@ def book_new_appointment():
         # Get real artists from database
         artists = get_nearby_artists(location)
 
-        if artists:
-            # Artist selection
-            st.subheader("Select Artist")
+        if not artists:
+            st.info("No artists found near this location. Try a nearby city or area.")
+            return
 
-            artist_options = []
-            for artist in artists:
-                rating = artist.get('avg_rating', 0)
-                rating_display = f"{rating:.1f}" if rating else "New"
-                price_range = artist.get('price_range', '₹500-1500')
-                # Mock distance for now - would use geocoding
-                distance = f"{artists.index(artist) + 1}.0 km"
+        # Artist selection
+        st.subheader("Select Artist")
 
-                artist_options.append(f"{artist['name']} (⭐{rating_display} • {price_range} • {distance})")
+        artist_options = []
+        for artist in artists:
+            rating = artist.get('avg_rating', 0)
+            rating_display = f"{rating:.1f}" if rating else "New"
+            price_range = artist.get('price_range', '₹500-1500')
+            # Mock distance for now - would use geocoding
+            distance = f"{artists.index(artist) + 1}.0 km"
 
-            selected_artist_option = st.selectbox(
-                "Choose an artist",
-                options=artist_options,
-                key="artist_select"
-            )
+            artist_options.append(f"{artist['name']} (⭐{rating_display} • {price_range} • {distance})")
 
-            if selected_artist_option:
-                # Get the selected artist
-                selected_index = artist_options.index(selected_artist_option)
-                selected_artist = artists[selected_index]
-                artist_id = selected_artist['id']
+        selected_artist_option = st.selectbox(
+            "Choose an artist",
+            options=artist_options,
+            key="artist_select"
+        )
+
+        # Get the selected artist
+        selected_index = artist_options.index(selected_artist_option)
+        selected_artist = artists[selected_index]
+        artist_id = selected_artist['id']
+        artist_settings = get_artist_settings(artist_id)
 
         # Date selection
         st.subheader("Select Date")
         selected_date = st.date_input(
             "Choose appointment date",
             min_value=date.today(),
-            max_value=date.today() + timedelta(days=30),
+            max_value=date.today() + timedelta(days=artist_settings['advance_booking_days']),
             key="date_select"
         )
 
@@ -63,17 +68,24 @@ def book_new_appointment():
             # Time slots
             st.subheader("Available Time Slots")
 
-            # Mock available slots - in real app, this would come from database
+            # Standard daily slots, minus those that clash with existing bookings plus buffer time
             available_slots = [
                 "09:00 AM", "10:00 AM", "11:00 AM", "02:00 PM", "03:00 PM", "04:00 PM"
             ]
+            booked_times = get_booked_times(artist_id, selected_date)
+            available_slots = [
+                slot for slot in available_slots
+                if is_slot_free(slot, booked_times, artist_settings['buffer_time'])
+            ]
+            if not available_slots:
+                st.info("No free slots on this date. Please choose another day.")
 
             cols = st.columns(3)
             selected_slot = None
 
             for i, slot in enumerate(available_slots):
                 with cols[i % 3]:
-                    if st.button(slot, key=f"slot_{i}"):
+                    if st.button(slot, key=f"slot_{slot}"):
                         selected_slot = slot
 
             if selected_slot:
@@ -114,17 +126,22 @@ def book_new_appointment():
                         else:
                             # Create booking in database
                             booking_id = create_booking(
-                                user_id=st.session_state.user_id if 'user_id' in st.session_state else 1,  # Use actual user ID
+                                user_id=current_session()['user_id'],
                                 artist_id=artist_id,
                                 appointment_date=selected_date,
                                 start_time=selected_slot,
-                                end_time=(datetime.strptime(selected_slot, "%I:%M %p") + timedelta(hours=2)).strftime("%I:%M %p"),
+                                end_time=(datetime.strptime(selected_slot, "%I:%M %p") + BOOKING_DURATION).strftime("%I:%M %p"),
                                 amount=min_price,
-                                notes=special_requests
+                                notes=special_requests,
+                                service_type=mehndi_type,
+                                status='confirmed' if artist_settings['auto_accept_bookings'] else 'pending'
                             )
 
                             if booking_id:
-                                st.success("🎉 Booking confirmed!")
+                                if artist_settings['auto_accept_bookings']:
+                                    st.success("🎉 Booking confirmed!")
+                                else:
+                                    st.success("🎉 Booking requested! The artist will confirm it shortly.")
                                 st.write(f"**Booking ID:** {booking_id}")
                                 st.write(f"**Artist:** {selected_artist['name']}")
                                 st.write(f"**Date:** {selected_date}")
@@ -136,11 +153,37 @@ def book_new_appointment():
                             else:
                                 st.error("Failed to create booking. Please try again.")
 
+BOOKING_DURATION = timedelta(hours=2)
+
+def parse_slot_time(value):
+    """Parse a stored booking time such as '09:00 AM' or '14:00'"""
+    for fmt in ("%I:%M %p", "%H:%M", "%H:%M:%S"):
+        try:
+            return datetime.strptime(value, fmt)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+def is_slot_free(slot, booked_times, buffer_minutes):
+    """Whether a slot, padded by the artist's buffer time, overlaps no existing booking"""
+    start = parse_slot_time(slot)
+    end = start + BOOKING_DURATION
+    buffer = timedelta(minutes=buffer_minutes)
+
+    for booked_start, booked_end in booked_times:
+        booked_start = parse_slot_time(booked_start)
+        if booked_start is None:
+            continue
+        booked_end = parse_slot_time(booked_end) or booked_start + BOOKING_DURATION
+        if start < booked_end + buffer and booked_start < end + buffer:
+            return False
+    return True
+
 def my_bookings():
     st.subheader("My Bookings")
 
     # Get real bookings from database
-    user_id = st.session_state.user_id if 'user_id' in st.session_state else 1
+    user_id = current_session()['user_id']
     bookings = get_user_bookings(user_id)
 
     if bookings:
@@ -176,8 +219,10 @@ def my_bookings():
                                 st.info("Reschedule functionality would be here")
 
                     elif booking['status'] == 'completed':
-                        if st.button("Rate Artist", key=f"rate_{booking['id']}"):
-                            st.info("Rating system would be here")
+                        if booking['reviewed']:
+                            st.write("⭐ Reviewed")
+                        elif st.toggle("Rate Artist", key=f"rate_{booking['id']}"):
+                            review_form(booking['id'], user_id)
 
     else:
         st.info("No bookings found. Book your first appointment!")
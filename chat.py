@@ -1,12 +1,13 @@
 import streamlit as st
 from datetime import datetime
 from database import get_db_connection
+from presence import apply_presence
+from session import current_session
 import time
 
-import streamlit as st
-from datetime import datetime
-from database import get_db_connection
-import time
+# Only the latest messages are fetched and rendered; older ones load on request
+CHAT_WINDOW = 30
+IMAGE_MESSAGE_TEXT = "📷 Image"
 
 def get_artist_location(artist_id):
     """Fetch artist location (address) from the database"""
@@ -34,14 +35,14 @@ def chat_interface():
     cursor = conn.cursor()
 
     cursor.execute("""
-        SELECT a.id, a.name, u.is_online
+        SELECT a.id, a.name, a.user_id
         FROM artists a
-        JOIN users u ON a.user_id = u.id
         WHERE a.status = 'approved'
-        ORDER BY u.is_online DESC, a.name
+        ORDER BY a.name
     """)
 
-    artists = cursor.fetchall()
+    artists = apply_presence([dict(artist) for artist in cursor.fetchall()])
+    artists.sort(key=lambda artist: not artist['is_online'])
     conn.close()
 
     if artists:
@@ -58,9 +59,14 @@ def chat_interface():
             selected_index = artist_options.index(selected_artist_option)
             selected_artist = artists[selected_index]
 
-            # Load chat history
-            current_user_id = st.session_state.user_id if 'user_id' in st.session_state else 1
-            chat_history = get_chat_history(current_user_id, selected_artist['id'])
+            # Load the visible window of the chat history
+            current_user_id = current_session()['user_id']
+            artist_user_id = selected_artist['user_id']
+            window_key = f"chat_window_{artist_user_id}"
+            window = st.session_state.get(window_key, CHAT_WINDOW)
+            chat_history = get_chat_history(current_user_id, artist_user_id, limit=window + 1)
+            has_earlier = len(chat_history) > window
+            chat_history = chat_history[-window:]
 
             # Display chat messages
             st.write(f"**Chatting with: {selected_artist['name']}**")
@@ -75,19 +81,30 @@ def chat_interface():
             else:
                 st.info("Artist location not available.")
 
+            if has_earlier and st.button("⬆️ Load earlier messages", key=f"chat_earlier_{artist_user_id}"):
+                st.session_state[window_key] = window + CHAT_WINDOW
+                st.rerun()
+
             if chat_history:
+                pending_images = []
                 for message in chat_history:
                     if message['sender_id'] == current_user_id:
                         with st.chat_message("user"):
-                            st.write(message['message'])
+                            display_message_content(message, pending_images)
                             st.caption(message['created_at'])
                     else:
                         with st.chat_message("assistant"):
-                            st.write(message['message'])
+                            display_message_content(message, pending_images)
                             st.caption(f"{selected_artist['name']} • {message['created_at']}")
+
+                if pending_images:
+                    from media_store import watch_thumbnails
+                    watch_thumbnails(pending_images)
             else:
                 st.info("No previous messages. Start the conversation!")
 
+            image_sharing_interface(current_user_id, artist_user_id)
+
             # Chat input
             user_input = st.chat_input("Type your message...")
 
@@ -95,7 +112,7 @@ def chat_interface():
                 # Send message to database
                 success = send_message(
                     sender_id=current_user_id,
-                    receiver_id=selected_artist['id'],
+                    receiver_id=artist_user_id,
                     message=user_input
                 )
 
@@ -106,16 +123,36 @@ def chat_interface():
     else:
         st.info("No artists available for chat at the moment.")
 
-def send_message(sender_id, receiver_id, message, message_type="text"):
+def display_message_content(message, pending_images):
+    """Render a message body; images show their thumbnail, and the full size only on request"""
+    if message['message_type'] != 'image' or not message['blob_hash']:
+        st.write(message['message'])
+        return
+
+    from media_store import get_thumbnail
+
+    thumbnail = get_thumbnail(message['blob_hash'])
+    if not thumbnail:
+        st.caption("⏳ Preparing image...")
+        pending_images.append(message['blob_hash'])
+    elif st.toggle("🔍 Full size", key=f"chat_image_{message['id']}"):
+        st.image(get_thumbnail(message['blob_hash'], 'large') or thumbnail)
+    else:
+        st.image(thumbnail)
+
+    if message['message'] != IMAGE_MESSAGE_TEXT:
+        st.write(message['message'])
+
+def send_message(sender_id, receiver_id, message, message_type="text", blob_hash=None):
     """Send a message between users"""
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
         cursor.execute("""
-            INSERT INTO chat_messages (sender_id, receiver_id, message, message_type, created_at)
-            VALUES (?, ?, ?, ?, datetime('now'))
-        """, (sender_id, receiver_id, message, message_type))
+            INSERT INTO chat_messages (sender_id, receiver_id, message, message_type, blob_hash, created_at)
+            VALUES (?, ?, ?, ?, ?, datetime('now'))
+        """, (sender_id, receiver_id, message, message_type, blob_hash))
 
         conn.commit()
         conn.close()
@@ -124,25 +161,42 @@ def send_message(sender_id, receiver_id, message, message_type="text"):
         st.error(f"Error sending message: {e}")
         return False
 
-def get_chat_history(user_id, other_user_id):
-    """Get chat history between two users"""
+def send_image_message(sender_id, receiver_id, content, caption=""):
+    """Store an image and send it as a chat message"""
+    from media_store import store_image
+
+    try:
+        blob_hash = store_image(content)
+    except ValueError as e:
+        st.error(str(e))
+        return False
+    return send_message(sender_id, receiver_id, caption or IMAGE_MESSAGE_TEXT, "image", blob_hash)
+
+def get_chat_history(user_id, other_user_id, limit=None):
+    """Get chat history between two users, oldest first; with a limit, only the latest messages"""
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute("""
+        query = """
             SELECT cm.*, u.username as sender_name
             FROM chat_messages cm
             JOIN users u ON cm.sender_id = u.id
             WHERE (cm.sender_id = ? AND cm.receiver_id = ?)
                OR (cm.sender_id = ? AND cm.receiver_id = ?)
-            ORDER BY cm.created_at ASC
-        """, (user_id, other_user_id, other_user_id, user_id))
+            ORDER BY cm.created_at DESC, cm.id DESC
+        """
+        params = [user_id, other_user_id, other_user_id, user_id]
+
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
 
+        cursor.execute(query, params)
         messages = cursor.fetchall()
         conn.close()
 
-        return [dict(message) for message in messages]
+        return [dict(message) for message in reversed(messages)]
     except Exception as e:
         st.error(f"Error getting chat history: {e}")
         return []
@@ -259,27 +313,17 @@ def chat_management():
                 if st.button("Block Users", key=f"block_{chat['id']}"):
                     st.error("Users blocked from chat")
 
-def image_sharing_interface():
-    """Interface for sharing design reference images"""
-    st.subheader("📸 Share Design References")
-
-    uploaded_file = st.file_uploader(
-        "Upload design reference images",
-        type=['png', 'jpg', 'jpeg'],
-        help="Share images of designs you like for reference"
-    )
-
-    if uploaded_file is not None:
-        st.image(uploaded_file, caption="Design Reference", width=300)
-        st.success("Image uploaded successfully!")
-
-        if st.button("Send to Artist"):
-            st.info("Image sent to artist for reference!")
-
-    # Mock shared images
-    st.subheader("Previously Shared Images")
-    col1, col2, col3 = st.columns(3)
-
-    for i in range(3):
-        with col1 if i % 3 == 0 else col2 if i % 3 == 1 else col3:
-            st.image("https://via.placeholder.com/150", caption=f"Design {i+1}")
+def image_sharing_interface(sender_id, receiver_id):
+    """Interface for sharing design reference images in a chat"""
+    with st.popover("📸 Share Design References"):
+        with st.form(f"share_image_{receiver_id}", clear_on_submit=True):
+            uploaded_file = st.file_uploader(
+                "Upload design reference images",
+                type=['png', 'jpg', 'jpeg', 'webp'],
+                help="Share images of designs you like for reference"
+            )
+            caption = st.text_input("Caption (optional)")
+
+            if st.form_submit_button("Send to Artist") and uploaded_file is not None:
+                if send_image_message(sender_id, receiver_id, uploaded_file.getvalue(), caption.strip()):
+                    st.rerun()
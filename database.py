@@ -1,9 +1,12 @@
 import sqlite3
 import os
+import ast
+import json
 import streamlit as st
-from geopy.geocoders import Nominatim
-from geopy.distance import geodesic
+import threading
 import time
+from presence import apply_presence
+from geocoding import geocode
 
 # Database file path
 DB_PATH = "mehndi_app.db"
@@ -18,6 +21,97 @@ def get_db_connection():
         st.error(f"Database connection error: {e}")
         return None
 
+# Columns of booking_daily_stats and the per-booking value each one accumulates
+ROLLUP_COLUMNS = {
+    'total_bookings': "1",
+    'pending_count': "({row}.status = 'pending')",
+    'confirmed_count': "({row}.status = 'confirmed')",
+    'completed_count': "({row}.status = 'completed')",
+    'cancelled_count': "({row}.status = 'cancelled')",
+    'gross_amount': "COALESCE({row}.amount, 0)",
+    'priced_bookings': "(COALESCE({row}.amount, 0) > 0)",
+    'revenue': "(CASE WHEN {row}.status = 'completed' THEN COALESCE({row}.amount, 0) ELSE 0 END)",
+}
+
+def _rollup_upsert_sql(row, sign):
+    """Build the upsert that adds (sign=1) or removes (sign=-1) one booking row from the rollup"""
+    columns = ", ".join(ROLLUP_COLUMNS)
+    values = ", ".join(f"{sign} * {expr.format(row=row)}" for expr in ROLLUP_COLUMNS.values())
+    updates = ", ".join(f"{col} = {col} + excluded.{col}" for col in ROLLUP_COLUMNS)
+    return f"""
+        INSERT INTO booking_daily_stats (artist_id, day, {columns})
+        VALUES ({row}.artist_id, DATE({row}.appointment_date), {values})
+        ON CONFLICT(artist_id, day) DO UPDATE SET {updates};
+    """
+
+def _rebuild_booking_daily_stats(cursor):
+    """Recompute booking_daily_stats from the bookings table"""
+    columns = ", ".join(ROLLUP_COLUMNS)
+    aggregates = ", ".join(f"SUM({expr.format(row='b')})" for expr in ROLLUP_COLUMNS.values())
+
+    cursor.execute("DELETE FROM booking_daily_stats")
+    cursor.execute(f"""
+        INSERT INTO booking_daily_stats (artist_id, day, {columns})
+        SELECT b.artist_id, DATE(b.appointment_date), {aggregates}
+        FROM bookings b
+        GROUP BY b.artist_id, DATE(b.appointment_date)
+    """)
+
+# Profile fields that count towards artists.profile_completion
+PROFILE_REQUIRED_FIELDS = ['name', 'phone', 'address', 'bio', 'specializations', 'price_range']
+PROFILE_OPTIONAL_FIELDS = ['email', 'experience_years', 'portfolio_url', 'areas_covered']
+
+# Bits of artists.verification_flags
+VERIFIED_PROFILE = 1
+VERIFIED_EMAIL = 2
+VERIFIED_PHONE = 4
+VERIFIED_PORTFOLIO = 8
+VERIFIED_REVIEWS = 16
+VERIFIED_BACKGROUND = 32  # set by admins, never recomputed
+BASIC_VERIFICATION = VERIFIED_PROFILE | VERIFIED_EMAIL | VERIFIED_PHONE
+PREMIUM_VERIFICATION = 63
+MIN_REVIEWS_FOR_VERIFICATION = 3
+
+def _filled(column):
+    return f"(COALESCE({column}, '') NOT IN ('', 0))"
+
+def _profile_scores_sql(where):
+    """Build the UPDATE that recomputes profile_completion and verification_flags"""
+    fields = PROFILE_REQUIRED_FIELDS + PROFILE_OPTIONAL_FIELDS
+    completion = " + ".join(_filled(field) for field in fields)
+    return f"""
+        UPDATE artists SET
+            profile_completion = ({completion}) * 100 / {len(fields)},
+            verification_flags = (verification_flags & {VERIFIED_BACKGROUND})
+                | ({_filled('name')} AND {_filled('phone')}) * {VERIFIED_PROFILE}
+                | {_filled('email')} * {VERIFIED_EMAIL}
+                | {_filled('phone')} * {VERIFIED_PHONE}
+                | {_filled('portfolio_url')} * {VERIFIED_PORTFOLIO}
+                | (total_reviews >= {MIN_REVIEWS_FOR_VERIFICATION}) * {VERIFIED_REVIEWS}
+        WHERE {where};
+    """
+
+RATING_STATS_COLUMNS = {
+    **{f'stars_{stars}': f"COALESCE({{row}}.rating = {stars}, 0)" for stars in range(1, 6)},
+    'review_count': "({row}.rating IS NOT NULL)",
+    'rating_sum': "COALESCE({row}.rating, 0)",
+}
+
+def _rating_stats_upsert_sql(row, sign):
+    """Build the statements that add (sign=1) or remove (sign=-1) one review from the rating stats"""
+    columns = ", ".join(RATING_STATS_COLUMNS)
+    values = ", ".join(f"{sign} * {expr.format(row=row)}" for expr in RATING_STATS_COLUMNS.values())
+    updates = ", ".join(f"{col} = {col} + excluded.{col}" for col in RATING_STATS_COLUMNS)
+    return f"""
+        INSERT INTO artist_rating_stats (artist_id, {columns})
+        VALUES ({row}.artist_id, {values})
+        ON CONFLICT(artist_id) DO UPDATE SET {updates};
+        UPDATE artists SET rating = COALESCE((
+            SELECT ROUND(1.0 * rating_sum / review_count, 1) FROM artist_rating_stats
+            WHERE artist_id = {row}.artist_id AND review_count > 0
+        ), 0) WHERE id = {row}.artist_id;
+    """
+
 def init_database():
     """Initialize database with all tables"""
     try:
@@ -72,6 +166,9 @@ def init_database():
             cursor.execute("ALTER TABLE artists ADD COLUMN email TEXT")
         if 'languages' not in columns:
             cursor.execute("ALTER TABLE artists ADD COLUMN languages TEXT")
+        if 'latitude' not in columns:
+            cursor.execute("ALTER TABLE artists ADD COLUMN latitude REAL")
+            cursor.execute("ALTER TABLE artists ADD COLUMN longitude REAL")
 
         # Artist availability table
         cursor.execute('''
@@ -103,6 +200,58 @@ def init_database():
             )
         ''')
 
+        cursor.execute("PRAGMA table_info(bookings)")
+        booking_columns = [row[1] for row in cursor.fetchall()]
+        if 'service_type' not in booking_columns:
+            cursor.execute("ALTER TABLE bookings ADD COLUMN service_type TEXT")
+
+        # Daily booking rollup (one row per artist per appointment day)
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'booking_daily_stats'")
+        rollup_exists = cursor.fetchone() is not None
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS booking_daily_stats (
+                artist_id INTEGER REFERENCES artists(id),
+                day DATE NOT NULL,
+                total_bookings INTEGER DEFAULT 0,
+                pending_count INTEGER DEFAULT 0,
+                confirmed_count INTEGER DEFAULT 0,
+                completed_count INTEGER DEFAULT 0,
+                cancelled_count INTEGER DEFAULT 0,
+                gross_amount REAL DEFAULT 0,
+                priced_bookings INTEGER DEFAULT 0,
+                revenue REAL DEFAULT 0,
+                PRIMARY KEY (artist_id, day)
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_booking_daily_stats_day ON booking_daily_stats(day)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_bookings_artist_date ON bookings(artist_id, appointment_date)")
+
+        # Keep the rollup in step with every write to bookings
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_bookings_rollup_insert AFTER INSERT ON bookings
+            BEGIN
+                {_rollup_upsert_sql('NEW', 1)}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_bookings_rollup_update
+            AFTER UPDATE OF artist_id, appointment_date, status, amount ON bookings
+            BEGIN
+                {_rollup_upsert_sql('OLD', -1)}
+                {_rollup_upsert_sql('NEW', 1)}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_bookings_rollup_delete AFTER DELETE ON bookings
+            BEGIN
+                {_rollup_upsert_sql('OLD', -1)}
+            END
+        """)
+
+        if not rollup_exists:
+            _rebuild_booking_daily_stats(cursor)
+
         # Chat messages table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS chat_messages (
@@ -112,7 +261,51 @@ def init_database():
                 message TEXT NOT NULL,
                 message_type TEXT DEFAULT 'text' CHECK (message_type IN ('text', 'image')),
                 is_read BOOLEAN DEFAULT FALSE,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                blob_hash TEXT REFERENCES media_blobs(hash)
+            )
+        ''')
+
+        # Image messages point at a stored image (see media_store.py)
+        cursor.execute("PRAGMA table_info(chat_messages)")
+        if 'blob_hash' not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE chat_messages ADD COLUMN blob_hash TEXT REFERENCES media_blobs(hash)")
+
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_messages_sender ON chat_messages(sender_id, created_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_messages_receiver ON chat_messages(receiver_id, created_at)")
+
+        # Artist response times: one row per customer message run and the artist reply that answered it
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chat_responses (
+                artist_user_id INTEGER REFERENCES users(id),
+                customer_id INTEGER REFERENCES users(id),
+                message_id INTEGER REFERENCES chat_messages(id),
+                reply_id INTEGER REFERENCES chat_messages(id),
+                replied_at DATETIME NOT NULL,
+                response_seconds INTEGER NOT NULL,
+                PRIMARY KEY (artist_user_id, message_id)
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_chat_responses_replied ON chat_responses(artist_user_id, replied_at)")
+
+        # Running response-time histogram per artist
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chat_response_histogram (
+                artist_user_id INTEGER REFERENCES users(id),
+                bucket INTEGER NOT NULL,
+                responses INTEGER DEFAULT 0,
+                total_seconds INTEGER DEFAULT 0,
+                PRIMARY KEY (artist_user_id, bucket)
+            )
+        ''')
+
+        # Last artist reply already folded into chat_responses, per conversation
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS chat_response_watermarks (
+                artist_user_id INTEGER REFERENCES users(id),
+                customer_id INTEGER REFERENCES users(id),
+                last_message_id INTEGER NOT NULL,
+                PRIMARY KEY (artist_user_id, customer_id)
             )
         ''')
 
@@ -129,17 +322,312 @@ def init_database():
             )
         ''')
 
-        # Admin logs table
+        # Profile completion and verification are stored on artists and kept current by
+        # triggers, so dashboards and the approval queue read them instead of recomputing
+        cursor.execute("PRAGMA table_info(artists)")
+        if 'profile_completion' not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute("ALTER TABLE artists ADD COLUMN profile_completion INTEGER DEFAULT 0")
+            cursor.execute("ALTER TABLE artists ADD COLUMN verification_flags INTEGER DEFAULT 0")
+            cursor.execute("""
+                UPDATE artists SET total_reviews = (SELECT COUNT(*) FROM reviews r WHERE r.artist_id = artists.id)
+            """)
+            cursor.execute(_profile_scores_sql("1"))
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_artists_status_completion
+            ON artists(status, profile_completion DESC, verification_flags DESC)
+        """)
+
+        score_columns = ", ".join(PROFILE_REQUIRED_FIELDS + PROFILE_OPTIONAL_FIELDS + ['total_reviews'])
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_artists_scores_insert AFTER INSERT ON artists
+            BEGIN
+                {_profile_scores_sql("id = NEW.id")}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_artists_scores_update AFTER UPDATE OF {score_columns} ON artists
+            BEGIN
+                {_profile_scores_sql("id = NEW.id")}
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_reviews_count_insert AFTER INSERT ON reviews
+            BEGIN
+                UPDATE artists SET total_reviews = total_reviews + 1 WHERE id = NEW.artist_id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_reviews_count_delete AFTER DELETE ON reviews
+            BEGIN
+                UPDATE artists SET total_reviews = total_reviews - 1 WHERE id = OLD.artist_id;
+            END
+        """)
+
+        # One review per booking, read newest first a page at a time
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_reviews_booking'")
+        if not cursor.fetchone():
+            cursor.execute("""
+                DELETE FROM reviews WHERE booking_id IS NOT NULL
+                AND id NOT IN (SELECT MIN(id) FROM reviews WHERE booking_id IS NOT NULL GROUP BY booking_id)
+            """)
+            cursor.execute("CREATE UNIQUE INDEX idx_reviews_booking ON reviews(booking_id)")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_reviews_artist_created
+            ON reviews(artist_id, created_at DESC, id DESC)
+        """)
+
+        # Per-artist rating histogram, kept in step with reviews by triggers
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'artist_rating_stats'")
+        rating_stats_exist = cursor.fetchone() is not None
+
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS artist_rating_stats (
+                artist_id INTEGER PRIMARY KEY REFERENCES artists(id),
+                {", ".join(f"{col} INTEGER DEFAULT 0" for col in RATING_STATS_COLUMNS)}
+            )
+        ''')
+
+        if not rating_stats_exist:
+            aggregates = ", ".join(f"SUM({expr.format(row='r')})" for expr in RATING_STATS_COLUMNS.values())
+            cursor.execute(f"""
+                INSERT INTO artist_rating_stats (artist_id, {", ".join(RATING_STATS_COLUMNS)})
+                SELECT r.artist_id, {aggregates} FROM reviews r
+                WHERE r.artist_id IS NOT NULL
+                GROUP BY r.artist_id
+            """)
+            cursor.execute("""
+                UPDATE artists SET rating = COALESCE((
+                    SELECT ROUND(1.0 * rating_sum / review_count, 1) FROM artist_rating_stats
+                    WHERE artist_id = artists.id AND review_count > 0
+                ), 0)
+            """)
+
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_reviews_rating_insert AFTER INSERT ON reviews
+            BEGIN
+                {_rating_stats_upsert_sql('NEW', 1)}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_reviews_rating_update AFTER UPDATE OF artist_id, rating ON reviews
+            BEGIN
+                {_rating_stats_upsert_sql('OLD', -1)}
+                {_rating_stats_upsert_sql('NEW', 1)}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_reviews_rating_delete AFTER DELETE ON reviews
+            BEGIN
+                {_rating_stats_upsert_sql('OLD', -1)}
+            END
+        """)
+
+        # Audit log: STRICT so an actor id can only ever be an integer users.id
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'admin_logs'")
+        admin_logs_exist = cursor.fetchone() is not None
+
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS admin_logs (
+            CREATE TABLE IF NOT EXISTS audit_log (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
-                admin_id INTEGER REFERENCES users(id),
+                actor_id INTEGER REFERENCES users(id),
+                actor_role TEXT,
                 action TEXT NOT NULL,
+                target_type TEXT,
+                target_id INTEGER,
                 details TEXT,
+                created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            ) STRICT
+        ''')
+        # One index per filter the viewer offers, each ending in the (created_at, id) page order
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_created ON audit_log(created_at, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_action ON audit_log(action, created_at, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_log_role ON audit_log(actor_role, created_at, id)")
+
+        # Artist status changes (online/offline/busy/break/away), append-only
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'status_events'")
+        status_events_exist = cursor.fetchone() is not None
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS status_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                artist_id INTEGER NOT NULL REFERENCES artists(id),
+                state TEXT NOT NULL CHECK (state IN ('online', 'offline', 'busy', 'break', 'away')),
+                ts DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_status_events_artist_ts ON status_events(artist_id, ts)")
+
+        if not status_events_exist and admin_logs_exist:
+            # Move status noise that used to be written to the admin audit log
+            cursor.execute("""
+                INSERT INTO status_events (artist_id, state, ts)
+                SELECT a.id,
+                       CASE l.action
+                           WHEN 'busy_mode' THEN 'busy'
+                           WHEN 'break_time' THEN 'break'
+                           WHEN 'away_mode' THEN 'away'
+                           ELSE CASE WHEN l.details LIKE '%offline' THEN 'offline' ELSE 'online' END
+                       END,
+                       l.created_at
+                FROM admin_logs l
+                JOIN artists a ON a.user_id = l.admin_id
+                WHERE l.action IN ('status_change', 'busy_mode', 'break_time', 'away_mode')
+                ORDER BY l.created_at, l.id
+            """)
+            cursor.execute("""
+                DELETE FROM admin_logs
+                WHERE action IN ('status_change', 'busy_mode', 'break_time', 'away_mode')
+            """)
+
+        if admin_logs_exist:
+            # admin_logs stored usernames in admin_id for artist approvals; resolve them to user ids
+            cursor.execute("""
+                INSERT INTO audit_log (actor_id, actor_role, action, details, created_at)
+                SELECT u.id, u.role,
+                       CASE l.details
+                           WHEN 'Artist approval' THEN 'artist_approved'
+                           WHEN 'Artist rejection' THEN 'artist_rejected'
+                           WHEN 'Artist suspension' THEN 'artist_suspended'
+                           ELSE l.action
+                       END,
+                       CASE WHEN l.details IN ('Artist approval', 'Artist rejection', 'Artist suspension')
+                            THEN l.action ELSE l.details END,
+                       COALESCE(l.created_at, CURRENT_TIMESTAMP)
+                FROM admin_logs l
+                LEFT JOIN users u ON u.id = CASE WHEN typeof(l.admin_id) = 'integer' THEN l.admin_id
+                                                 ELSE (SELECT id FROM users WHERE username = l.admin_id) END
+                ORDER BY l.created_at, l.id
+            """)
+            cursor.execute("DROP TABLE admin_logs")
+
+        # Per-artist settings as typed JSON values, one row per key
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'artist_settings'")
+        artist_settings_exist = cursor.fetchone() is not None
+
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS artist_settings (
+                artist_id INTEGER NOT NULL REFERENCES artists(id),
+                key TEXT NOT NULL,
+                value TEXT NOT NULL CHECK (json_valid(value)),
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (artist_id, key)
+            )
+        ''')
+
+        if not artist_settings_exist:
+            # Settings used to be saved as str(dict) over artists.specializations
+            cursor.execute("SELECT id, specializations FROM artists WHERE specializations LIKE '{%}'")
+            for artist_id, specializations in cursor.fetchall():
+                try:
+                    settings = ast.literal_eval(specializations)
+                except (ValueError, SyntaxError):
+                    continue
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO artist_settings (artist_id, key, value) VALUES (?, ?, ?)",
+                    [(artist_id, key, json.dumps(value)) for key, value in settings.items()]
+                )
+                cursor.execute("UPDATE artists SET specializations = NULL WHERE id = ?", (artist_id,))
+
+        # Addresses waiting for the background geocoder (geocode_worker.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS geocode_queue (
+                artist_id INTEGER PRIMARY KEY REFERENCES artists(id),
+                address TEXT NOT NULL,
+                status TEXT DEFAULT 'pending' CHECK (status IN ('pending', 'failed')),
+                attempts INTEGER DEFAULT 0,
+                next_attempt_at REAL DEFAULT 0,
+                last_error TEXT,
+                enqueued_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_geocode_queue_due ON geocode_queue(status, next_attempt_at)")
+
+        # Every new or changed artist address is queued, whichever code path wrote it
+        enqueue_geocode = """
+            INSERT INTO geocode_queue (artist_id, address) VALUES (NEW.id, NEW.address)
+            ON CONFLICT (artist_id) DO UPDATE SET
+                address = excluded.address, status = 'pending', attempts = 0,
+                next_attempt_at = 0, last_error = NULL, enqueued_at = CURRENT_TIMESTAMP;
+        """
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_artists_geocode_insert AFTER INSERT ON artists
+            WHEN NEW.address IS NOT NULL AND NEW.address != '' AND NEW.latitude IS NULL
+            BEGIN
+                {enqueue_geocode}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_artists_geocode_update AFTER UPDATE OF address ON artists
+            WHEN NEW.address IS NOT OLD.address AND NEW.address IS NOT NULL AND NEW.address != ''
+            BEGIN
+                {enqueue_geocode}
+            END
+        """)
+
+        # Shared login rate limit buckets (used when MEHNDI_RATE_LIMIT_STORE=sqlite)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS login_buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+
+        # Periodic admin dashboard aggregates (see metrics_snapshot.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS metrics_snapshots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                taken_at REAL NOT NULL,
+                metrics TEXT NOT NULL CHECK (json_valid(metrics))
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_metrics_snapshots_taken ON metrics_snapshots(taken_at)")
+
+        # Uploaded images, one row per distinct content hash (see media_store.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS media_blobs (
+                hash TEXT PRIMARY KEY,
+                format TEXT NOT NULL,
+                width INTEGER NOT NULL,
+                height INTEGER NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                thumbnail_status TEXT NOT NULL DEFAULT 'pending'
+                    CHECK (thumbnail_status IN ('pending', 'ready', 'failed')),
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         ''')
 
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS portfolio_images (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                artist_id INTEGER NOT NULL REFERENCES artists(id),
+                blob_hash TEXT NOT NULL REFERENCES media_blobs(hash),
+                caption TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (artist_id, blob_hash)
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_portfolio_images_artist ON portfolio_images(artist_id, created_at DESC)")
+
+        # Rendition jobs for thumbnail_worker.py; every new blob is queued by the trigger below
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS thumbnail_jobs (
+                blob_hash TEXT PRIMARY KEY REFERENCES media_blobs(hash),
+                status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'failed')),
+                attempts INTEGER NOT NULL DEFAULT 0,
+                claimed_at REAL,
+                last_error TEXT,
+                created_at REAL NOT NULL DEFAULT ((julianday('now') - 2440587.5) * 86400.0)
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_thumbnail_jobs_status ON thumbnail_jobs(status, created_at)")
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_media_blobs_thumbnail_job AFTER INSERT ON media_blobs
+            BEGIN
+                INSERT OR IGNORE INTO thumbnail_jobs (blob_hash) VALUES (NEW.hash);
+            END
+        """)
+
         # Create default admin user
         cursor.execute("SELECT id FROM users WHERE username = 'admin' AND role = 'admin'")
         if not cursor.fetchone():
@@ -155,6 +643,19 @@ def init_database():
         st.error(f"Database initialization error: {e}")
         return False
 
+# Set once init_database has succeeded in this process; reruns only read the flag
+_database_ready = False
+_database_lock = threading.Lock()
+
+def ensure_database():
+    """Initialize the database once per process; returns whether it is ready"""
+    global _database_ready
+    if not _database_ready:
+        with _database_lock:
+            if not _database_ready:
+                _database_ready = init_database()
+    return _database_ready
+
 def get_nearby_artists(location, filters=None):
     """Get artists near a location with optional filters"""
     try:
@@ -162,11 +663,10 @@ def get_nearby_artists(location, filters=None):
         cursor = conn.cursor()
 
         query = """
-            SELECT a.*, u.is_online,
-                   (SELECT AVG(r.rating) FROM reviews r WHERE r.artist_id = a.id) as avg_rating,
-                   (SELECT COUNT(*) FROM reviews r WHERE r.artist_id = a.id) as review_count
+            SELECT a.*,
+                   a.rating as avg_rating,
+                   a.total_reviews as review_count
             FROM artists a
-            JOIN users u ON a.user_id = u.id
             WHERE a.status = 'approved'
         """
 
@@ -182,16 +682,19 @@ def get_nearby_artists(location, filters=None):
                 params.append(filters['max_price'])
 
             if 'min_rating' in filters and filters['min_rating']:
-                query += " AND (SELECT AVG(r.rating) FROM reviews r WHERE r.artist_id = a.id) >= ?"
+                query += " AND a.rating >= ?"
                 params.append(filters['min_rating'])
 
-        query += " ORDER BY u.is_online DESC, avg_rating DESC"
+        query += " ORDER BY avg_rating DESC"
 
         cursor.execute(query, params)
         results = cursor.fetchall()
         conn.close()
 
-        return [dict(row) for row in results]
+        # Online artists first, using live presence rather than users.is_online
+        artists = apply_presence([dict(row) for row in results])
+        artists.sort(key=lambda artist: not artist['is_online'])
+        return artists
     except Exception as e:
         st.error(f"Error getting nearby artists: {e}")
         return []
@@ -218,16 +721,16 @@ def get_artist_availability(artist_id, date=None):
         st.error(f"Error getting availability: {e}")
         return []
 
-def create_booking(user_id, artist_id, appointment_date, start_time, end_time, amount, notes=""):
+def create_booking(user_id, artist_id, appointment_date, start_time, end_time, amount, notes="", service_type=None, status='pending'):
     """Create a new booking"""
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
         cursor.execute("""
-            INSERT INTO bookings (user_id, artist_id, appointment_date, start_time, end_time, amount, notes)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (user_id, artist_id, appointment_date, start_time, end_time, amount, notes))
+            INSERT INTO bookings (user_id, artist_id, appointment_date, start_time, end_time, amount, notes, service_type, status)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (user_id, artist_id, appointment_date, start_time, end_time, amount, notes, service_type, status))
 
         booking_id = cursor.lastrowid
         conn.commit()
@@ -238,6 +741,25 @@ def create_booking(user_id, artist_id, appointment_date, start_time, end_time, a
         st.error(f"Error creating booking: {e}")
         return None
 
+def get_booked_times(artist_id, appointment_date):
+    """Get start and end times of the artist's active bookings on a date"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT start_time, end_time FROM bookings
+            WHERE artist_id = ? AND appointment_date = ? AND status != 'cancelled'
+        """, (artist_id, appointment_date))
+
+        results = cursor.fetchall()
+        conn.close()
+
+        return [(row['start_time'], row['end_time']) for row in results]
+    except Exception as e:
+        st.error(f"Error getting booked times: {e}")
+        return []
+
 def get_user_bookings(user_id):
     """Get all bookings for a user"""
     try:
@@ -245,7 +767,8 @@ def get_user_bookings(user_id):
         cursor = conn.cursor()
 
         cursor.execute("""
-            SELECT b.*, a.name as artist_name, u.username as artist_username
+            SELECT b.*, a.name as artist_name, u.username as artist_username,
+                   EXISTS (SELECT 1 FROM reviews r WHERE r.booking_id = b.id) as reviewed
             FROM bookings b
             JOIN artists a ON b.artist_id = a.id
             JOIN users u ON a.user_id = u.id
@@ -261,22 +784,127 @@ def get_user_bookings(user_id):
         st.error(f"Error getting bookings: {e}")
         return []
 
-def log_admin_action(admin_id, action, details):
-    """Log admin actions for audit trail"""
+def rebuild_booking_daily_stats():
+    """Rebuild the daily booking rollup from scratch"""
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        cursor.execute("""
-            INSERT INTO admin_logs (admin_id, action, details)
-            VALUES (?, ?, ?)
-        """, (admin_id, action, details))
+        _rebuild_booking_daily_stats(cursor)
 
         conn.commit()
         conn.close()
         return True
     except Exception as e:
-        st.error(f"Error logging admin action: {e}")
+        st.error(f"Error rebuilding booking stats: {e}")
+        return False
+
+EMPTY_ARTIST_KPIS = {
+    'total_bookings': 0,
+    'today_bookings': 0,
+    'monthly_bookings': 0,
+    'completed_bookings': 0,
+    'total_earnings': 0,
+    'completion_rate': 0,
+    'avg_booking_value': 0,
+    'total_customers': 0,
+    'repeat_customers': 0,
+    'new_customers': 0,
+}
+
+def get_artist_kpis(artist_id):
+    """Get all booking KPIs for an artist in a single grouped scan of their bookings"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        # Inner query: one row per customer with conditional aggregates,
+        # outer query: roll the customers up into the artist's KPIs
+        cursor.execute("""
+            SELECT COALESCE(SUM(bookings), 0) as total_bookings,
+                   COALESCE(SUM(today), 0) as today_bookings,
+                   COALESCE(SUM(this_month), 0) as monthly_bookings,
+                   COALESCE(SUM(completed), 0) as completed_bookings,
+                   COALESCE(SUM(earnings), 0) as total_earnings,
+                   COALESCE(SUM(completed) * 100.0 / SUM(bookings), 0) as completion_rate,
+                   COALESCE(SUM(gross_amount) / NULLIF(SUM(priced), 0), 0) as avg_booking_value,
+                   COUNT(*) as total_customers,
+                   COALESCE(SUM(bookings > 1), 0) as repeat_customers,
+                   COALESCE(SUM(first_booking >= date('now', '-30 days')), 0) as new_customers
+            FROM (
+                SELECT user_id,
+                       COUNT(*) as bookings,
+                       SUM(DATE(appointment_date) = DATE('now')) as today,
+                       SUM(strftime('%Y-%m', appointment_date) = strftime('%Y-%m', 'now')) as this_month,
+                       SUM(status = 'completed') as completed,
+                       SUM(CASE WHEN status = 'completed' THEN COALESCE(amount, 0) ELSE 0 END) as earnings,
+                       SUM(CASE WHEN amount > 0 THEN amount ELSE 0 END) as gross_amount,
+                       SUM(amount > 0) as priced,
+                       MIN(DATE(appointment_date)) as first_booking
+                FROM bookings
+                WHERE artist_id = ?
+                GROUP BY user_id
+            )
+        """, (artist_id,))
+
+        result = dict(cursor.fetchone())
+        conn.close()
+
+        return result
+    except Exception as e:
+        st.error(f"Error getting artist KPIs: {e}")
+        return dict(EMPTY_ARTIST_KPIS)
+
+def get_user_id(username):
+    """Get the users.id for a username"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT id FROM users WHERE username = ?", (username,))
+        result = cursor.fetchone()
+        conn.close()
+
+        return result[0] if result else None
+    except Exception as e:
+        st.error(f"Error getting user id: {e}")
+        return None
+
+def get_artist_id(username):
+    """Get the artists.id for an artist username"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT a.id FROM artists a
+            JOIN users u ON a.user_id = u.id
+            WHERE u.username = ?
+        """, (username,))
+
+        result = cursor.fetchone()
+        conn.close()
+
+        return result[0] if result else None
+    except Exception as e:
+        st.error(f"Error getting artist id: {e}")
+        return None
+
+def log_audit_event(actor_id, action, details=None, target_type=None, target_id=None):
+    """Append an event to the audit log; actor_id is the acting user's users.id"""
+    try:
+        conn = get_db_connection()
+        try:
+            conn.execute("""
+                INSERT INTO audit_log (actor_id, actor_role, action, target_type, target_id, details)
+                VALUES (?, (SELECT role FROM users WHERE id = ?), ?, ?, ?, ?)
+            """, (actor_id, actor_id, action, target_type, target_id, details))
+            conn.commit()
+        finally:
+            conn.close()
+        return True
+    except Exception as e:
+        st.error(f"Error logging audit event: {e}")
         return False
 
 def get_user_role(username):
@@ -336,6 +964,13 @@ def update_artist_profile(username, profile_data):
         # Update artists table with profile_data dictionary keys and values
         set_clause = ", ".join([f"{key} = ?" for key in profile_data.keys()])
         values = list(profile_data.values())
+
+        # Stored coordinates belong to the old address; drop them if it changed
+        if 'address' in profile_data:
+            set_clause += (", latitude = CASE WHEN address IS ? THEN latitude END"
+                           ", longitude = CASE WHEN address IS ? THEN longitude END")
+            values += [profile_data['address'], profile_data['address']]
+
         values.append(user_id)
 
         query = f"UPDATE artists SET {set_clause}, updated_at = CURRENT_TIMESTAMP WHERE user_id = ?"
@@ -351,41 +986,37 @@ def update_artist_profile(username, profile_data):
 def geocode_address(address):
     """Convert address to coordinates using geocoding"""
     try:
-        geolocator = Nominatim(user_agent="mehndi_app")
-        location = geolocator.geocode(address, timeout=10)
-
-        if location:
-            return (location.latitude, location.longitude)
-        else:
-            return None
+        return geocode(address)
     except Exception as e:
         st.warning(f"Geocoding error: {e}")
         return None
 
 def calculate_distance(coord1, coord2):
     """Calculate distance between two coordinates in kilometers"""
+    from geopy.distance import geodesic
+
     try:
         return geodesic(coord1, coord2).kilometers
     except Exception as e:
         st.warning(f"Distance calculation error: {e}")
         return None
 
-def get_nearby_artists(location, max_distance=50, filters=None):
-    """Get artists near a location with optional filters"""
+def find_nearby_artists(location, max_distance=50, filters=None):
+    """Get the search origin's coordinates and the artists near it"""
     try:
         # Geocode the search location
         user_coords = geocode_address(location)
         if not user_coords:
             st.warning("Could not geocode the location. Using default search.")
-            return []
+            return None, []
 
         conn = get_db_connection()
         cursor = conn.cursor()
 
         query = """
-            SELECT a.*, u.is_online, u.username,
-                   (SELECT AVG(r.rating) FROM reviews r WHERE r.artist_id = a.id) as avg_rating,
-                   (SELECT COUNT(*) FROM reviews r WHERE r.artist_id = a.id) as review_count
+            SELECT a.*, u.username,
+                   a.rating as avg_rating,
+                   a.total_reviews as review_count
             FROM artists a
             JOIN users u ON a.user_id = u.id
             WHERE a.status = 'approved'
@@ -403,7 +1034,7 @@ def get_nearby_artists(location, max_distance=50, filters=None):
                 params.append(filters['max_price'])
 
             if 'min_rating' in filters and filters['min_rating']:
-                query += " AND (SELECT AVG(r.rating) FROM reviews r WHERE r.artist_id = a.id) >= ?"
+                query += " AND a.rating >= ?"
                 params.append(filters['min_rating'])
 
         cursor.execute(query, params)
@@ -415,31 +1046,30 @@ def get_nearby_artists(location, max_distance=50, filters=None):
         for row in results:
             artist_dict = dict(row)
 
-            # Try to geocode artist address
-            if artist_dict.get('address'):
-                artist_coords = geocode_address(artist_dict['address'])
-                if artist_coords:
-                    distance = calculate_distance(user_coords, artist_coords)
-                    if distance and distance <= max_distance:
-                        artist_dict['distance'] = round(distance, 1)
-                        nearby_artists.append(artist_dict)
-                else:
-                    # If geocoding fails, include artist with estimated distance
-                    artist_dict['distance'] = 5.0  # Default distance
+            # Stored coordinates only; geocode_worker.py fills them in from the queue
+            if artist_dict['latitude'] is not None:
+                distance = calculate_distance(user_coords, (artist_dict['latitude'], artist_dict['longitude']))
+                if distance and distance <= max_distance:
+                    artist_dict['distance'] = round(distance, 1)
                     nearby_artists.append(artist_dict)
             else:
-                # If no address, include with default distance
+                # Not geocoded yet (or no address): include with default distance
                 artist_dict['distance'] = 5.0
                 nearby_artists.append(artist_dict)
 
-        # Sort by distance
-        nearby_artists.sort(key=lambda x: x.get('distance', 999))
+        # Online artists first (live presence), then by distance
+        apply_presence(nearby_artists)
+        nearby_artists.sort(key=lambda x: (not x['is_online'], x.get('distance', 999)))
 
-        return nearby_artists
+        return user_coords, nearby_artists
 
     except Exception as e:
         st.error(f"Error getting nearby artists: {e}")
-        return []
+        return None, []
+
+def get_nearby_artists(location, max_distance=50, filters=None):
+    """Get artists near a location with optional filters"""
+    return find_nearby_artists(location, max_distance, filters)[1]
 
 def get_artists_by_area(area_name):
     """Get artists in a specific area"""
@@ -448,20 +1078,33 @@ def get_artists_by_area(area_name):
         cursor = conn.cursor()
 
         cursor.execute("""
-            SELECT a.*, u.is_online,
-                   (SELECT AVG(r.rating) FROM reviews r WHERE r.artist_id = a.id) as avg_rating,
-                   (SELECT COUNT(*) FROM reviews r WHERE r.artist_id = a.id) as review_count
+            SELECT a.*,
+                   a.rating as avg_rating,
+                   a.total_reviews as review_count
             FROM artists a
-            JOIN users u ON a.user_id = u.id
             WHERE a.areas_covered LIKE ?
                AND a.status = 'approved'
-            ORDER BY u.is_online DESC, avg_rating DESC
+            ORDER BY avg_rating DESC
         """, (f"%{area_name}%",))
 
         results = cursor.fetchall()
         conn.close()
 
-        return [dict(row) for row in results]
+        artists = apply_presence([dict(row) for row in results])
+        artists.sort(key=lambda artist: not artist['is_online'])
+        return artists
     except Exception as e:
         st.error(f"Error getting artists by area: {e}")
         return []
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "rebuild-stats":
+        init_database()
+        if rebuild_booking_daily_stats():
+            print("✅ booking_daily_stats rebuilt")
+        else:
+            sys.exit(1)
+    else:
+        print("Usage: python database.py rebuild-stats")
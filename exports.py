@@ -0,0 +1,171 @@
+"""
+Streaming data exports for Mehndi App
+Export queries are read from the cursor in chunks and written to an anonymous temp
+file as CSV or Parquet, so an export never holds more than one chunk of rows.
+Run: python exports.py bench [rows]
+"""
+
+import csv
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import database
+from database import get_db_connection, init_database
+
+EXPORT_CHUNK_ROWS = 10000
+
+# Label -> (file extension, MIME type)
+EXPORT_FORMATS = {
+    'CSV': ('csv', 'text/csv'),
+    'Parquet': ('parquet', 'application/vnd.apache.parquet'),
+}
+
+# Export columns are (name, type) in the order the query selects them; numeric
+# columns are CAST in SQL so every value matches its Parquet column type.
+BOOKING_EXPORT_COLUMNS = [
+    ('id', 'int'), ('customer_name', 'text'), ('appointment_date', 'text'), ('start_time', 'text'),
+    ('end_time', 'text'), ('service_type', 'text'), ('status', 'text'), ('amount', 'float'),
+    ('created_at', 'text'),
+]
+BOOKING_EXPORT_SELECT = """
+    SELECT b.id, u.username, b.appointment_date, b.start_time, b.end_time, b.service_type,
+           b.status, CAST(b.amount AS REAL), b.created_at
+"""
+
+DAILY_STATS_EXPORT_COLUMNS = [
+    ('day', 'text'), ('artist_id', 'int'), ('artist_name', 'text'), ('total_bookings', 'int'),
+    ('pending', 'int'), ('confirmed', 'int'), ('completed', 'int'), ('cancelled', 'int'),
+    ('gross_amount', 'float'), ('revenue', 'float'),
+]
+DAILY_STATS_EXPORT_QUERY = """
+    SELECT s.day, s.artist_id, a.name, s.total_bookings, s.pending_count, s.confirmed_count,
+           s.completed_count, s.cancelled_count, CAST(s.gross_amount AS REAL), CAST(s.revenue AS REAL)
+    FROM booking_daily_stats s
+    JOIN artists a ON s.artist_id = a.id
+    WHERE s.total_bookings > 0
+    ORDER BY s.day DESC, s.artist_id
+"""
+
+def parquet_available():
+    """Parquet export needs pyarrow, which is optional"""
+    try:
+        import pyarrow.parquet  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def export_format_options():
+    """Export formats usable in this environment"""
+    return [label for label in EXPORT_FORMATS if label != 'Parquet' or parquet_available()]
+
+def iter_chunks(query, params=(), chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yield the query's rows as tuples, at most `chunk_rows` at a time"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield [tuple(row) for row in rows]
+    finally:
+        conn.close()
+
+def write_csv(chunks, columns, output):
+    """Write row chunks as CSV to a binary file"""
+    text = io.TextIOWrapper(output, encoding='utf-8', newline='')
+    writer = csv.writer(text)
+    writer.writerow([name for name, _ in columns])
+    for rows in chunks:
+        writer.writerows(rows)
+    text.flush()
+    text.detach()
+
+def write_parquet(chunks, columns, output):
+    """Write row chunks to a Parquet file, one row group per chunk"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {'int': pa.int64(), 'float': pa.float64(), 'text': pa.string()}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+
+    with pq.ParquetWriter(output, schema, compression='zstd') as writer:
+        for rows in chunks:
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+
+def export_query(query, params, columns, file_format='csv'):
+    """Export a query to an anonymous temp file; returns the file, rewound for reading"""
+    output = tempfile.TemporaryFile()
+    try:
+        writer = write_parquet if file_format == 'parquet' else write_csv
+        writer(iter_chunks(query, params), columns, output)
+        output.seek(0)
+        return output
+    except BaseException:
+        output.close()
+        raise
+
+def export_download(query, params, columns, file_format='csv'):
+    """Export a query for st.download_button's deferred data; returns the file's bytes"""
+    with export_query(query, params, columns, file_format) as output:
+        return output.read()
+
+def benchmark(rows=1_000_000):
+    """Export `rows` bookings from a scratch database; returns seconds and peak traced memory per format"""
+    scratch = tempfile.mkdtemp(prefix='mehndi-export-')
+    db_path = database.DB_PATH
+    database.DB_PATH = os.path.join(scratch, 'bench.db')
+
+    try:
+        init_database()
+        conn = get_db_connection()
+        conn.execute("INSERT INTO users (username, password, role) VALUES ('bench-user', '-', 'user')")
+        conn.execute("INSERT INTO artists (user_id, name) VALUES (last_insert_rowid(), 'Bench Artist')")
+        conn.execute("""
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < ?)
+            INSERT INTO bookings (user_id, artist_id, appointment_date, start_time, end_time, status, amount)
+            SELECT (SELECT id FROM users WHERE username = 'bench-user'),
+                   (SELECT id FROM artists WHERE name = 'Bench Artist'),
+                   date('2024-01-01', '+' || (i % 730) || ' days'), '10:00', '12:00',
+                   CASE i % 4 WHEN 0 THEN 'pending' WHEN 1 THEN 'confirmed' WHEN 2 THEN 'completed' ELSE 'cancelled' END,
+                   500 + i % 2000
+            FROM n
+        """, (rows,))
+        conn.commit()
+        conn.close()
+
+        query = BOOKING_EXPORT_SELECT + """
+            FROM bookings b JOIN users u ON b.user_id = u.id
+            ORDER BY b.appointment_date DESC, b.start_time DESC
+        """
+        results = {}
+        for label in export_format_options():
+            extension = EXPORT_FORMATS[label][0]
+            tracemalloc.start()
+            started = time.perf_counter()
+            output = export_query(query, (), BOOKING_EXPORT_COLUMNS, extension)
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            size = output.seek(0, os.SEEK_END)
+            output.close()
+            results[label] = {'seconds': elapsed, 'peak_mb': peak / 1024 / 1024, 'file_mb': size / 1024 / 1024}
+        return results
+    finally:
+        database.DB_PATH = db_path
+        shutil.rmtree(scratch, ignore_errors=True)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        rows = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+        for label, result in benchmark(rows).items():
+            print(f"📤 {label}: {rows:,} bookings in {result['seconds']:.1f} s, "
+                  f"peak {result['peak_mb']:.1f} MB traced, file {result['file_mb']:.1f} MB")
+    else:
+        print("Usage: python exports.py bench [rows]")
@@ -0,0 +1,186 @@
+"""
+Background geocoding worker for Mehndi App
+Drains geocode_queue (filled by triggers on artists.address) and writes the
+coordinates back to artists, so profile saves and bulk imports never wait on geocoding.
+Run: python geocode_worker.py run | backfill
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from database import get_db_connection, init_database
+from geocoding import gazetteer_geocode
+
+NOMINATIM_URL = os.environ.get('MEHNDI_NOMINATIM_URL', 'https://nominatim.openstreetmap.org/search')
+USER_AGENT = "mehndi_app"
+REQUEST_TIMEOUT_SECONDS = 10
+
+BATCH_SIZE = 100
+CONCURRENCY = 4
+REQUESTS_PER_SECOND = 1.0  # Nominatim's public usage policy
+MAX_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+
+def make_rate_limiter(rate):
+    """Return a coroutine function that spaces out request starts to `rate` per second"""
+    interval = 1 / rate if rate else 0
+    lock = asyncio.Lock()
+    next_slot = 0.0
+
+    async def wait():
+        nonlocal next_slot
+        async with lock:
+            now = time.monotonic()
+            delay = next_slot - now
+            next_slot = max(now, next_slot) + interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    return wait
+
+def fetch_coordinates(address):
+    """Look an address up with the Nominatim search API; returns (lat, lng) or None"""
+    query = urllib.parse.urlencode({'q': address, 'format': 'json', 'limit': 1})
+    request = urllib.request.Request(f"{NOMINATIM_URL}?{query}", headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT_SECONDS) as response:
+        results = json.load(response)
+
+    if not results:
+        return None
+    return (float(results[0]['lat']), float(results[0]['lon']))
+
+def claim_due(limit):
+    """Get queued addresses that are due, dropping entries whose artist already has coordinates"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.execute("""
+        DELETE FROM geocode_queue
+        WHERE artist_id IN (SELECT id FROM artists WHERE latitude IS NOT NULL)
+    """)
+    cursor.execute("""
+        SELECT artist_id, address, attempts FROM geocode_queue
+        WHERE status = 'pending' AND next_attempt_at <= ?
+        ORDER BY next_attempt_at, artist_id
+        LIMIT ?
+    """, (time.time(), limit))
+    rows = [dict(row) for row in cursor.fetchall()]
+
+    conn.commit()
+    conn.close()
+    return rows
+
+def next_due_in():
+    """Seconds until the next pending entry is due, or None if nothing is pending"""
+    conn = get_db_connection()
+    result = conn.execute("SELECT MIN(next_attempt_at) FROM geocode_queue WHERE status = 'pending'").fetchone()
+    conn.close()
+    return None if result[0] is None else max(0.0, result[0] - time.time())
+
+def save_results(results):
+    """Write a batch of outcomes back in one transaction"""
+    found, missing, retries = [], [], []
+    now = time.time()
+
+    for row, coords, error in results:
+        if error is None and coords:
+            found.append((*coords, row['artist_id'], row['address']))
+        elif error is None:
+            missing.append(("Address not found", row['artist_id'], row['address']))
+        else:
+            attempts = row['attempts'] + 1
+            delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** row['attempts'])
+            status = 'failed' if attempts >= MAX_ATTEMPTS else 'pending'
+            retries.append((status, attempts, now + delay, str(error)[:200], row['artist_id'], row['address']))
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Matching on address skips rows whose address changed while we were geocoding
+    cursor.executemany("""
+        UPDATE artists SET latitude = ?, longitude = ? WHERE id = ? AND address = ?
+    """, [(lat, lng, artist_id, address) for lat, lng, artist_id, address in found])
+    cursor.executemany("""
+        DELETE FROM geocode_queue WHERE artist_id = ? AND address = ?
+    """, [(artist_id, address) for _, _, artist_id, address in found])
+    cursor.executemany("""
+        UPDATE geocode_queue SET status = 'failed', last_error = ? WHERE artist_id = ? AND address = ?
+    """, missing)
+    cursor.executemany("""
+        UPDATE geocode_queue SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?
+        WHERE artist_id = ? AND address = ?
+    """, retries)
+
+    conn.commit()
+    conn.close()
+    return len(found), len(missing), len(retries)
+
+async def geocode_rows(rows, concurrency, rate):
+    """Geocode rows concurrently, capped at `concurrency` in flight and `rate` starts per second"""
+    wait_for_slot = make_rate_limiter(rate)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def geocode_row(row):
+        # Gazetteer hits are local lookups; only the Nominatim fallback takes a rate-limit slot
+        coords = gazetteer_geocode(row['address'])
+        if coords:
+            return row, coords, None
+
+        async with semaphore:
+            await wait_for_slot()
+            try:
+                return row, await asyncio.to_thread(fetch_coordinates, row['address']), None
+            except (urllib.error.URLError, OSError, ValueError, KeyError) as e:
+                return row, None, e
+
+    return await asyncio.gather(*(geocode_row(row) for row in rows))
+
+async def run_worker(batch_size=BATCH_SIZE, concurrency=CONCURRENCY, rate=REQUESTS_PER_SECOND, wait_for_retries=False):
+    """Drain the queue; returns totals of (found, not found, retried)"""
+    totals = [0, 0, 0]
+
+    while True:
+        rows = claim_due(batch_size)
+        if not rows:
+            due_in = next_due_in()
+            if due_in is None or not wait_for_retries:
+                return tuple(totals)
+            await asyncio.sleep(due_in)
+            continue
+
+        counts = save_results(await geocode_rows(rows, concurrency, rate))
+        totals = [total + count for total, count in zip(totals, counts)]
+
+def backfill_queue():
+    """Queue every artist that has an address but no coordinates"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT INTO geocode_queue (artist_id, address)
+        SELECT id, address FROM artists
+        WHERE latitude IS NULL AND address IS NOT NULL AND address != ''
+        ON CONFLICT (artist_id) DO UPDATE SET
+            address = excluded.address, status = 'pending', attempts = 0, next_attempt_at = 0
+    """)
+    queued = cursor.rowcount
+    conn.commit()
+    conn.close()
+    return queued
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    init_database()
+
+    if command == "backfill":
+        print(f"📬 Queued {backfill_queue()} addresses")
+    elif command == "run":
+        found, missing, retried = asyncio.run(run_worker(wait_for_retries=True))
+        print(f"✅ Geocoded {found} addresses ({missing} not found, {retried} retries)")
+    else:
+        print("Usage: python geocode_worker.py run | backfill")
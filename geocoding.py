@@ -0,0 +1,217 @@
+import bisect
+import csv
+import os
+import re
+import threading
+import time
+
+# A geocoder backend is any function taking a free-text location and returning
+# (latitude, longitude) or None. geocode() asks each backend in order, so the local
+# gazetteer answers common lookups and only misses reach the remote service.
+GAZETTEER_PATH = os.environ.get('MEHNDI_GAZETTEER',
+                                os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gazetteer.csv'))
+GEOCODER_MODE = os.environ.get('MEHNDI_GEOCODER', 'hybrid')  # "hybrid" or "offline"
+
+# Nominatim's usage policy allows at most one request per second
+REMOTE_MIN_INTERVAL_SECONDS = 1.0
+REMOTE_TIMEOUT_SECONDS = 10
+REMOTE_CACHE_SIZE = 10000
+MIN_PREFIX_LENGTH = 4
+
+_PINCODE = re.compile(r"\b(\d{6})\b")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+# States served by each range of two-digit pincode prefixes (postal circles)
+PINCODE_STATES = [
+    (11, 11, {'Delhi'}),
+    (12, 13, {'Haryana'}),
+    (14, 16, {'Punjab', 'Chandigarh', 'Haryana'}),
+    (17, 17, {'Himachal Pradesh'}),
+    (18, 19, {'Jammu and Kashmir'}),
+    (20, 28, {'Uttar Pradesh', 'Uttarakhand'}),
+    (30, 34, {'Rajasthan'}),
+    (36, 39, {'Gujarat'}),
+    (40, 44, {'Maharashtra', 'Goa'}),
+    (45, 48, {'Madhya Pradesh'}),
+    (49, 49, {'Chhattisgarh'}),
+    (50, 53, {'Telangana', 'Andhra Pradesh'}),
+    (56, 59, {'Karnataka'}),
+    (60, 64, {'Tamil Nadu', 'Puducherry'}),
+    (67, 69, {'Kerala'}),
+    (70, 74, {'West Bengal'}),
+    (75, 77, {'Odisha'}),
+    (78, 78, {'Assam'}),
+    (79, 79, {'Meghalaya', 'Assam'}),
+    (80, 85, {'Bihar', 'Jharkhand'}),
+]
+
+_index_lock = threading.Lock()
+_names = None
+_coords = None
+_places = None
+_states = None
+
+_remote_lock = threading.Lock()
+_remote_client = None
+_last_remote_call = 0.0
+_remote_cache = {}
+
+def normalize_place(name):
+    """Lowercase a place name and collapse punctuation and spacing"""
+    return _NON_WORD.sub(' ', name.lower()).strip()
+
+def load_gazetteer(path=None):
+    """Load the gazetteer CSV (name, latitude, longitude, kind, city, state) into the index"""
+    global _names, _coords, _places, _states
+
+    places = {}
+    with open(path or GAZETTEER_PATH, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            places.setdefault(normalize_place(row['name']), {
+                'coords': (float(row['latitude']), float(row['longitude'])),
+                'kind': row['kind'],
+                'city': row.get('city') or row['name'],
+                'state': row.get('state') or None,
+            })
+
+    names = sorted(places)
+    with _index_lock:
+        _names = names
+        _coords = [places[name]['coords'] for name in names]
+        _places = places
+        _states = {normalize_place(place['state']): place['state']
+                   for place in places.values() if place['state']}
+    return len(names)
+
+def _ensure_gazetteer():
+    global _names, _coords, _places, _states
+    if _names is None:
+        try:
+            load_gazetteer()
+        except OSError:
+            # No gazetteer file: every lookup falls through to the next backend
+            _names, _coords, _places, _states = [], [], {}, {}
+
+def _prefix_lookup(key):
+    """First gazetteer entry starting with key, using binary search over the sorted names"""
+    i = bisect.bisect_left(_names, key)
+    if i < len(_names) and _names[i].startswith(key):
+        return _coords[i]
+    return None
+
+def _pincode_states(pincode):
+    """States a pincode can belong to, from its postal circle; empty when unknown"""
+    prefix = int(pincode[:2])
+    for first, last, states in PINCODE_STATES:
+        if first <= prefix <= last:
+            return states
+    return set()
+
+def gazetteer_geocode(query):
+    """Resolve a location from the local gazetteer, or None when the match is not certain.
+
+    Each comma-separated part must name a place as a whole. Parts are read from the
+    end, so the city (or state or pincode) anchors the lookup; an earlier locality is
+    used only when it lies in that city. A place outside the state given by the
+    pincode or a state name makes the whole lookup uncertain.
+    """
+    _ensure_gazetteer()
+
+    pincodes = _PINCODE.findall(query)
+    parts = [normalize_place(_PINCODE.sub(' ', part)) for part in query.split(',')]
+    parts = [part for part in parts if part]
+
+    pincode_place = _places.get(pincodes[-1]) if pincodes else None
+    claims = [{_states[part]} for part in parts if part in _states]
+    if pincodes:
+        claims.append({pincode_place['state']} if pincode_place and pincode_place['state']
+                      else _pincode_states(pincodes[-1]))
+    claims = [claim for claim in claims if claim]
+    states = set.intersection(*claims) if claims else None
+    if states is not None and not states:
+        # The pincode and state name disagree; leave it to the next backend
+        return None
+
+    anchor = None
+    for part in reversed(parts):
+        place = _places.get(part)
+        if place is None:
+            continue
+        if states and place['state'] and place['state'] not in states:
+            # A known place in another state: the address is ambiguous or wrong
+            return None
+        if anchor is None:
+            anchor = place
+        elif place['kind'] != 'city' and place['city'] == anchor['city']:
+            return place['coords']
+
+    if anchor and anchor['kind'] != 'city':
+        return anchor['coords']
+    if pincode_place and (anchor is None or pincode_place['city'] == anchor['city']):
+        return pincode_place['coords']
+    if anchor:
+        return anchor['coords']
+
+    # A lone, partly typed name ("Koraman") is matched by prefix
+    if len(parts) == 1 and not pincodes and len(parts[0]) >= MIN_PREFIX_LENGTH:
+        return _prefix_lookup(parts[0])
+    return None
+
+def nominatim_geocode(query):
+    """Resolve a location with the public Nominatim service, rate-limited and cached"""
+    global _remote_client, _last_remote_call
+
+    key = normalize_place(query)
+    if key in _remote_cache:
+        return _remote_cache[key]
+
+    with _remote_lock:
+        if _remote_client is None:
+            from geopy.geocoders import Nominatim
+            _remote_client = Nominatim(user_agent="mehndi_app")
+
+        wait = REMOTE_MIN_INTERVAL_SECONDS - (time.monotonic() - _last_remote_call)
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            location = _remote_client.geocode(query, timeout=REMOTE_TIMEOUT_SECONDS)
+        finally:
+            _last_remote_call = time.monotonic()
+
+    coords = (location.latitude, location.longitude) if location else None
+    if len(_remote_cache) >= REMOTE_CACHE_SIZE:
+        _remote_cache.clear()
+    _remote_cache[key] = coords
+    return coords
+
+GEOCODER_BACKENDS = [gazetteer_geocode] if GEOCODER_MODE == 'offline' else [gazetteer_geocode, nominatim_geocode]
+
+def set_geocoder_backends(backends):
+    """Replace the chain of geocoder backends"""
+    GEOCODER_BACKENDS[:] = backends
+
+def geocode(query):
+    """Convert a location to (latitude, longitude) with the first backend that knows it"""
+    if not query or not query.strip():
+        return None
+
+    for backend in GEOCODER_BACKENDS:
+        coords = backend(query)
+        if coords:
+            return coords
+    return None
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        queries = ["Connaught Place, New Delhi", "Koramangala, Bengaluru", "400050", "Jaipur, Rajasthan"]
+        load_gazetteer()
+        started = time.perf_counter()
+        for _ in range(10000):
+            for query in queries:
+                gazetteer_geocode(query)
+        elapsed = time.perf_counter() - started
+        print(f"{elapsed / (10000 * len(queries)) * 1e6:.1f} µs per gazetteer lookup")
+    else:
+        print("Usage: python geocoding.py bench")
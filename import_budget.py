@@ -0,0 +1,51 @@
+"""
+Import-time budget report for Mehndi App
+Measures what a cold process pays before the login page renders, and what each
+role's dashboard adds the first time it is opened.
+Run: python import_budget.py
+"""
+
+import statistics
+import subprocess
+import sys
+
+# Milliseconds each import may take in a fresh interpreter
+STARTUP_BUDGET_MS = 1200
+ROLE_MODULES = {
+    'user': ['chat', 'booking', 'folium'],
+    'artist': ['artist'],
+    'admin': ['admin'],
+}
+RUNS = 3
+
+def measure_import(module, preload=None):
+    """Cumulative import time of `module` in ms, after `preload` has been imported"""
+    code = f"import {preload}; import {module}" if preload else f"import {module}"
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True)
+
+    for line in reversed(result.stderr.splitlines()):
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1000
+    return 0.0
+
+def median_import(module, preload=None):
+    return statistics.median(measure_import(module, preload) for _ in range(RUNS))
+
+def main():
+    print("⏱️  Import-time budget")
+    print("=" * 40)
+
+    startup = median_import("main")
+    status = "✅" if startup <= STARTUP_BUDGET_MS else "❌"
+    print(f"{status} Login page (main): {startup:.0f} ms (budget {STARTUP_BUDGET_MS} ms)")
+
+    for role, modules in ROLE_MODULES.items():
+        cost = sum(median_import(module, preload="main") for module in modules)
+        print(f"   First {role} dashboard: +{cost:.0f} ms ({', '.join(modules)})")
+
+    return 0 if startup <= STARTUP_BUDGET_MS else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
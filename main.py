@@ -1,18 +1,11 @@
 import streamlit as st
 from auth import authenticate_user, create_user, hash_password
-from database import init_database, get_user_role, get_nearby_artists
-from admin import admin_dashboard
-from booking import booking_system
-from chat import chat_interface
-from artist import artist_dashboard as artist_main_dashboard
-import sqlite3
-import folium
-from streamlit_folium import st_folium
-import pandas as pd
-from utils import geocode_location, get_default_coordinates
-
-# Initialize database
-init_database()
+from database import ensure_database, get_user_role, find_nearby_artists
+import presence
+import session
+from rate_limit import check_login_rate, reset_login_rate
+import math
+from utils import get_default_coordinates
 
 # Page configuration
 st.set_page_config(
@@ -57,11 +50,22 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 def main():
+    # Tables are created once per process, not on every rerun
+    if not ensure_database():
+        st.error("The database is unavailable. Please try again shortly.")
+        return
+
     # Initialize session state
     if 'user' not in st.session_state:
         st.session_state.user = None
     if 'role' not in st.session_state:
         st.session_state.role = None
+    if 'user_id' not in st.session_state:
+        st.session_state.user_id = None
+
+    # Every rerun of a logged-in session counts as activity
+    if st.session_state.user is not None:
+        presence.heartbeat(st.session_state.user_id)
 
     # Sidebar navigation
     st.sidebar.markdown('<div class="sidebar-header">🪔 Mehndi App</div>', unsafe_allow_html=True)
@@ -78,10 +82,13 @@ def main():
             submit = st.form_submit_button("Login")
 
             if submit:
-                user = authenticate_user(username, password, login_type.lower())
-                if user:
-                    st.session_state.user = username
-                    st.session_state.role = login_type.lower()
+                # Throttle before touching the DB or bcrypt
+                wait = check_login_rate(username, st.context.ip_address)
+                if wait:
+                    st.error(f"Too many login attempts. Please try again in {math.ceil(wait)} seconds.")
+                elif authenticate_user(username, password, login_type.lower()):
+                    reset_login_rate(username)
+                    session.start_session(username, login_type.lower())
                     st.success(f"Welcome {username}!")
                     st.rerun()
                 else:
@@ -118,14 +125,16 @@ def main():
 
         # Logout button
         if st.sidebar.button("Logout"):
-            st.session_state.user = None
-            st.session_state.role = None
+            session.end_session()
             st.rerun()
 
-        # Role-based navigation
+        # Role-based navigation; each dashboard (and its pandas/plotly/folium
+        # dependencies) is imported on first use so the login page starts fast
         if st.session_state.role == "admin":
+            from admin import admin_dashboard
             admin_dashboard()
         elif st.session_state.role == "artist":
+            from artist import artist_dashboard as artist_main_dashboard
             artist_main_dashboard()
         else:
             user_dashboard()
@@ -144,12 +153,12 @@ def user_dashboard():
             st.write(f"Searching for artists near: {location}")
 
             # Get real artists from database
-            artists = get_nearby_artists(location)
+            origin, artists = find_nearby_artists(location)
 
             if artists:
                 # Create map with artist locations
                 st.subheader("📍 Artists Near You")
-                create_artist_map(artists, location)
+                create_artist_map(artists, origin)
 
                 # Display artist listings
                 st.subheader("Available Artists")
@@ -192,62 +201,84 @@ def user_dashboard():
                                 st.info(f"Booking system for {artist['name']} would be implemented here")
             else:
                 st.info("No artists found in your area. Try expanding your search or check back later.")
-                create_empty_map(location)
+                create_empty_map(location, origin)
 
     with tab2:
+        from chat import chat_interface
         chat_interface()
 
     with tab3:
+        from booking import booking_system
         booking_system()
 
     with tab4:
-        st.subheader("Rate & Review Artists")
-        st.write("Rating system would be implemented here")
+        from reviews import user_reviews_tab
+        user_reviews_tab()
 
-def create_artist_map(artists, location):
-    """Create a folium map with artist locations"""
-    try:
-        center_coords = geocode_location(location)
-        if not center_coords:
-            center_coords = get_default_coordinates()
-            st.warning(f"Could not find coordinates for '{location}'. Using default location.")
+# Above this many markers, nearby markers are grouped into clusters
+MAP_CLUSTER_THRESHOLD = 50
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def render_map_html(center_coords, markers, search_label=None):
+    """Build the folium map HTML; cached on the origin and the marker tuple"""
+    import folium
+
+    m = folium.Map(location=center_coords, zoom_start=12)
+
+    if search_label:
+        folium.Marker(center_coords, popup=f"Search area: {search_label}", tooltip="Your location",
+                      icon=folium.Icon(color='blue', icon='info-sign')).add_to(m)
+
+    layer = m
+    if len(markers) > MAP_CLUSTER_THRESHOLD:
+        from folium.plugins import MarkerCluster
+        layer = MarkerCluster().add_to(m)
+
+    for lat, lng, name, popup_content in markers:
+        folium.Marker([lat, lng], popup=popup_content, tooltip=name).add_to(layer)
 
-        m = folium.Map(location=center_coords, zoom_start=12)
+    return m.get_root().render()
 
-        for artist in artists:
-            lat = center_coords[0] + (artists.index(artist) * 0.01)
-            lng = center_coords[1] + (artists.index(artist) * 0.01)
-            popup_content = f"""
+def show_map(html):
+    """Display rendered map HTML"""
+    import streamlit.components.v1 as components
+    components.html(html, width=700, height=400)
+
+def create_artist_map(artists, center_coords):
+    """Create a folium map with artist locations around the search origin"""
+    try:
+        markers = tuple(
+            (artist['latitude'], artist['longitude'], artist['name'], f"""
             <b>{artist['name']}</b><br>
-            ⭐ {artist.get('avg_rating', 0):.1f}/5.0<br>
+            ⭐ {artist.get('avg_rating') or 0:.1f}/5.0<br>
             💰 {artist.get('price_range', '₹500-1500')}<br>
             📍 {artist.get('address', 'Address not available')}<br>
             {'🟢 Online' if artist.get('is_online', False) else '🔴 Offline'}
-            """
-            folium.Marker([lat, lng], popup=popup_content, tooltip=artist['name']).add_to(m)
+            """)
+            for artist in artists
+            if artist.get('latitude') is not None
+        )
 
-        st_folium(m, width=700, height=400)
+        show_map(render_map_html(tuple(center_coords), markers))
+
+        unplaced = len(artists) - len(markers)
+        if unplaced:
+            st.caption(f"{unplaced} artist(s) have no map location yet")
 
     except Exception as e:
         st.error(f"Error creating map: {e}")
         st.info("Map functionality would be displayed here")
 
-def create_empty_map(location):
+def create_empty_map(location, center_coords=None):
     """Create an empty map showing the search area"""
     try:
-        center_coords = geocode_location(location)
         if not center_coords:
             center_coords = get_default_coordinates()
             st.warning(f"Could not find coordinates for '{location}'. Using default location.")
 
-        m = folium.Map(location=center_coords, zoom_start=12)
-        folium.Marker(center_coords, popup=f"Search area: {location}", tooltip="Your location",
-                      icon=folium.Icon(color='blue', icon='info-sign')).add_to(m)
-        st_folium(m, width=700, height=400)
+        show_map(render_map_html(tuple(center_coords), (), search_label=location))
     except Exception as e:
         st.error(f"Error creating map: {e}")
-        st.info("Map functionality would be displayed here")
 
 if __name__ == "__main__":
     main()
-
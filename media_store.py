@@ -0,0 +1,195 @@
+import io
+import os
+import tempfile
+import streamlit as st
+from PIL import Image, ImageOps
+from database import get_db_connection
+from utils import get_file_hash
+
+# Uploaded images are stored once per content hash under MEDIA_DIR/blobs, and
+# metadata-free WebP renditions of each size under MEDIA_DIR/thumbs/<size>.
+# The original is kept as uploaded; pages only ever show the renditions, which
+# thumbnail_worker.py generates from the thumbnail_jobs queue in a separate process.
+MEDIA_DIR = os.environ.get('MEHNDI_MEDIA_DIR',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), 'media'))
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+MAX_IMAGE_PIXELS = 40_000_000
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+
+# Longest edge in pixels for each rendition
+THUMBNAIL_SIZES = {'thumb': 320, 'medium': 640, 'large': 1280}
+WEBP_QUALITY = 80
+# Encoder effort (0-6); above 2 the encode time roughly triples for little size gain at these sizes
+WEBP_METHOD = 1
+
+# Pages with pending thumbnails check their status this often
+THUMBNAIL_POLL_SECONDS = 2
+
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+def blob_path(blob_hash):
+    """Path of the original upload for a content hash"""
+    return os.path.join(MEDIA_DIR, 'blobs', blob_hash[:2], blob_hash)
+
+def thumbnail_path(blob_hash, size='thumb'):
+    """Path of the WebP rendition of a blob"""
+    return os.path.join(MEDIA_DIR, 'thumbs', size, blob_hash[:2], f"{blob_hash}.webp")
+
+def _write_atomic(path, data):
+    """Write through a temp file so readers never see a partial image"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def inspect_image(content):
+    """Read format and dimensions from the image header; raises ValueError if not an allowed image"""
+    if len(content) > MAX_UPLOAD_BYTES:
+        raise ValueError(f"Images must be under {MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            image_format, (width, height) = image.format, image.size
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        # Pillow reports unknown formats and truncated headers as OSError, some bad headers as SyntaxError
+        raise ValueError("Unsupported or corrupt image")
+
+    if image_format not in ALLOWED_FORMATS:
+        raise ValueError("Only JPEG, PNG and WebP images are supported")
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ValueError("Image dimensions are too large")
+    return image_format, width, height
+
+def render_thumbnails(content):
+    """Decode an image once and encode a WebP rendition per size; returns {size: bytes}"""
+    largest = max(THUMBNAIL_SIZES.values())
+    with Image.open(io.BytesIO(content)) as image:
+        # JPEGs can be decoded at 1/2, 1/4 or 1/8 scale, which is most of the cost for large photos
+        image.draft('RGB', (largest, largest))
+        # Apply the EXIF rotation before the metadata is dropped
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+        renditions = {}
+        encoded_size, data = None, None
+        for size, edge in sorted(THUMBNAIL_SIZES.items(), key=lambda item: -item[1]):
+            # Each size is reduced from the previous one; reducing_gap keeps that close to Lanczos quality
+            image.thumbnail((edge, edge), Image.BICUBIC, reducing_gap=2.0)
+            if image.size != encoded_size:
+                output = io.BytesIO()
+                # Nothing from the original (EXIF, GPS, ICC comments) is passed to the encoder
+                image.save(output, 'WEBP', quality=WEBP_QUALITY, method=WEBP_METHOD)
+                encoded_size, data = image.size, output.getvalue()
+            # An image already smaller than this size is not upscaled, so the last encoding serves
+            renditions[size] = data
+    return renditions
+
+def write_renditions(blob_hash):
+    """Render and write every size of a stored blob; returns None, or the error message"""
+    try:
+        with open(blob_path(blob_hash), 'rb') as f:
+            renditions = render_thumbnails(f.read())
+        for size, data in renditions.items():
+            _write_atomic(thumbnail_path(blob_hash, size), data)
+        return None
+    except Exception as e:
+        # Reported per blob: one bad image must not take down the worker's pool.map
+        return str(e) or type(e).__name__
+
+def store_image(content):
+    """Store an uploaded image once per content hash; returns the hash.
+
+    Only the header is read here. A new blob is queued for thumbnails (by a trigger
+    on media_blobs), and a duplicate upload reuses the existing blob and renditions.
+    """
+    image_format, width, height = inspect_image(content)
+    blob_hash = get_file_hash(content)
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT OR IGNORE INTO media_blobs (hash, format, width, height, size_bytes)
+        VALUES (?, ?, ?, ?, ?)
+    """, (blob_hash, image_format, width, height, len(content)))
+    is_new = cursor.rowcount == 1
+
+    if is_new or not os.path.exists(blob_path(blob_hash)):
+        _write_atomic(blob_path(blob_hash), content)
+    conn.commit()
+    conn.close()
+    return blob_hash
+
+def get_thumbnail(blob_hash, size='thumb'):
+    """Path of a blob's rendition, or None while it is still being generated"""
+    path = thumbnail_path(blob_hash, size)
+    return path if os.path.exists(path) else None
+
+def add_portfolio_image(artist_id, content, caption=None):
+    """Store an image and add it to an artist's portfolio; returns False if it was already there"""
+    blob_hash = store_image(content)
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        INSERT OR IGNORE INTO portfolio_images (artist_id, blob_hash, caption)
+        VALUES (?, ?, ?)
+    """, (artist_id, blob_hash, caption))
+    added = cursor.rowcount == 1
+    conn.commit()
+    conn.close()
+    return added
+
+def get_portfolio_images(artist_id):
+    """Get an artist's portfolio images, newest first"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT p.id, p.blob_hash, p.caption, p.created_at, m.width, m.height, m.thumbnail_status
+        FROM portfolio_images p
+        JOIN media_blobs m ON p.blob_hash = m.hash
+        WHERE p.artist_id = ?
+        ORDER BY p.created_at DESC, p.id DESC
+    """, (artist_id,))
+    images = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return images
+
+def delete_portfolio_image(artist_id, image_id):
+    """Remove an image from an artist's portfolio; the blob stays for other references"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM portfolio_images WHERE id = ? AND artist_id = ?", (image_id, artist_id))
+    deleted = cursor.rowcount == 1
+    conn.commit()
+    conn.close()
+    return deleted
+
+def get_thumbnail_statuses(blob_hashes):
+    """Map each hash to 'pending', 'ready' or 'failed' in one query, for cheap polling"""
+    if not blob_hashes:
+        return {}
+    conn = get_db_connection()
+    placeholders = ','.join('?' * len(blob_hashes))
+    rows = conn.execute(f"SELECT hash, thumbnail_status FROM media_blobs WHERE hash IN ({placeholders})",
+                        list(blob_hashes)).fetchall()
+    conn.close()
+    return {row['hash']: row['thumbnail_status'] for row in rows}
+
+def watch_thumbnails(blob_hashes):
+    """Poll pending thumbnails from a fragment and rerun the page once any of them is finished"""
+    pending = list(blob_hashes)
+    if not pending:
+        return
+
+    # Only this fragment reruns on the timer: one indexed query per poll until something changes
+    @st.fragment(run_every=THUMBNAIL_POLL_SECONDS)
+    def poll():
+        statuses = get_thumbnail_statuses(pending)
+        if any(status != 'pending' for status in statuses.values()):
+            st.rerun()
+
+    poll()
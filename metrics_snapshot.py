@@ -0,0 +1,162 @@
+"""
+Admin metrics snapshots for Mehndi App
+The admin dashboard's aggregates are computed every few minutes by a background
+job into metrics_snapshots; the dashboard renders the latest row in one read.
+Run: python metrics_snapshot.py refresh | run
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from database import get_db_connection, init_database
+
+REFRESH_MINUTES = float(os.environ.get('MEHNDI_METRICS_REFRESH_MINUTES', 5))
+GROWTH_PERIOD_DAYS = 30
+TREND_MONTHS = 6
+RETENTION_DAYS = 30
+
+_refresher_lock = threading.Lock()
+_refresher_started = False
+
+def _growth(current, previous):
+    """Percent change from previous to current, or None when there is nothing to compare with"""
+    if not previous:
+        return None
+    return round((current - previous) * 100.0 / previous, 1)
+
+def compute_metrics(conn):
+    """Run the dashboard aggregates in one read transaction"""
+    today = datetime.now().date()
+    period_start = today - timedelta(days=GROWTH_PERIOD_DAYS)
+    previous_start = period_start - timedelta(days=GROWTH_PERIOD_DAYS)
+    cursor = conn.cursor()
+    cursor.execute("BEGIN")
+
+    cursor.execute("""
+        SELECT COALESCE(SUM(role = 'user'), 0) as total,
+               COALESCE(SUM(role = 'user' AND created_at < :period_start), 0) as before_period,
+               COALESCE(SUM(last_active >= :today), 0) as active_today,
+               COALESCE(SUM(last_active >= :week_ago), 0) as active_week,
+               COALESCE(SUM(last_active >= :month_ago), 0) as active_month
+        FROM users
+    """, {'period_start': str(period_start), 'today': str(today),
+          'week_ago': str(today - timedelta(days=7)), 'month_ago': str(today - timedelta(days=30))})
+    users = dict(cursor.fetchone())
+
+    cursor.execute("""
+        SELECT COUNT(*) as total, COALESCE(SUM(created_at < ?), 0) as before_period
+        FROM artists WHERE status = 'approved'
+    """, (str(period_start),))
+    artists = dict(cursor.fetchone())
+
+    # Bookings and revenue compare this period's appointments with the previous period's
+    cursor.execute("""
+        SELECT COALESCE(SUM(total_bookings), 0) as total_bookings,
+               COALESCE(SUM(revenue), 0) as revenue,
+               COALESCE(SUM(CASE WHEN day > :period_start AND day <= :today THEN total_bookings END), 0) as period_bookings,
+               COALESCE(SUM(CASE WHEN day > :previous_start AND day <= :period_start THEN total_bookings END), 0) as previous_bookings,
+               COALESCE(SUM(CASE WHEN day > :period_start AND day <= :today THEN revenue END), 0) as period_revenue,
+               COALESCE(SUM(CASE WHEN day > :previous_start AND day <= :period_start THEN revenue END), 0) as previous_revenue
+        FROM booking_daily_stats
+    """, {'today': str(today), 'period_start': str(period_start), 'previous_start': str(previous_start)})
+    bookings = dict(cursor.fetchone())
+
+    cursor.execute("""
+        SELECT strftime('%Y-%m', day) as month,
+               SUM(total_bookings) as bookings,
+               SUM(gross_amount) as gross_amount,
+               SUM(revenue) as revenue
+        FROM booking_daily_stats
+        WHERE day >= date('now', 'start of month', ?)
+        GROUP BY month ORDER BY month
+    """, (f"-{TREND_MONTHS - 1} months",))
+    monthly = [dict(row) for row in cursor.fetchall()]
+
+    conn.rollback()
+
+    return {
+        'total_users': users['total'],
+        'total_artists': artists['total'],
+        'total_bookings': bookings['total_bookings'],
+        'revenue': bookings['revenue'],
+        'growth_period_days': GROWTH_PERIOD_DAYS,
+        'growth': {
+            'users': _growth(users['total'], users['before_period']),
+            'artists': _growth(artists['total'], artists['before_period']),
+            'bookings': _growth(bookings['period_bookings'], bookings['previous_bookings']),
+            'revenue': _growth(bookings['period_revenue'], bookings['previous_revenue']),
+        },
+        'active': {
+            'today': users['active_today'],
+            'week': users['active_week'],
+            'month': users['active_month'],
+        },
+        'monthly': monthly,
+    }
+
+def refresh_snapshot(force=False):
+    """Store a new snapshot unless the latest is still fresh; returns the new taken_at or None"""
+    conn = get_db_connection()
+    try:
+        now = time.time()
+        latest = conn.execute("SELECT MAX(taken_at) FROM metrics_snapshots").fetchone()[0]
+        if not force and latest is not None and now - latest < REFRESH_MINUTES * 60:
+            return None
+
+        metrics = compute_metrics(conn)
+
+        # Several app processes may run the refresher; the write re-checks freshness atomically
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO metrics_snapshots (taken_at, metrics)
+            SELECT ?, ? WHERE ? OR COALESCE((SELECT MAX(taken_at) FROM metrics_snapshots), 0) <= ?
+        """, (now, json.dumps(metrics), force, now - REFRESH_MINUTES * 60))
+        inserted = cursor.rowcount == 1
+        cursor.execute("DELETE FROM metrics_snapshots WHERE taken_at < ?", (now - RETENTION_DAYS * 86400,))
+        conn.commit()
+        return now if inserted else None
+    finally:
+        conn.close()
+
+def get_latest_snapshot():
+    """Latest snapshot as (taken_at, metrics), computing the first one if none exists yet"""
+    conn = get_db_connection()
+    row = conn.execute("SELECT taken_at, metrics FROM metrics_snapshots ORDER BY taken_at DESC LIMIT 1").fetchone()
+    conn.close()
+
+    if row is None:
+        refresh_snapshot(force=True)
+        return get_latest_snapshot()
+    return row['taken_at'], json.loads(row['metrics'])
+
+def _refresh_forever():
+    while True:
+        try:
+            refresh_snapshot()
+        except Exception as e:
+            print(f"Metrics snapshot failed: {e}", file=sys.stderr)
+        time.sleep(REFRESH_MINUTES * 60)
+
+def start_refresher():
+    """Start the background refresh thread once per process"""
+    global _refresher_started
+    with _refresher_lock:
+        if _refresher_started:
+            return
+        threading.Thread(target=_refresh_forever, name='metrics-snapshot', daemon=True).start()
+        _refresher_started = True
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    init_database()
+
+    if command == "refresh":
+        refresh_snapshot(force=True)
+        print("📊 Metrics snapshot refreshed")
+    elif command == "run":
+        _refresh_forever()
+    else:
+        print("Usage: python metrics_snapshot.py refresh | run")
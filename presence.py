@@ -0,0 +1,113 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+# Process-wide presence state. Every Streamlit session in this process shares it, so
+# presence reads are set lookups and users.is_online is only written in batches.
+DEFAULT_TIMEOUT_SECONDS = 30 * 60
+FLUSH_INTERVAL_SECONDS = 60
+
+_lock = threading.Lock()
+_online = set()
+_last_seen = {}
+_timeouts = {}
+_held_offline = set()
+_dirty = set()
+_last_flush = time.time()
+
+def _expired(user_id, now):
+    """Whether a user's last heartbeat is older than their auto-offline timeout"""
+    timeout = _timeouts.get(user_id, DEFAULT_TIMEOUT_SECONDS)
+    return timeout is not None and now - _last_seen.get(user_id, 0) >= timeout
+
+def heartbeat(user_id):
+    """Record activity for a user (called on every rerun) and flush to the DB when due"""
+    if user_id is None:
+        return
+
+    now = time.time()
+    with _lock:
+        _last_seen[user_id] = now
+        if user_id not in _held_offline:
+            _online.add(user_id)
+        _dirty.add(user_id)
+        flush_due = now - _last_flush >= FLUSH_INTERVAL_SECONDS
+
+    if flush_due:
+        flush_presence()
+
+def set_online(user_id, online):
+    """Explicitly go online, or go offline and stay offline until set_online(user_id, True)"""
+    now = time.time()
+    with _lock:
+        _last_seen[user_id] = now
+        if online:
+            _held_offline.discard(user_id)
+            _online.add(user_id)
+        else:
+            _held_offline.add(user_id)
+            _online.discard(user_id)
+        _dirty.add(user_id)
+
+def end_session(user_id):
+    """Mark a user offline on logout; their next heartbeat brings them back online"""
+    with _lock:
+        _online.discard(user_id)
+        _dirty.add(user_id)
+
+def set_timeout(user_id, minutes):
+    """Set how long a user may be inactive before going offline (None disables auto offline)"""
+    with _lock:
+        _timeouts[user_id] = minutes * 60 if minutes else None
+
+def is_online(user_id):
+    """Check whether a user is online"""
+    return user_id in _online and not _expired(user_id, time.time())
+
+def online_user_ids():
+    """Get the ids of all users currently online"""
+    now = time.time()
+    with _lock:
+        return {user_id for user_id in _online if not _expired(user_id, now)}
+
+def apply_presence(rows, key='user_id'):
+    """Overwrite the stale is_online column of result rows with live presence"""
+    for row in rows:
+        row['is_online'] = is_online(row.get(key))
+    return rows
+
+def flush_presence():
+    """Expire inactive users and write pending presence changes to users in one batch"""
+    global _last_flush
+    from database import get_db_connection
+
+    now = time.time()
+    with _lock:
+        for user_id in [user_id for user_id in _online if _expired(user_id, now)]:
+            _online.discard(user_id)
+            _dirty.add(user_id)
+
+        updates = [
+            (user_id in _online,
+             datetime.fromtimestamp(_last_seen.get(user_id, now), timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+             user_id)
+            for user_id in _dirty
+        ]
+        _dirty.clear()
+        _last_flush = now
+
+    if not updates:
+        return 0
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.executemany("UPDATE users SET is_online = ?, last_active = ? WHERE id = ?", updates)
+        conn.commit()
+        conn.close()
+        return len(updates)
+    except Exception:
+        # Keep the changes for the next flush
+        with _lock:
+            _dirty.update(user_id for _, _, user_id in updates)
+        return 0
@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+
+# Token buckets for login attempts. Each username and each client address gets
+# LOGIN_BURST attempts that refill at LOGIN_REFILL_SECONDS per attempt; an empty
+# bucket rejects the attempt before any DB lookup or bcrypt work.
+LOGIN_BURST = int(os.environ.get('MEHNDI_LOGIN_BURST', 5))
+LOGIN_REFILL_SECONDS = float(os.environ.get('MEHNDI_LOGIN_REFILL_SECONDS', 60))
+CLIENT_BURST = int(os.environ.get('MEHNDI_LOGIN_CLIENT_BURST', 20))
+
+# "memory" keeps buckets per process; "sqlite" shares them through the app database
+# so every process behind a load balancer sees the same limits.
+RATE_LIMIT_STORE = os.environ.get('MEHNDI_RATE_LIMIT_STORE', 'memory')
+
+MAX_BUCKETS = 100000
+
+_lock = threading.Lock()
+_buckets = {}
+_local = threading.local()
+
+def _refilled(tokens, updated, capacity, now):
+    return min(capacity, tokens + (now - updated) / LOGIN_REFILL_SECONDS)
+
+def _wait_for(available):
+    """Seconds until every bucket has a token again, 0 if all have one now"""
+    return max((1 - tokens) * LOGIN_REFILL_SECONDS for tokens in available) if min(available) < 1 else 0
+
+def _take_memory(buckets, now):
+    """Take a token from every (key, capacity) bucket, or from none; returns seconds to wait, 0 if allowed"""
+    with _lock:
+        available = [_refilled(*_buckets.get(key, (capacity, now)), capacity, now) for key, capacity in buckets]
+        wait = _wait_for(available)
+        if not wait:
+            for (key, _), tokens in zip(buckets, available):
+                _buckets[key] = (tokens - 1, now)
+            if len(_buckets) > MAX_BUCKETS:
+                _prune(now)
+        return wait
+
+def _prune(now):
+    """Drop buckets that have refilled completely; they behave like missing ones"""
+    full = [key for key, (tokens, updated) in _buckets.items()
+            if tokens + (now - updated) / LOGIN_REFILL_SECONDS >= CLIENT_BURST]
+    for key in full:
+        del _buckets[key]
+
+def _sqlite_connection():
+    """Per-thread connection for the bucket table; buckets are disposable, so skip fsync"""
+    import database
+
+    conn = getattr(_local, 'conn', None)
+    if conn is None or _local.path != database.DB_PATH:
+        conn = database.get_db_connection()
+        conn.execute("PRAGMA synchronous = OFF")
+        _local.conn, _local.path = conn, database.DB_PATH
+    return conn
+
+def _available_sqlite(conn, buckets, now):
+    available = []
+    for key, capacity in buckets:
+        row = conn.execute("SELECT tokens, updated_at FROM login_buckets WHERE key = ?", (key,)).fetchone()
+        available.append(capacity if row is None else _refilled(row[0], row[1], capacity, now))
+    return available
+
+def _take_sqlite(buckets, now):
+    """Take a token from every bucket shared through the login_buckets table, or from none"""
+    conn = _sqlite_connection()
+
+    # Rejections only read: an untouched bucket keeps refilling from its updated_at
+    wait = _wait_for(_available_sqlite(conn, buckets, now))
+    if wait:
+        return wait
+
+    # Another process may have taken the last token since the read, so decide again under the write lock
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        available = _available_sqlite(conn, buckets, now)
+        wait = _wait_for(available)
+        if not wait:
+            conn.executemany("""
+                INSERT INTO login_buckets (key, tokens, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at
+            """, [(key, tokens - 1, now) for (key, _), tokens in zip(buckets, available)])
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return wait
+
+def _take(buckets, now):
+    if RATE_LIMIT_STORE == 'sqlite':
+        return _take_sqlite(buckets, now)
+    return _take_memory(buckets, now)
+
+def check_login_rate(username, client=None):
+    """Spend one login attempt for the username and client; returns seconds to wait, 0 if allowed.
+
+    Both buckets are checked before either is spent, so an attempt rejected for the
+    client does not use up the username's allowance (and vice versa).
+    """
+    buckets = [(f"user:{username.strip().lower()}", LOGIN_BURST)]
+    if client:
+        buckets.append((f"client:{client}", CLIENT_BURST))
+    return _take(buckets, time.time())
+
+def reset_login_rate(username):
+    """Refill the username's bucket after a successful login"""
+    key = f"user:{username.strip().lower()}"
+    if RATE_LIMIT_STORE == 'sqlite':
+        conn = _sqlite_connection()
+        conn.execute("DELETE FROM login_buckets WHERE key = ?", (key,))
+        conn.commit()
+    else:
+        with _lock:
+            _buckets.pop(key, None)
+
+def benchmark_rejections(attempts=100000):
+    """Measure how many rejected login attempts per second the limiter handles"""
+    username = "benchmark-user"
+    while not check_login_rate(username, "benchmark-client"):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(attempts):
+        check_login_rate(username, "benchmark-client")
+    elapsed = time.perf_counter() - started
+
+    reset_login_rate(username)
+    return attempts / elapsed
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        if RATE_LIMIT_STORE == 'sqlite':
+            from database import init_database
+            init_database()
+        print(f"{benchmark_rejections():,.0f} rejected attempts/s ({RATE_LIMIT_STORE} store)")
+    else:
+        print("Usage: python rate_limit.py bench")
@@ -0,0 +1,188 @@
+import sqlite3
+import streamlit as st
+from database import get_db_connection
+from session import current_session
+
+REVIEWS_PAGE_SIZE = 10
+
+def submit_review(user_id, booking_id, rating, review_text=""):
+    """Review a completed booking; each booking can be reviewed once"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        # Only the customer's own completed booking qualifies; the artist comes from the booking
+        cursor.execute("""
+            INSERT INTO reviews (booking_id, user_id, artist_id, rating, review_text, created_at)
+            SELECT id, user_id, artist_id, ?, ?, datetime('now')
+            FROM bookings
+            WHERE id = ? AND user_id = ? AND status = 'completed'
+        """, (rating, review_text, booking_id, user_id))
+        created = cursor.rowcount == 1
+
+        conn.commit()
+        conn.close()
+
+        if not created:
+            st.error("Only completed bookings can be reviewed")
+        return created
+    except sqlite3.IntegrityError:
+        conn.close()
+        st.error("You have already reviewed this booking")
+        return False
+    except Exception as e:
+        st.error(f"Error submitting review: {e}")
+        return False
+
+def get_reviewable_bookings(user_id):
+    """Get the user's completed bookings that have not been reviewed yet"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT b.id, b.appointment_date, b.service_type, a.name as artist_name
+            FROM bookings b
+            JOIN artists a ON b.artist_id = a.id
+            LEFT JOIN reviews r ON r.booking_id = b.id
+            WHERE b.user_id = ? AND b.status = 'completed' AND r.id IS NULL
+            ORDER BY b.appointment_date DESC
+        """, (user_id,))
+
+        results = cursor.fetchall()
+        conn.close()
+
+        return [dict(row) for row in results]
+    except Exception as e:
+        st.error(f"Error getting bookings to review: {e}")
+        return []
+
+def get_rating_stats(artist_id):
+    """Get an artist's average rating and 1-5 star distribution from the maintained histogram"""
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT * FROM artist_rating_stats WHERE artist_id = ?", (artist_id,))
+        row = cursor.fetchone()
+        conn.close()
+
+        if not row or not row['review_count']:
+            return {"average": 0, "distribution": [0] * 5, "total": 0}
+
+        return {
+            "average": round(row['rating_sum'] / row['review_count'], 1),
+            "distribution": [row[f'stars_{stars}'] for stars in range(1, 6)],
+            "total": row['review_count']
+        }
+    except Exception as e:
+        st.error(f"Error getting rating stats: {e}")
+        return {"average": 0, "distribution": [0] * 5, "total": 0}
+
+def get_reviews_page(artist_id, after=None, page_size=REVIEWS_PAGE_SIZE):
+    """Get one page of an artist's reviews, newest first.
+
+    `after` is the (created_at, id) cursor returned with the previous page; the
+    next cursor is None on the last page.
+    """
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        query = """
+            SELECT r.id, r.rating, r.review_text, r.created_at,
+                   u.username as reviewer_name, b.appointment_date
+            FROM reviews r
+            LEFT JOIN users u ON r.user_id = u.id
+            LEFT JOIN bookings b ON r.booking_id = b.id
+            WHERE r.artist_id = ?
+        """
+        params = [artist_id]
+
+        if after:
+            query += " AND (r.created_at, r.id) < (?, ?)"
+            params.extend(after)
+
+        query += " ORDER BY r.created_at DESC, r.id DESC LIMIT ?"
+        params.append(page_size + 1)
+
+        cursor.execute(query, params)
+        reviews = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+
+        next_cursor = None
+        if len(reviews) > page_size:
+            reviews = reviews[:page_size]
+            next_cursor = (reviews[-1]['created_at'], reviews[-1]['id'])
+        return reviews, next_cursor
+    except Exception as e:
+        st.error(f"Error getting reviews: {e}")
+        return [], None
+
+def review_form(booking_id, user_id, key_prefix="review"):
+    """Rating form for one completed booking"""
+    with st.form(f"{key_prefix}_{booking_id}"):
+        rating = st.slider("Rating", 1, 5, 5, key=f"{key_prefix}_rating_{booking_id}")
+        review_text = st.text_area("Your review (optional)", key=f"{key_prefix}_text_{booking_id}")
+
+        if st.form_submit_button("Submit Review"):
+            if submit_review(user_id, booking_id, rating, review_text.strip()):
+                st.success("Thanks for your review!")
+                st.rerun()
+
+def display_rating_summary(artist_id):
+    """Show the average rating and star distribution"""
+    stats = get_rating_stats(artist_id)
+
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.metric("Average Rating", f"{stats['average']:.1f}⭐", f"{stats['total']} reviews", delta_color="off")
+    with col2:
+        for stars in range(5, 0, -1):
+            count = stats['distribution'][stars - 1]
+            share = count / stats['total'] if stats['total'] else 0
+            st.progress(share, text=f"{stars}⭐  {count}")
+
+def display_reviews(artist_id, key_prefix="reviews"):
+    """Show an artist's reviews one page at a time"""
+    cursors_key = f"{key_prefix}_cursors_{artist_id}"
+    cursors = st.session_state.setdefault(cursors_key, [None])
+
+    reviews, next_cursor = get_reviews_page(artist_id, cursors[-1])
+
+    if not reviews:
+        st.info("No reviews yet. Complete some bookings to get reviews!")
+        return
+
+    for review in reviews:
+        with st.expander(f"⭐ {review['rating']}/5 - {review['reviewer_name'] or 'Customer'} ({review['appointment_date'] or 'N/A'})"):
+            st.write(f"**Rating:** {review['rating']}/5")
+            if review['review_text']:
+                st.write(f"**Review:** {review['review_text']}")
+            st.caption(f"Reviewed on: {review['created_at']}")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if len(cursors) > 1 and st.button("⬅️ Newer", key=f"{key_prefix}_newer_{artist_id}"):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if next_cursor and st.button("Older ➡️", key=f"{key_prefix}_older_{artist_id}"):
+            cursors.append(next_cursor)
+            st.rerun()
+
+def user_reviews_tab():
+    """Reviews tab of the user dashboard: rate completed bookings"""
+    st.subheader("Rate & Review Artists")
+
+    user_id = current_session()['user_id']
+    bookings = get_reviewable_bookings(user_id)
+
+    if not bookings:
+        st.info("No completed bookings waiting for a review.")
+        return
+
+    for booking in bookings:
+        service = f" • {booking['service_type']}" if booking['service_type'] else ""
+        with st.expander(f"{booking['artist_name']} - {booking['appointment_date']}{service}"):
+            review_form(booking['id'], user_id, key_prefix="tab_review")
@@ -0,0 +1,74 @@
+import threading
+import streamlit as st
+from database import get_user_profile, get_artist_id
+from settings_store import inactive_timeout_minutes
+import presence
+
+# Profile versions are shared by every session in the process. Writers bump a user's
+# version and each session reloads its cached profile the next time it sees a mismatch.
+_lock = threading.Lock()
+_profile_versions = {}
+
+SESSION_KEY = 'session'
+
+def invalidate_profile(user_id):
+    """Mark a user's cached profile as stale in every session"""
+    with _lock:
+        _profile_versions[user_id] = _profile_versions.get(user_id, 0) + 1
+
+def start_session(username, role):
+    """Create the session for a logged-in user with their ids and a profile snapshot"""
+    profile = get_user_profile(username)
+    if not profile:
+        return None
+
+    # users.id comes first in the users/artists join, so 'id' is the user id
+    user_id = profile['id']
+    session = {
+        'username': username,
+        'role': role,
+        'user_id': user_id,
+        'artist_id': get_artist_id(username) if role == 'artist' else None,
+        'profile': profile,
+        'profile_version': _profile_versions.get(user_id, 0),
+    }
+
+    st.session_state[SESSION_KEY] = session
+    st.session_state.user = username
+    st.session_state.role = role
+    st.session_state.user_id = user_id
+
+    if session['artist_id']:
+        presence.set_timeout(user_id, inactive_timeout_minutes(session['artist_id']))
+    return session
+
+def current_session():
+    """Get the logged-in user's session; a login without one is sent back to the login page"""
+    session = st.session_state.get(SESSION_KEY)
+    if session is None:
+        # Session state from before sessions were stored, or one already ended: log in again
+        end_session()
+        st.rerun()
+    return session
+
+def get_session_profile():
+    """Get the cached profile for the logged-in user, reloading it only after an update"""
+    session = current_session()
+    version = _profile_versions.get(session['user_id'], 0)
+    if session['profile_version'] != version:
+        profile = get_user_profile(session['username'])
+        if profile:
+            session['profile'] = profile
+            session['profile_version'] = version
+    return session['profile']
+
+def end_session():
+    """Log out the current user"""
+    session = st.session_state.get(SESSION_KEY)
+    if session is not None:
+        presence.end_session(session['user_id'])
+
+    st.session_state[SESSION_KEY] = None
+    st.session_state.user = None
+    st.session_state.role = None
+    st.session_state.user_id = None
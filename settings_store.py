@@ -0,0 +1,100 @@
+import json
+import threading
+import streamlit as st
+from database import get_db_connection
+
+# Typed defaults for every artist setting. Stored values are JSON in artist_settings and
+# decoded once per process; reads after that are dict lookups.
+DEFAULT_ARTIST_SETTINGS = {
+    'booking_notifications': True,
+    'message_notifications': True,
+    'review_notifications': True,
+    'email_notifications': True,
+    'sms_notifications': False,
+    'reminder_notifications': True,
+    'advance_booking_days': 30,
+    'buffer_time': 0,
+    'auto_accept_bookings': False,
+    'require_deposit': False,
+    'auto_offline': True,
+    'inactive_minutes': 30,
+    'work_hours': False,
+    'start_hour': "09:00",
+    'end_hour': "17:00",
+    'work_days': [],
+}
+
+# Buffer time choices shown to artists, in minutes
+BUFFER_TIME_OPTIONS = {
+    "No buffer": 0,
+    "15 minutes": 15,
+    "30 minutes": 30,
+    "1 hour": 60,
+}
+
+_lock = threading.Lock()
+_cache = {}
+
+def _load_artist_settings(artist_id):
+    """Read an artist's stored settings on top of the defaults"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT key, value FROM artist_settings WHERE artist_id = ?", (artist_id,))
+    rows = cursor.fetchall()
+    conn.close()
+
+    settings = dict(DEFAULT_ARTIST_SETTINGS)
+    settings.update((row['key'], json.loads(row['value'])) for row in rows)
+    if isinstance(settings['buffer_time'], str):
+        # Migrated settings hold the label that was shown in the form
+        settings['buffer_time'] = BUFFER_TIME_OPTIONS.get(settings['buffer_time'], 0)
+    return settings
+
+def get_artist_settings(artist_id):
+    """Get all settings for an artist, loading them into the process cache on first use"""
+    settings = _cache.get(artist_id)
+    if settings is None:
+        try:
+            settings = _load_artist_settings(artist_id)
+        except Exception as e:
+            st.error(f"Error loading settings: {e}")
+            return dict(DEFAULT_ARTIST_SETTINGS)
+        with _lock:
+            _cache[artist_id] = settings
+    return settings
+
+def save_artist_settings(artist_id, settings):
+    """Upsert the given settings for an artist and refresh the cached copy"""
+    unknown = set(settings) - set(DEFAULT_ARTIST_SETTINGS)
+    if unknown:
+        st.error(f"Unknown settings: {', '.join(sorted(unknown))}")
+        return False
+
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.executemany("""
+            INSERT INTO artist_settings (artist_id, key, value, updated_at)
+            VALUES (?, ?, ?, datetime('now'))
+            ON CONFLICT (artist_id, key) DO UPDATE SET
+                value = excluded.value,
+                updated_at = excluded.updated_at
+        """, [(artist_id, key, json.dumps(value)) for key, value in settings.items()])
+
+        conn.commit()
+        conn.close()
+
+        with _lock:
+            cached = _cache.get(artist_id)
+            if cached is not None:
+                _cache[artist_id] = {**cached, **settings}
+        return True
+    except Exception as e:
+        st.error(f"Error saving settings: {e}")
+        return False
+
+def inactive_timeout_minutes(artist_id):
+    """Minutes of inactivity before the artist goes offline, or None if auto offline is disabled"""
+    settings = get_artist_settings(artist_id)
+    return settings['inactive_minutes'] if settings['auto_offline'] else None
@@ -115,6 +115,130 @@ def test_utils():
         print(f"❌ Utils test error: {e}")
         return False
 
+def test_geocode_worker():
+    """Test the geocoding queue against a local stand-in for Nominatim"""
+    import asyncio
+    import json
+    import tempfile
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+    class FakeNominatim(BaseHTTPRequestHandler):
+        def do_GET(self):
+            found = "Unknown" not in self.path
+            body = json.dumps([{"lat": "12.5", "lon": "77.5"}] if found else []).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), FakeNominatim)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    import database
+    import geocode_worker
+    original_path, original_url = database.DB_PATH, geocode_worker.NOMINATIM_URL
+    try:
+        database.DB_PATH = os.path.join(tempfile.mkdtemp(), "geocode_test.db")
+        geocode_worker.NOMINATIM_URL = f"http://127.0.0.1:{server.server_port}/search"
+        database.init_database()
+
+        conn = database.get_db_connection()
+        conn.execute("INSERT INTO artists (name, address) VALUES ('A', '12 Lake Road, Somewhere Town')")
+        conn.execute("INSERT INTO artists (name, address) VALUES ('B', 'Unknown Lane')")
+        conn.execute("INSERT INTO artists (name, address) VALUES ('C', 'Karol Bagh, New Delhi')")
+        conn.commit()
+
+        found, missing, retried = asyncio.run(geocode_worker.run_worker(rate=100))
+        coords = dict(conn.execute("SELECT name, latitude FROM artists").fetchall())
+        conn.close()
+
+        if (found, missing, retried) == (2, 1, 0) and coords == {'A': 12.5, 'B': None, 'C': 28.6519}:
+            print("✅ Geocoding worker working")
+            return True
+        print(f"❌ Geocoding worker failed: {(found, missing, retried)} {coords}")
+        return False
+    except Exception as e:
+        print(f"❌ Geocoding worker test error: {e}")
+        return False
+    finally:
+        database.DB_PATH, geocode_worker.NOMINATIM_URL = original_path, original_url
+        server.shutdown()
+
+def test_exports():
+    """Test that booking exports are accepted by st.download_button's deferred data"""
+    import tempfile
+    from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+    import database
+    from artist_booking import _all_bookings_sql
+    from exports import BOOKING_EXPORT_COLUMNS, BOOKING_EXPORT_SELECT, EXPORT_FORMATS, export_download, export_format_options
+
+    original_path = database.DB_PATH
+    try:
+        database.DB_PATH = os.path.join(tempfile.mkdtemp(), "exports_test.db")
+        database.init_database()
+
+        conn = database.get_db_connection()
+        conn.execute("INSERT INTO users (username, password, role) VALUES ('export-artist', '-', 'artist')")
+        conn.execute("INSERT INTO users (username, password, role) VALUES ('export-user', '-', 'user')")
+        conn.execute("""
+            INSERT INTO artists (user_id, name) SELECT id, 'Export Artist' FROM users WHERE username = 'export-artist'
+        """)
+        conn.execute("""
+            INSERT INTO bookings (user_id, artist_id, appointment_date, start_time, end_time, status, amount)
+            SELECT (SELECT id FROM users WHERE username = 'export-user'), (SELECT id FROM artists WHERE name = 'Export Artist'),
+                   '2024-05-01', '10:00 AM', '12:00 PM', 'confirmed', 1500
+        """)
+        conn.commit()
+        conn.close()
+
+        filters, params = _all_bookings_sql('export-artist')
+        for label in export_format_options():
+            extension = EXPORT_FORMATS[label][0]
+            data = lambda: export_download(BOOKING_EXPORT_SELECT + filters, params, BOOKING_EXPORT_COLUMNS, extension)
+            content, _ = convert_data_to_bytes_and_infer_mime(data(), TypeError(f"unsupported {label} export"))
+            expected = b"PAR1" if extension == 'parquet' else b"export-user"
+            if expected not in content:
+                print(f"❌ {label} export is missing the booking")
+                return False
+
+        print("✅ Exports working")
+        return True
+    except Exception as e:
+        print(f"❌ Exports test error: {e}")
+        return False
+    finally:
+        database.DB_PATH = original_path
+
+def test_media_uploads():
+    """Test that truncated uploads are rejected like any other unsupported image"""
+    import io
+    from PIL import Image
+    from media_store import inspect_image
+
+    try:
+        for image_format in ('JPEG', 'PNG', 'WEBP'):
+            output = io.BytesIO()
+            Image.new('RGB', (64, 48), 'maroon').save(output, image_format)
+            content = output.getvalue()
+            for cut in (20, 30):
+                try:
+                    inspect_image(content[:cut])
+                except ValueError:
+                    continue
+                print(f"❌ {image_format} truncated to {cut} bytes was accepted")
+                return False
+
+        print("✅ Media uploads working")
+        return True
+    except Exception as e:
+        print(f"❌ Media uploads test error: {e}")
+        return False
+
 def main():
     """Run all tests"""
     print("🧪 Testing Mehndi App Setup")
@@ -124,7 +248,10 @@ def main():
         ("Imports", test_imports),
         ("Database", test_database),
         ("Authentication", test_auth),
-        ("Utilities", test_utils)
+        ("Utilities", test_utils),
+        ("Geocoding worker", test_geocode_worker),
+        ("Exports", test_exports),
+        ("Media uploads", test_media_uploads)
     ]
 
     passed = 0
@@ -0,0 +1,188 @@
+"""
+Background thumbnail worker for Mehndi App
+Drains thumbnail_jobs (filled by a trigger on media_blobs) with a process pool, so
+image decoding and resizing never run on a Streamlit script thread.
+Run: python thumbnail_worker.py run | backfill | bench [count]
+"""
+
+import io
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+import database
+import media_store
+from database import get_db_connection, init_database
+
+WORKERS = int(os.environ.get('MEHNDI_THUMBNAIL_WORKERS', os.cpu_count() or 1))
+JOBS_PER_WORKER = 4
+POLL_SECONDS = 1.0
+STALE_CLAIM_SECONDS = 300  # a claim this old belongs to a worker that died
+MAX_ATTEMPTS = 3
+
+def _init_process(media_dir):
+    """Point a pool process at the parent's media directory"""
+    media_store.MEDIA_DIR = media_dir
+
+def claim_jobs(limit):
+    """Mark up to `limit` queued (or abandoned) jobs as running and return their hashes"""
+    now = time.time()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    # Jobs that keep killing their worker are given up on rather than retried forever
+    cursor.execute("""
+        UPDATE thumbnail_jobs SET status = 'failed', last_error = 'Worker did not finish'
+        WHERE status = 'running' AND claimed_at < ? AND attempts >= ?
+        RETURNING blob_hash
+    """, (now - STALE_CLAIM_SECONDS, MAX_ATTEMPTS))
+    abandoned = [(row['blob_hash'],) for row in cursor.fetchall()]
+    cursor.executemany("UPDATE media_blobs SET thumbnail_status = 'failed' WHERE hash = ?", abandoned)
+
+    cursor.execute("""
+        UPDATE thumbnail_jobs SET status = 'running', attempts = attempts + 1, claimed_at = ?
+        WHERE blob_hash IN (
+            SELECT blob_hash FROM thumbnail_jobs
+            WHERE status = 'queued' OR (status = 'running' AND claimed_at < ?)
+            ORDER BY created_at
+            LIMIT ?
+        )
+        RETURNING blob_hash
+    """, (now, now - STALE_CLAIM_SECONDS, limit))
+    hashes = [row['blob_hash'] for row in cursor.fetchall()]
+
+    conn.commit()
+    conn.close()
+    return hashes
+
+def save_results(results):
+    """Record a batch of (blob_hash, error) outcomes in one transaction; returns (done, failed)"""
+    done = [(blob_hash,) for blob_hash, error in results if error is None]
+    failed = [(error[:200], blob_hash) for blob_hash, error in results if error is not None]
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
+    cursor.executemany("DELETE FROM thumbnail_jobs WHERE blob_hash = ?", done)
+    cursor.executemany("UPDATE media_blobs SET thumbnail_status = 'ready' WHERE hash = ?", done)
+    # Decoding failures are deterministic, so a failed image is not retried
+    cursor.executemany("UPDATE thumbnail_jobs SET status = 'failed', last_error = ? WHERE blob_hash = ?", failed)
+    cursor.executemany("UPDATE media_blobs SET thumbnail_status = 'failed' WHERE hash = ?",
+                       [(blob_hash,) for _, blob_hash in failed])
+
+    conn.commit()
+    conn.close()
+    return len(done), len(failed)
+
+def run_worker(workers=WORKERS, wait_for_jobs=False):
+    """Drain the job queue with a pool of `workers` processes; returns totals of (done, failed)"""
+    totals = [0, 0]
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_process,
+                             initargs=(media_store.MEDIA_DIR,)) as pool:
+        while True:
+            hashes = claim_jobs(workers * JOBS_PER_WORKER)
+            if not hashes:
+                if not wait_for_jobs:
+                    return tuple(totals)
+                time.sleep(POLL_SECONDS)
+                continue
+
+            errors = pool.map(media_store.write_renditions, hashes)
+            counts = save_results(list(zip(hashes, errors)))
+            totals = [total + count for total, count in zip(totals, counts)]
+
+def backfill_jobs():
+    """Queue every blob that is missing a rendition on disk"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    hashes = [row['hash'] for row in cursor.execute("SELECT hash FROM media_blobs")]
+
+    missing = [(blob_hash,) for blob_hash in hashes
+               if not all(os.path.exists(media_store.thumbnail_path(blob_hash, size))
+                          for size in media_store.THUMBNAIL_SIZES)]
+    cursor.executemany("""
+        INSERT INTO thumbnail_jobs (blob_hash) VALUES (?)
+        ON CONFLICT (blob_hash) DO UPDATE SET status = 'queued', attempts = 0, last_error = NULL
+    """, missing)
+    cursor.executemany("UPDATE media_blobs SET thumbnail_status = 'pending' WHERE hash = ?", missing)
+
+    conn.commit()
+    conn.close()
+    return len(missing)
+
+BENCH_SIZES = [(640, 480), (1280, 960), (2048, 1536), (3264, 2448)]
+BENCH_FORMATS = ['JPEG', 'PNG']
+
+def _bench_uploads(count):
+    """Mixed-size JPEG/PNG uploads; a unique trailer after the image data makes each a distinct blob"""
+    bases = []
+    for width, height in BENCH_SIZES:
+        image = Image.merge('RGB', [Image.linear_gradient('L').resize((width, height)),
+                                    Image.radial_gradient('L').resize((width, height)),
+                                    Image.linear_gradient('L').rotate(90).resize((width, height))])
+        for image_format in BENCH_FORMATS:
+            output = io.BytesIO()
+            image.save(output, image_format)
+            bases.append(output.getvalue())
+
+    return [bases[i % len(bases)] + f"upload-{i}".encode() for i in range(count)]
+
+def benchmark(count=1000, workers=WORKERS):
+    """Store `count` uploads and drain their jobs in a scratch database and media directory"""
+    scratch = tempfile.mkdtemp(prefix='mehndi-thumbnails-')
+    db_path, media_dir = database.DB_PATH, media_store.MEDIA_DIR
+    database.DB_PATH = os.path.join(scratch, 'bench.db')
+    media_store.MEDIA_DIR = os.path.join(scratch, 'media')
+
+    try:
+        init_database()
+        uploads = _bench_uploads(count)
+
+        upload_ms = []
+        for content in uploads:
+            started = time.perf_counter()
+            media_store.store_image(content)
+            upload_ms.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        done, failed = run_worker(workers)
+        elapsed = time.perf_counter() - started
+
+        return {
+            'images': count,
+            'workers': workers,
+            'upload_p50_ms': statistics.median(upload_ms),
+            'upload_p99_ms': statistics.quantiles(upload_ms, n=100)[98],
+            'done': done,
+            'failed': failed,
+            'seconds': elapsed,
+            'images_per_second': done / elapsed,
+            'renditions_per_second': done * len(media_store.THUMBNAIL_SIZES) / elapsed,
+        }
+    finally:
+        database.DB_PATH, media_store.MEDIA_DIR = db_path, media_dir
+        shutil.rmtree(scratch, ignore_errors=True)
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+
+    if command == "bench":
+        result = benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
+        print(f"📤 {result['images']} uploads: p50 {result['upload_p50_ms']:.1f} ms, "
+              f"p99 {result['upload_p99_ms']:.1f} ms on the request path")
+        print(f"🖼️ {result['done']} done, {result['failed']} failed in {result['seconds']:.1f} s with "
+              f"{result['workers']} workers: {result['images_per_second']:.1f} images/s, "
+              f"{result['renditions_per_second']:.1f} renditions/s")
+    elif command == "backfill":
+        init_database()
+        print(f"📬 Queued {backfill_jobs()} images")
+    elif command == "run":
+        init_database()
+        run_worker(wait_for_jobs=True)
+    else:
+        print("Usage: python thumbnail_worker.py run | backfill | bench [count]")
@@ -2,7 +2,6 @@ import streamlit as st
 from datetime import datetime, timedelta
 import re
 import hashlib
-from geopy.geocoders import Nominatim
 import time
 
 def validate_email(email):
@@ -162,14 +161,15 @@ def search_artists(artists, query, filters=None):
 def export_data(data, format_type="csv"):
     """Export data to different formats"""
     if format_type == "csv":
-        import pandas as pd
-        try:
-            df = pd.DataFrame(data)
-            return df.to_csv(index=False)
-        except ValueError as ve:
-            import streamlit as st
-            st.error(f"ValueError in export_data: {ve}")
-            return None
+        import csv
+        import io
+        # Database tables should go through exports.export_query, which streams from the cursor
+        output = io.StringIO()
+        fieldnames = list(dict.fromkeys(key for row in data for key in row))
+        writer = csv.DictWriter(output, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(data)
+        return output.getvalue()
     elif format_type == "json":
         import json
         return json.dumps(data, indent=2)
@@ -210,8 +210,8 @@ def sanitize_input(text):
     return sanitized.strip()
 
 def get_file_hash(file_content):
-    """Generate hash for file content"""
-    return hashlib.md5(file_content).hexdigest()
+    """Generate the content hash used to address stored files (BLAKE2b, 256-bit)"""
+    return hashlib.blake2b(file_content, digest_size=32).hexdigest()
 
 def format_currency(amount, currency="₹"):
     """Format currency amount"""
@@ -277,14 +277,10 @@ def create_download_link(data, filename, text="Download"):
 
 def geocode_location(location_name):
     """Convert location name to coordinates using geocoding"""
-    try:
-        geolocator = Nominatim(user_agent="mehndi_app")
-        location = geolocator.geocode(location_name, timeout=10)
+    from geocoding import geocode
 
-        if location:
-            return (location.latitude, location.longitude)
-        else:
-            return None
+    try:
+        return geocode(location_name)
     except Exception as e:
         st.warning(f"Geocoding error for '{location_name}': {e}")
         return None